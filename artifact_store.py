@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Content-addressed artifact store for screenshots and OCR sidecars
+
+Every capture is stored once under the hash of its decoded pixels, so two
+PNGs of the same frame share one blob even if the encoder produced
+different bytes. Blobs are re-encoded as lossless WebP (PNG fallback).
+Human-readable names live in manifest.json and, optionally, as symlinks
+under by-name/. A 64-bit difference hash (dHash) per blob forms the
+near-duplicate index.
+
+Layout:
+    artifacts/
+        manifest.json
+        blobs/ab/ab12...ef.webp     (images)
+        blobs/cd/cd34...01.txt      (OCR text)
+        by-name/selenium_screenshots/current_state.webp -> ../../blobs/...
+
+Usage:
+    python3 artifact_store.py ingest selenium_screenshots test_screenshots
+    python3 artifact_store.py stats
+    python3 artifact_store.py dupes --distance 4
+    python3 artifact_store.py link
+    python3 artifact_store.py gc
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from PIL import Image, features
+
+DEFAULT_ROOT = os.environ.get('OMNIDASH_ARTIFACT_STORE', 'artifacts')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+MANIFEST_VERSION = 1
+
+
+def pixel_digest(img):
+    """SHA-256 over mode, size and raw pixels - identical frames hash equal"""
+    h = hashlib.sha256()
+    h.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def dhash(img, hash_size=8):
+    """64-bit difference hash used for near-duplicate lookup"""
+    small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return f"{value:016x}"
+
+
+def hamming(a, b):
+    """Bit distance between two hex dHashes"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def sidecar_for(image_path):
+    """Find the OCR sidecar the test scripts write next to a screenshot"""
+    base, _ = os.path.splitext(image_path)
+    for candidate in (f"{image_path}.txt", f"{base}.txt"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+class ArtifactStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.link_dir = os.path.join(root, 'by-name')
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.image_ext = '.webp' if features.check('webp') else '.png'
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'version': MANIFEST_VERSION, 'names': {}, 'blobs': {}}
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never corrupts it"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def blob_path(self, digest, kind='image'):
+        ext = self.image_ext if kind == 'image' else '.txt'
+        blob = self.manifest['blobs'].get(digest)
+        if blob and blob.get('ext'):
+            ext = blob['ext']
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}{ext}")
+
+    def _write_blob(self, digest, kind, data, meta):
+        """Store a blob unless it already exists; returns True if it was new"""
+        blobs = self.manifest['blobs']
+        if digest in blobs:
+            return False
+        ext = self.image_ext if kind == 'image' else '.txt'
+        path = os.path.join(self.blob_dir, digest[:2], f"{digest}{ext}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        blobs[digest] = dict(meta, kind=kind, ext=ext, size=len(data), refs=0)
+        return True
+
+    def _encode_image(self, img):
+        buf = io.BytesIO()
+        if self.image_ext == '.webp':
+            img.save(buf, format='WEBP', lossless=True, quality=100, method=4)
+        else:
+            img.save(buf, format='PNG', optimize=True)
+        return buf.getvalue()
+
+    def _reference(self, name, entry):
+        """Point a name at blobs, releasing whatever it referenced before"""
+        names = self.manifest['names']
+        previous = names.get(name)
+        if previous:
+            for key in ('blob', 'ocr'):
+                old = previous.get(key)
+                if old and old in self.manifest['blobs']:
+                    self.manifest['blobs'][old]['refs'] -= 1
+        for key in ('blob', 'ocr'):
+            if entry.get(key):
+                self.manifest['blobs'][entry[key]]['refs'] += 1
+        names[name] = entry
+
+    def find_near(self, digest_hash, distance):
+        """Return (digest, distance) of the closest stored image within distance"""
+        best = None
+        for digest, blob in self.manifest['blobs'].items():
+            if blob['kind'] != 'image':
+                continue
+            d = hamming(digest_hash, blob['dhash'])
+            if d <= distance and (best is None or d < best[1]):
+                best = (digest, d)
+        return best
+
+    def put_image(self, source, name, ocr_text=None, near_distance=None):
+        """
+        Store an image (path or PNG bytes) under its pixel hash.
+        With near_distance set, frames within that dHash distance of an
+        existing blob reuse it instead of adding a new one (lossy dedupe).
+        Returns the manifest entry for name.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            img = Image.open(io.BytesIO(source))
+            source_size = len(source)
+        else:
+            img = Image.open(source)
+            source_size = os.path.getsize(source)
+        img.load()
+        if img.mode not in ('RGB', 'RGBA', 'L'):
+            img = img.convert('RGBA')
+
+        digest = pixel_digest(img)
+        frame_hash = dhash(img)
+        near_of = None
+        if digest not in self.manifest['blobs'] and near_distance is not None:
+            match = self.find_near(frame_hash, near_distance)
+            if match:
+                digest, near_of = match[0], match[1]
+        if digest not in self.manifest['blobs']:
+            self._write_blob(digest, 'image', self._encode_image(img), {
+                'dhash': frame_hash,
+                'width': img.width,
+                'height': img.height,
+            })
+
+        entry = {
+            'blob': digest,
+            'source_size': source_size,
+            'stored_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if near_of is not None:
+            entry['near_distance'] = near_of
+        if ocr_text is not None:
+            entry['ocr'] = self._put_text_blob(ocr_text)
+        self._reference(name, entry)
+        return entry
+
+    def _put_text_blob(self, text):
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_blob(digest, 'text', data, {})
+        return digest
+
+    def get_image_path(self, name):
+        entry = self.manifest['names'].get(name)
+        return self.blob_path(entry['blob']) if entry else None
+
+    def get_ocr_text(self, name):
+        entry = self.manifest['names'].get(name)
+        if not entry or not entry.get('ocr'):
+            return None
+        with open(self.blob_path(entry['ocr'], 'text'), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def ingest(self, paths, near_distance=None):
+        """Ingest screenshot files (and their OCR sidecars) from files or directories"""
+        ingested = 0
+        for path in paths:
+            if os.path.isdir(path):
+                files = sorted(
+                    os.path.join(dirpath, f)
+                    for dirpath, _, filenames in os.walk(path)
+                    for f in filenames
+                )
+            else:
+                files = [path]
+            for file_path in files:
+                if not file_path.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                ocr_text = None
+                sidecar = sidecar_for(file_path)
+                if sidecar:
+                    with open(sidecar, 'r', errors='replace') as f:
+                        ocr_text = f.read()
+                try:
+                    self.put_image(file_path, os.path.normpath(file_path), ocr_text, near_distance)
+                    ingested += 1
+                except OSError as e:
+                    print(f"   ⚠️  Skipped {file_path}: {e}")
+        return ingested
+
+    def link(self):
+        """Materialize by-name/ symlinks that point at the shared blobs"""
+        created = 0
+        for name, entry in self.manifest['names'].items():
+            base, _ = os.path.splitext(name)
+            target = self.blob_path(entry['blob'])
+            for link_path, blob_path in (
+                (os.path.join(self.link_dir, base + os.path.splitext(target)[1]), target),
+                (os.path.join(self.link_dir, base + '.txt'),
+                 self.blob_path(entry['ocr'], 'text') if entry.get('ocr') else None),
+            ):
+                if not blob_path:
+                    continue
+                os.makedirs(os.path.dirname(link_path), exist_ok=True)
+                if os.path.islink(link_path) or os.path.exists(link_path):
+                    os.remove(link_path)
+                os.symlink(os.path.relpath(blob_path, os.path.dirname(link_path)), link_path)
+                created += 1
+        return created
+
+    def near_duplicates(self, distance):
+        """Group image blobs whose dHashes are within distance of each other"""
+        images = [(d, b) for d, b in self.manifest['blobs'].items() if b['kind'] == 'image']
+        seen = set()
+        groups = []
+        for i, (digest, blob) in enumerate(images):
+            if digest in seen:
+                continue
+            group = [digest]
+            for other, other_blob in images[i + 1:]:
+                if other not in seen and hamming(blob['dhash'], other_blob['dhash']) <= distance:
+                    group.append(other)
+                    seen.add(other)
+            if len(group) > 1:
+                groups.append(group)
+        return groups
+
+    def names_for(self, digest):
+        return sorted(n for n, e in self.manifest['names'].items() if e['blob'] == digest)
+
+    def gc(self):
+        """Delete blobs no name references any more"""
+        removed = 0
+        for digest, blob in list(self.manifest['blobs'].items()):
+            if blob['refs'] > 0:
+                continue
+            path = self.blob_path(digest, blob['kind'])
+            if os.path.exists(path):
+                os.remove(path)
+            del self.manifest['blobs'][digest]
+            removed += 1
+        return removed
+
+    def stats(self):
+        names = self.manifest['names']
+        blobs = self.manifest['blobs']
+        return {
+            'names': len(names),
+            'image_blobs': sum(1 for b in blobs.values() if b['kind'] == 'image'),
+            'text_blobs': sum(1 for b in blobs.values() if b['kind'] == 'text'),
+            'source_bytes': sum(e.get('source_size', 0) for e in names.values()),
+            'stored_bytes': sum(b['size'] for b in blobs.values()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed screenshot store')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='Store directory (default: %(default)s)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help='Ingest screenshot files or directories')
+    ingest.add_argument('paths', nargs='+')
+    ingest.add_argument('--near', type=int, default=None, metavar='BITS',
+                        help='Reuse an existing blob for frames within BITS dHash distance (lossy)')
+    ingest.add_argument('--link', action='store_true', help='Refresh by-name/ symlinks afterwards')
+
+    sub.add_parser('stats', help='Show store size and dedupe ratio')
+    dupes = sub.add_parser('dupes', help='List near-duplicate frame groups')
+    dupes.add_argument('--distance', type=int, default=4)
+    sub.add_parser('link', help='Create by-name/ symlinks')
+    sub.add_parser('gc', help='Remove unreferenced blobs')
+
+    args = parser.parse_args()
+    store = ArtifactStore(args.root)
+
+    if args.command == 'ingest':
+        count = store.ingest(args.paths, args.near)
+        store.save()
+        print(f"✅ Ingested {count} screenshots into {store.root}")
+        if args.link:
+            print(f"🔗 Linked {store.link()} names")
+    elif args.command == 'stats':
+        s = store.stats()
+        saved = s['source_bytes'] - s['stored_bytes']
+        ratio = (s['source_bytes'] / s['stored_bytes']) if s['stored_bytes'] else 0
+        print("=" * 60)
+        print("ARTIFACT STORE")
+        print("=" * 60)
+        print(f"   Names:        {s['names']}")
+        print(f"   Image blobs:  {s['image_blobs']}")
+        print(f"   OCR blobs:    {s['text_blobs']}")
+        print(f"   Source size:  {s['source_bytes'] / 1024:.1f} KB")
+        print(f"   Stored size:  {s['stored_bytes'] / 1024:.1f} KB")
+        print(f"   Saved:        {saved / 1024:.1f} KB ({ratio:.2f}x)")
+    elif args.command == 'dupes':
+        groups = store.near_duplicates(args.distance)
+        for group in groups:
+            print(f"\n🖼️  {len(group)} near-identical frames:")
+            for digest in group:
+                for name in store.names_for(digest):
+                    print(f"   {digest[:12]}  {name}")
+        print(f"\n{len(groups)} groups within {args.distance} bits")
+    elif args.command == 'link':
+        print(f"🔗 Linked {store.link()} names under {store.link_dir}")
+    elif args.command == 'gc':
+        removed = store.gc()
+        store.save()
+        print(f"🧹 Removed {removed} unreferenced blobs")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
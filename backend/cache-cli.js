@@ -0,0 +1,225 @@
+#!/usr/bin/env node
+/**
+ * Disk cache maintenance
+ * Inspect, prune and pre-seed the persistent response cache (data/cache).
+ * Safe to run next to a live server: entries are written atomically and the
+ * server treats files that disappear as misses.
+ *
+ *   npm run cache -- stats
+ *   npm run cache -- list [--sort hits|size|recent|expiry] [--limit 20] [--rule cdx]
+ *   npm run cache -- show <key substring>
+ *   npm run cache -- prune [--match <regex>] [--rule cdx] [--max-bytes N] [--keep-expired]
+ *   npm run cache -- seed <url> [<url> ...] [--file urls.txt] [--concurrency 4]
+ *   npm run cache -- clear
+ */
+import fs from 'fs/promises';
+import path from 'path';
+import { config } from './lib/config.js';
+import { DiskCache, splitEntry } from './lib/diskCache.js';
+import { precompress } from './lib/compression.js';
+import { cacheKey, cacheRuleFor } from './lib/responseCache.js';
+
+function parseArgs(argv) {
+  const args = { _: [] };
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg.startsWith('--')) {
+      const name = arg.slice(2);
+      const next = argv[i + 1];
+      if (next === undefined || next.startsWith('--')) {
+        args[name] = true;
+      } else {
+        args[name] = next;
+        i++;
+      }
+    } else {
+      args._.push(arg);
+    }
+  }
+  return args;
+}
+
+function formatBytes(bytes) {
+  if (bytes < 1024) return `${bytes} B`;
+  if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${(bytes / 1024 / 1024).toFixed(1)} MB`;
+}
+
+function formatAge(ms) {
+  const seconds = Math.round(ms / 1000);
+  if (Math.abs(seconds) < 120) return `${seconds}s`;
+  if (Math.abs(seconds) < 7200) return `${Math.round(seconds / 60)}m`;
+  return `${Math.round(seconds / 3600)}h`;
+}
+
+function state(meta, now) {
+  if (now <= meta.expiresAt) return 'fresh';
+  if (now <= meta.staleUntil) return 'stale';
+  return 'expired';
+}
+
+const SORTS = {
+  hits: (a, b) => b.hits - a.hits,
+  size: (a, b) => b.bytes - a.bytes,
+  recent: (a, b) => b.lastAccess - a.lastAccess,
+  expiry: (a, b) => a.staleUntil - b.staleUntil
+};
+
+async function stats(cache) {
+  const now = Date.now();
+  const byRule = {};
+  const byState = { fresh: 0, stale: 0, expired: 0 };
+  for (const meta of cache.entries()) {
+    const rule = meta.rule || 'other';
+    byRule[rule] = byRule[rule] || { entries: 0, bytes: 0, hits: 0 };
+    byRule[rule].entries++;
+    byRule[rule].bytes += meta.bytes;
+    byRule[rule].hits += meta.hits;
+    byState[state(meta, now)]++;
+  }
+  console.log(`📁 ${cache.dir}`);
+  console.log(`💾 ${cache.index.size} entries, ${formatBytes(cache.bytes)} of ${formatBytes(cache.maxBytes)}`);
+  console.log(`   ${byState.fresh} fresh, ${byState.stale} stale, ${byState.expired} expired`);
+  for (const [rule, totals] of Object.entries(byRule)) {
+    console.log(`   ${rule.padEnd(14)} ${String(totals.entries).padStart(6)} entries ${formatBytes(totals.bytes).padStart(10)} ${String(totals.hits).padStart(8)} hits`);
+  }
+}
+
+async function list(cache, args) {
+  const now = Date.now();
+  const sort = SORTS[args.sort || 'hits'];
+  if (!sort) throw new Error(`--sort must be one of: ${Object.keys(SORTS).join(', ')}`);
+  const rows = cache.entries()
+    .filter(meta => !args.rule || meta.rule === args.rule)
+    .sort(sort)
+    .slice(0, parseInt(args.limit, 10) || 20);
+  for (const meta of rows) {
+    console.log(
+      `${String(meta.hits).padStart(6)}  ${formatBytes(meta.bytes).padStart(9)}  ` +
+      `${state(meta, now).padEnd(7)}  ${formatAge(meta.expiresAt - now).padStart(5)}  ${meta.key}`
+    );
+  }
+}
+
+async function show(cache, args) {
+  const needle = args._[1];
+  if (!needle) throw new Error('show needs a key (or part of one)');
+  const meta = cache.entries().find(entry => entry.key.includes(needle));
+  if (!meta) {
+    console.log(`❌ No entry matching "${needle}"`);
+    return;
+  }
+  const now = Date.now();
+  console.log(JSON.stringify({
+    ...meta,
+    state: state(meta, now),
+    storedAt: new Date(meta.storedAt).toISOString(),
+    expiresAt: new Date(meta.expiresAt).toISOString(),
+    staleUntil: new Date(meta.staleUntil).toISOString(),
+    lastAccess: new Date(meta.lastAccess).toISOString()
+  }, null, 2));
+  const raw = await fs.readFile(path.join(cache.dir, meta.file));
+  const { body } = splitEntry(raw, meta.encoded);
+  console.log('\n' + body.toString('utf8', 0, Math.min(body.length, 500)));
+}
+
+async function prune(cache, args) {
+  const before = { entries: cache.index.size, bytes: cache.bytes };
+  const removed = await cache.prune({
+    expired: !args['keep-expired'],
+    match: args.match ? new RegExp(args.match) : null,
+    maxBytes: args['max-bytes'] ? parseInt(args['max-bytes'], 10) : cache.maxBytes
+  });
+  let ruleRemoved = 0;
+  if (args.rule) {
+    for (const meta of cache.entries()) {
+      if (meta.rule === args.rule && await cache.remove(meta.key)) ruleRemoved++;
+    }
+  }
+  console.log(`🧹 Removed ${removed + ruleRemoved} of ${before.entries} entries, freed ${formatBytes(before.bytes - cache.bytes)}`);
+}
+
+async function seed(cache, args) {
+  // Only load the connection pools when they are needed
+  const { upstreamFetch } = await import('./lib/upstreamPool.js');
+  const urls = args._.slice(1);
+  if (args.file) {
+    const text = await fs.readFile(args.file, 'utf8');
+    urls.push(...text.split('\n').map(line => line.trim()).filter(line => line && !line.startsWith('#')));
+  }
+  if (urls.length === 0) throw new Error('seed needs URLs (arguments or --file)');
+
+  const queue = [...urls];
+  let seeded = 0;
+  const worker = async () => {
+    while (queue.length) {
+      const url = queue.shift();
+      const rule = cacheRuleFor(url);
+      if (!rule) {
+        console.log(`⏭️  ${url} (no cache rule matches)`);
+        continue;
+      }
+      try {
+        const response = await upstreamFetch(url, {
+          headers: { 'User-Agent': 'Archive-OmniDash/1.0' },
+          priority: 'batch'
+        });
+        const body = Buffer.from(await response.arrayBuffer());
+        if (!response.ok) {
+          console.log(`❌ ${url} (status ${response.status})`);
+          continue;
+        }
+        const now = Date.now();
+        const contentType = response.headers.get('content-type') || 'application/octet-stream';
+        await cache.set(cacheKey('GET', url), {
+          body,
+          encoded: config.compression.enabled ? await precompress({ body, contentType }, config.compression) : null,
+          status: response.status,
+          contentType,
+          size: body.length,
+          storedAt: now,
+          expiresAt: now + rule.ttl,
+          staleUntil: now + rule.ttl + rule.swr
+        }, rule.name);
+        seeded++;
+        console.log(`✅ ${url} (${rule.name}, ${formatBytes(body.length)})`);
+      } catch (error) {
+        console.log(`❌ ${url} (${error.message})`);
+      }
+    }
+  };
+  const concurrency = parseInt(args.concurrency, 10) || 4;
+  await Promise.all(Array.from({ length: Math.min(concurrency, urls.length) }, worker));
+  console.log(`🌱 Seeded ${seeded} of ${urls.length} URLs`);
+}
+
+async function clear(cache) {
+  const count = cache.index.size;
+  for (const meta of cache.entries()) await cache.remove(meta.key);
+  await fs.rm(cache.hitsFile, { force: true });
+  console.log(`🗑️  Removed ${count} entries`);
+}
+
+const COMMANDS = { stats, list, show, prune, seed, clear };
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const command = COMMANDS[args._[0] || 'stats'];
+  if (!command) {
+    console.error(`Usage: cache-cli.js <${Object.keys(COMMANDS).join('|')}> [options]`);
+    process.exit(1);
+  }
+  const cache = await new DiskCache({
+    dir: path.join(config.dataDir, 'cache'),
+    maxBytes: config.diskCache.maxBytes,
+    maxEntryBytes: config.cache.maxEntryBytes
+  }).load();
+  await command(cache, args);
+  await cache.flushHits();
+  process.exit(0);
+}
+
+main().catch(error => {
+  console.error(`❌ ${error.message}`);
+  process.exit(1);
+});
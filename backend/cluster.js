@@ -0,0 +1,155 @@
+#!/usr/bin/env node
+/**
+ * Cluster mode
+ * Forks one server.js worker per core behind the same port.
+ *
+ * - Budgets are partitioned: each worker gets CACHE_MAX_BYTES / n of memory
+ *   cache and RATE_LIMIT_RPS / n of outbound rate, so the host as a whole
+ *   keeps the configured totals. The disk cache is shared (see DiskCache
+ *   "shared"), and this process trims it back to its cap periodically.
+ * - Credential saves/deletes are broadcast so every worker drops its
+ *   in-memory copy.
+ * - SavePageNow jobs run in a single worker, the runner, which keeps the
+ *   whole SAVE_CONCURRENCY / SAVE_PER_MINUTE budget. A new runner is named
+ *   only after the previous one has exited, so no job is adopted twice.
+ *   Other workers write new jobs for it, and their cancel/retry/delete
+ *   requests are relayed to it.
+ * - Crashed workers are replaced; SIGHUP rolls through the workers one at a
+ *   time; SIGTERM/SIGINT drain all of them before exiting.
+ *
+ *   npm run start:cluster        (WEB_CONCURRENCY=4 to pin the worker count)
+ */
+import cluster from 'cluster';
+import crypto from 'crypto';
+import os from 'os';
+import path from 'path';
+import { fileURLToPath } from 'url';
+import { config } from './lib/config.js';
+import { DiskCache } from './lib/diskCache.js';
+
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+
+const workerCount = config.cluster.workers || os.availableParallelism();
+
+// Workers must agree on the key, or credentials saved by one are unreadable
+// by the others
+const sharedEnv = {
+  ENCRYPTION_KEY: process.env.ENCRYPTION_KEY || crypto.randomBytes(32).toString('hex'),
+  CLUSTER_WORKERS: String(workerCount),
+  CACHE_MAX_BYTES: String(Math.floor(config.cache.maxBytes / workerCount)),
+  // Fractional shares, so the workers add up to exactly the configured rate
+  // (a burst share has to be at least one request, though)
+  RATE_LIMIT_RPS: String(config.rateLimit.rate / workerCount),
+  RATE_LIMIT_BURST: String(Math.max(1, config.rateLimit.burst / workerCount))
+};
+
+let shuttingDown = false;
+const restarts = [];
+let saveRunner = null;
+
+cluster.setupPrimary({ exec: path.join(__dirname, 'server.js') });
+
+// Name a listening worker that is not being replaced the save job runner,
+// unless there is one already (a runner being replaced keeps the role
+// until it exits)
+function electSaveRunner() {
+  if (shuttingDown || (saveRunner && !saveRunner.isDead())) return;
+  saveRunner = Object.values(cluster.workers).find(worker => worker.listening && !worker.replaced && !worker.isDead()) || null;
+  saveRunner?.send({ type: 'save-runner' });
+}
+
+function fork() {
+  const worker = cluster.fork(sharedEnv);
+  worker.once('listening', () => {
+    worker.listening = true;
+    electSaveRunner();
+  });
+  worker.on('message', message => {
+    // Relay cross-worker notifications
+    if (message?.type === 'credentials-changed') {
+      for (const other of Object.values(cluster.workers)) {
+        if (other !== worker) other.send({ type: 'credentials-changed' });
+      }
+    }
+    if (message?.type === 'save-jobs-created') saveRunner?.send(message);
+    // Job actions go to the runner and its answer back to the asking worker
+    if (message?.type === 'save-job-action') {
+      if (saveRunner) saveRunner.send({ ...message, from: worker.id });
+      else worker.send({ type: 'save-job-result', requestId: message.requestId, result: null });
+    }
+    if (message?.type === 'save-job-result') cluster.workers[message.to]?.send(message);
+  });
+  return worker;
+}
+
+// Ask a worker to finish in-flight requests and exit; kill it if it takes too long
+function stopWorker(worker) {
+  return new Promise(resolve => {
+    if (worker.isDead()) return resolve();
+    const timer = setTimeout(() => worker.process.kill('SIGKILL'), config.cluster.shutdownTimeout);
+    worker.once('exit', () => {
+      clearTimeout(timer);
+      resolve();
+    });
+    worker.send({ type: 'shutdown' });
+  });
+}
+
+// Replace workers one at a time, waiting for each replacement to listen first
+async function rollingRestart() {
+  console.log('🔄 Rolling restart');
+  for (const worker of Object.values(cluster.workers)) {
+    if (shuttingDown) return;
+    const replacement = fork();
+    await new Promise(resolve => replacement.once('listening', resolve));
+    worker.replaced = true;
+    await stopWorker(worker);
+  }
+  console.log('✅ Rolling restart complete');
+}
+
+async function shutdown(signal) {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`🛑 ${signal}: draining ${Object.keys(cluster.workers).length} workers`);
+  await Promise.all(Object.values(cluster.workers).map(stopWorker));
+  process.exit(0);
+}
+
+cluster.on('exit', (worker, code, signal) => {
+  if (worker === saveRunner) {
+    saveRunner = null;
+    electSaveRunner();
+  }
+  if (shuttingDown || worker.replaced || worker.exitedAfterDisconnect) return;
+  console.error(`💥 Worker ${worker.process.pid} died (${signal || code})`);
+  // Back off if workers keep crashing on startup
+  const now = Date.now();
+  restarts.push(now);
+  while (restarts.length && now - restarts[0] > 60 * 1000) restarts.shift();
+  const delay = restarts.length > workerCount ? Math.min(30, restarts.length) * 1000 : 0;
+  setTimeout(() => {
+    if (!shuttingDown) fork();
+  }, delay);
+});
+
+console.log(`🧵 Cluster primary ${process.pid} starting ${workerCount} workers`);
+for (let i = 0; i < workerCount; i++) fork();
+
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
+process.on('SIGHUP', () => rollingRestart().catch(error => console.error('Rolling restart failed:', error)));
+
+// Workers only see their own writes to the shared disk cache; trim it here
+if (config.diskCache.enabled) {
+  const diskCache = new DiskCache({
+    dir: path.join(config.dataDir, 'cache'),
+    maxBytes: config.diskCache.maxBytes,
+    maxEntryBytes: config.cache.maxEntryBytes
+  });
+  setInterval(() => {
+    diskCache.load()
+      .then(() => diskCache.evict())
+      .catch(error => console.error('Disk cache trim failed:', error.message));
+  }, config.cluster.diskTrimInterval).unref();
+}
@@ -0,0 +1,71 @@
+/**
+ * Batch metadata helpers
+ * Bounded-concurrency fan-out over many identifiers, and field projection
+ * so bulk audits can skip the (often huge) files array
+ */
+
+// Archive.org identifiers: letters, digits, '.', '-' and '_'
+const IDENTIFIER = /^[A-Za-z0-9][A-Za-z0-9._-]{0,99}$/;
+
+export function isIdentifier(value) {
+  return typeof value === 'string' && IDENTIFIER.test(value);
+}
+
+/**
+ * Keep only the requested fields of a metadata response.
+ * fields:  top-level keys or dotted paths to keep (e.g. ['metadata.title', 'item_size'])
+ * exclude: top-level keys to drop (e.g. ['files'])
+ * Whenever files is projected away, files_count is kept in its place.
+ */
+export function projectMetadata(data, { fields = null, exclude = null } = {}) {
+  if (!data || typeof data !== 'object' || (!fields && !exclude)) return data;
+  let projected;
+  if (fields && fields.length) {
+    projected = {};
+    for (const field of fields) {
+      const parts = field.split('.');
+      let source = data;
+      let target = projected;
+      for (let i = 0; i < parts.length && source !== undefined; i++) {
+        const part = parts[i];
+        if (i === parts.length - 1) {
+          if (source[part] !== undefined) target[part] = source[part];
+        } else {
+          source = source[part];
+          if (source === undefined || source === null || typeof source !== 'object') break;
+          target[part] = target[part] || {};
+          target = target[part];
+        }
+      }
+    }
+  } else {
+    projected = { ...data };
+  }
+  for (const field of exclude || []) delete projected[field];
+  if (Array.isArray(data.files) && !projected.files) {
+    projected.files_count = data.files_count ?? data.files.length;
+  }
+  return projected;
+}
+
+/**
+ * Run fn(item) over items with at most `limit` in flight, calling
+ * onSettled(item, error, value) as each one finishes. Stops taking new
+ * items once the signal aborts.
+ */
+export async function forEachConcurrent(items, limit, fn, onSettled, { signal } = {}) {
+  let next = 0;
+  const worker = async () => {
+    while (next < items.length && !signal?.aborted) {
+      const item = items[next++];
+      try {
+        const value = await fn(item);
+        await onSettled(item, null, value);
+      } catch (error) {
+        await onSettled(item, error, null);
+      }
+    }
+  };
+  const workers = Array.from({ length: Math.max(1, Math.min(limit, items.length)) }, worker);
+  await Promise.all(workers);
+}
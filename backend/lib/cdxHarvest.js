@@ -0,0 +1,73 @@
+/**
+ * Paginated CDX harvesting
+ * Walks the Wayback CDX server page by page using resumption keys, so
+ * histories of any length can be streamed without holding them in memory
+ */
+import { config } from './config.js';
+import { upstreamFetch } from './upstreamPool.js';
+
+export const CDX_FIELDS = ['urlkey', 'timestamp', 'original', 'mimetype', 'statuscode', 'digest', 'length'];
+
+// Build one CDX page request. Optional filters are passed through as-is.
+export function cdxPageUrl({ url, pageSize, resumeKey, from, to, matchType, filter, collapse, fields = CDX_FIELDS }) {
+  const params = new URLSearchParams({
+    url,
+    output: 'json',
+    fl: fields.join(','),
+    limit: String(pageSize),
+    showResumeKey: 'true'
+  });
+  if (resumeKey) params.set('resumeKey', resumeKey);
+  if (from) params.set('from', from);
+  if (to) params.set('to', to);
+  if (matchType) params.set('matchType', matchType);
+  if (collapse) params.set('collapse', collapse);
+  for (const f of [].concat(filter || [])) params.append('filter', f);
+  return `${config.endpoints.cdx}?${params}`;
+}
+
+// Split a CDX JSON page into row objects and the key for the next page.
+// With showResumeKey=true the page ends with [] followed by [resumeKey].
+export function parseCdxPage(json) {
+  if (!Array.isArray(json) || json.length === 0) {
+    return { rows: [], resumeKey: null };
+  }
+  const header = json[0];
+  const rows = [];
+  let resumeKey = null;
+  for (let i = 1; i < json.length; i++) {
+    const row = json[i];
+    if (row.length === 0) {
+      resumeKey = json[i + 1] ? json[i + 1][0] : null;
+      break;
+    }
+    const record = {};
+    header.forEach((field, j) => {
+      record[field] = row[j];
+    });
+    rows.push(record);
+  }
+  return { rows, resumeKey };
+}
+
+/**
+ * Yield { rows, resumeKey } one CDX page at a time. resumeKey is where the
+ * next page starts (null on the last page); pass it back in to resume.
+ */
+export async function* harvestCdx({ signal, priority = 'bulk', ...query }) {
+  let resumeKey = query.resumeKey || null;
+  do {
+    const response = await upstreamFetch(cdxPageUrl({ ...query, resumeKey }), {
+      headers: { 'User-Agent': 'Archive-OmniDash/1.0' },
+      priority,
+      signal
+    });
+    if (!response.ok) {
+      throw new Error(`CDX server returned status ${response.status}`);
+    }
+    const text = await response.text();
+    const page = parseCdxPage(text.trim() ? JSON.parse(text) : []);
+    resumeKey = page.resumeKey;
+    yield page;
+  } while (resumeKey && !signal?.aborted);
+}
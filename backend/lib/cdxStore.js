@@ -0,0 +1,562 @@
+/**
+ * Columnar on-disk CDX store
+ * Full capture histories are kept per query (url + matchType) in one compact
+ * segment file each, so repeat queries, date-range slices and "since last
+ * harvest" updates are answered locally.
+ *
+ * Segment layout (little-endian):
+ *   "CDXC" | uint32 header length | header JSON (padded to 4 bytes)
+ *   timestamp   uint32[rows]   seconds since epoch
+ *   original    uint32[rows]   index into header.originals
+ *   length      uint32[rows]   NO_LENGTH for "-"
+ *   mimetype    uint16[rows]   index into header.mimetypes
+ *   statuscode  uint16[rows]   index into header.statuscodes
+ *   digest      20 bytes/row   base32 SHA-1 decoded (odd digests in header)
+ * Rows are sorted by urlkey then timestamp; header.urlkeys holds the row
+ * range of each urlkey, so per-key lookups are a binary search.
+ */
+import crypto from 'crypto';
+import fs from 'fs/promises';
+import path from 'path';
+
+const MAGIC = 'CDXC';
+const VERSION = 1;
+const DIGEST_BYTES = 20;
+const NO_LENGTH = 0xffffffff;
+const BASE32 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567';
+
+export const STORE_FIELDS = ['urlkey', 'timestamp', 'original', 'mimetype', 'statuscode', 'digest', 'length'];
+
+// --- Timestamps ---------------------------------------------------------
+
+function utcSeconds(parts) {
+  const [y, mo = 1, d = 1, h = 0, mi = 0, s = 0] = parts;
+  return Math.floor(Date.UTC(y, mo - 1, d, h, mi, s) / 1000);
+}
+
+function timestampParts(ts) {
+  const parts = [parseInt(ts.substring(0, 4), 10)];
+  for (let i = 4; i + 2 <= ts.length && i < 14; i += 2) {
+    parts.push(parseInt(ts.substring(i, i + 2), 10));
+  }
+  return parts;
+}
+
+export function timestampToSeconds(ts) {
+  return utcSeconds(timestampParts(ts));
+}
+
+export function secondsToTimestamp(seconds) {
+  return new Date(seconds * 1000).toISOString().replace(/[-:T]/g, '').substring(0, 14);
+}
+
+// CDX from/to accept timestamp prefixes: from=2010 starts at 2010-01-01,
+// to=2015 runs to the last second of 2015
+export function rangeBounds(from, to) {
+  let lower = 0;
+  let upper = NO_LENGTH;
+  if (from) lower = timestampToSeconds(from);
+  if (to) {
+    const parts = timestampParts(to);
+    parts[parts.length - 1]++;
+    upper = utcSeconds(parts) - 1;
+  }
+  return { lower, upper };
+}
+
+// --- Digests ------------------------------------------------------------
+
+function decodeDigest(digest, out, offset) {
+  if (!digest || digest.length !== 32) return false;
+  let bits = 0;
+  let value = 0;
+  let o = offset;
+  for (const char of digest) {
+    const index = BASE32.indexOf(char);
+    if (index < 0) return false;
+    value = (value << 5) | index;
+    bits += 5;
+    if (bits >= 8) {
+      bits -= 8;
+      out[o++] = (value >>> bits) & 0xff;
+    }
+  }
+  return true;
+}
+
+function encodeDigest(bytes, offset) {
+  let out = '';
+  let bits = 0;
+  let value = 0;
+  for (let i = offset; i < offset + DIGEST_BYTES; i++) {
+    value = (value << 8) | bytes[i];
+    bits += 8;
+    while (bits >= 5) {
+      bits -= 5;
+      out += BASE32[(value >>> bits) & 31];
+    }
+  }
+  return out;
+}
+
+// --- Segments -----------------------------------------------------------
+
+function dictionary() {
+  const values = [];
+  const ids = new Map();
+  return {
+    values,
+    id(value) {
+      let id = ids.get(value);
+      if (id === undefined) {
+        id = values.length;
+        values.push(value);
+        ids.set(value, id);
+      }
+      return id;
+    }
+  };
+}
+
+const compareStrings = (a, b) => (a < b ? -1 : a > b ? 1 : 0);
+
+/**
+ * Builds a segment from rows added a page at a time. Rows are held as
+ * typed columns (about 40 bytes each) rather than objects, and only
+ * re-sorted at the end if they didn't arrive in urlkey/timestamp order
+ * (harvests normally do).
+ */
+export class SegmentWriter {
+  constructor() {
+    this.size = 0;
+    this.capacity = 0;
+    this.urlkeys = dictionary();
+    this.originals = dictionary();
+    this.mimetypes = dictionary();
+    this.statuscodes = dictionary();
+    this.digestExceptions = {};
+    this.inOrder = true;
+    this.lastUrlkey = null;
+    this.lastSeconds = 0;
+    this.base = null;     // segment being extended, if any
+    this.after = -1;      // rows at or before this second are already stored
+    this.added = 0;
+    this.grow(4096);
+  }
+
+  grow(capacity) {
+    const resize = (array, Type, width = 1) => {
+      const next = new Type(capacity * width);
+      if (array) next.set(array.subarray(0, this.size * width));
+      return next;
+    };
+    this.urlkeyIds = resize(this.urlkeyIds, Uint32Array);
+    this.timestamps = resize(this.timestamps, Uint32Array);
+    this.originalIds = resize(this.originalIds, Uint32Array);
+    this.lengths = resize(this.lengths, Uint32Array);
+    this.mimeIds = resize(this.mimeIds, Uint16Array);
+    this.statusIds = resize(this.statusIds, Uint16Array);
+    this.digests = resize(this.digests, Uint8Array, DIGEST_BYTES);
+    this.capacity = capacity;
+  }
+
+  // Claim the next row slot, noting whether rows are still in order
+  next(urlkey, seconds) {
+    if (this.size === this.capacity) this.grow(this.capacity * 2);
+    if (this.lastUrlkey !== null) {
+      const order = compareStrings(urlkey, this.lastUrlkey);
+      if (order < 0 || (order === 0 && seconds < this.lastSeconds)) this.inOrder = false;
+    }
+    this.lastUrlkey = urlkey;
+    this.lastSeconds = seconds;
+    const i = this.size++;
+    this.urlkeyIds[i] = this.urlkeys.id(urlkey);
+    this.timestamps[i] = seconds;
+    return i;
+  }
+
+  // Add one CDX row object
+  add(row) {
+    const seconds = timestampToSeconds(row.timestamp);
+    if (seconds <= this.after) return;
+    const i = this.next(row.urlkey, seconds);
+    this.originalIds[i] = this.originals.id(row.original);
+    const length = parseInt(row.length, 10);
+    this.lengths[i] = Number.isFinite(length) ? length : NO_LENGTH;
+    this.mimeIds[i] = this.mimetypes.id(row.mimetype);
+    this.statusIds[i] = this.statuscodes.id(row.statuscode);
+    if (!decodeDigest(row.digest, this.digests, i * DIGEST_BYTES)) {
+      this.digestExceptions[i] = row.digest;
+    }
+    this.added++;
+  }
+
+  // Start from a stored segment's rows, copied column by column
+  extend(segment) {
+    this.base = segment;
+    this.after = segment.lastSeconds();
+    const { header } = segment;
+    for (const range of header.urlkeys) {
+      for (let from = range.start; from < range.end; from++) {
+        const i = this.next(range.urlkey, segment.timestamps[from]);
+        this.originalIds[i] = this.originals.id(header.originals[segment.originalIds[from]]);
+        this.lengths[i] = segment.lengths[from];
+        this.mimeIds[i] = this.mimetypes.id(header.mimetypes[segment.mimeIds[from]]);
+        this.statusIds[i] = this.statuscodes.id(header.statuscodes[segment.statusIds[from]]);
+        this.digests.set(segment.digests.subarray(from * DIGEST_BYTES, (from + 1) * DIGEST_BYTES), i * DIGEST_BYTES);
+        if (header.digestExceptions[from] !== undefined) this.digestExceptions[i] = header.digestExceptions[from];
+      }
+    }
+    return this;
+  }
+
+  // Encode the segment (see the layout above)
+  finish() {
+    const n = this.size;
+    let order = null;
+    if (!this.inOrder) {
+      const keys = this.urlkeys.values;
+      const rank = new Uint32Array(keys.length);
+      keys.map((_, id) => id).sort((a, b) => compareStrings(keys[a], keys[b])).forEach((id, r) => {
+        rank[id] = r;
+      });
+      order = new Uint32Array(n).map((_, i) => i).sort((a, b) =>
+        rank[this.urlkeyIds[a]] - rank[this.urlkeyIds[b]] || this.timestamps[a] - this.timestamps[b] || a - b);
+    }
+    const pick = (array, width = 1) => {
+      if (!order) return array.subarray(0, n * width);
+      const out = new array.constructor(n * width);
+      for (let i = 0; i < n; i++) {
+        if (width === 1) out[i] = array[order[i]];
+        else out.set(array.subarray(order[i] * width, (order[i] + 1) * width), i * width);
+      }
+      return out;
+    };
+    const urlkeyIds = pick(this.urlkeyIds);
+    let digestExceptions = this.digestExceptions;
+    if (order) {
+      const position = new Uint32Array(n);
+      order.forEach((from, i) => {
+        position[from] = i;
+      });
+      digestExceptions = {};
+      for (const [from, digest] of Object.entries(this.digestExceptions)) digestExceptions[position[from]] = digest;
+    }
+    const urlkeys = [];
+    for (let i = 0; i < n; i++) {
+      const urlkey = this.urlkeys.values[urlkeyIds[i]];
+      const last = urlkeys[urlkeys.length - 1];
+      if (last && last.urlkey === urlkey) last.end = i + 1;
+      else urlkeys.push({ urlkey, start: i, end: i + 1 });
+    }
+
+    let header = Buffer.from(JSON.stringify({
+      version: VERSION,
+      rows: n,
+      urlkeys,
+      originals: this.originals.values,
+      mimetypes: this.mimetypes.values,
+      statuscodes: this.statuscodes.values,
+      digestExceptions
+    }));
+    const padding = (4 - ((8 + header.length) % 4)) % 4;
+    header = Buffer.concat([header, Buffer.alloc(padding, 0x20)]);
+    const prefix = Buffer.alloc(8);
+    prefix.write(MAGIC, 0, 'ascii');
+    prefix.writeUInt32LE(header.length, 4);
+
+    const column = array => Buffer.from(array.buffer, array.byteOffset, array.byteLength);
+    return Buffer.concat([
+      prefix,
+      header,
+      column(pick(this.timestamps)),
+      column(pick(this.originalIds)),
+      column(pick(this.lengths)),
+      column(pick(this.mimeIds)),
+      column(pick(this.statusIds)),
+      column(pick(this.digests, DIGEST_BYTES))
+    ]);
+  }
+}
+
+export function encodeSegment(rows) {
+  const writer = new SegmentWriter();
+  for (const row of rows) writer.add(row);
+  return writer.finish();
+}
+
+export class CdxSegment {
+  constructor(buffer) {
+    if (buffer.toString('ascii', 0, 4) !== MAGIC) throw new Error('Not a CDX segment');
+    const headerLength = buffer.readUInt32LE(4);
+    this.header = JSON.parse(buffer.toString('utf8', 8, 8 + headerLength));
+    if (this.header.version !== VERSION) throw new Error(`Unsupported segment version ${this.header.version}`);
+
+    // Copy the column block so the typed arrays are aligned
+    const data = new Uint8Array(buffer.subarray(8 + headerLength)).buffer;
+    const n = this.header.rows;
+    let offset = 0;
+    const take = (Type, count) => {
+      const array = new Type(data, offset, count);
+      offset += array.byteLength;
+      return array;
+    };
+    this.size = n;
+    this.timestamps = take(Uint32Array, n);
+    this.originalIds = take(Uint32Array, n);
+    this.lengths = take(Uint32Array, n);
+    this.mimeIds = take(Uint16Array, n);
+    this.statusIds = take(Uint16Array, n);
+    this.digests = take(Uint8Array, n * DIGEST_BYTES);
+    this.byteLength = buffer.length;
+  }
+
+  // First index in [start, end) whose timestamp is >= seconds
+  lowerBound(start, end, seconds) {
+    while (start < end) {
+      const mid = (start + end) >>> 1;
+      if (this.timestamps[mid] < seconds) start = mid + 1;
+      else end = mid;
+    }
+    return start;
+  }
+
+  // The urlkey ranges to scan: all of them, or just urlkey's (header.urlkeys
+  // is in urlkey order, so that is a binary search)
+  ranges(urlkey) {
+    const ranges = this.header.urlkeys;
+    if (!urlkey) return ranges;
+    let start = 0;
+    let end = ranges.length;
+    while (start < end) {
+      const mid = (start + end) >>> 1;
+      if (compareStrings(ranges[mid].urlkey, urlkey) < 0) start = mid + 1;
+      else end = mid;
+    }
+    return ranges[start]?.urlkey === urlkey ? [ranges[start]] : [];
+  }
+
+  // [first, stop) of a urlkey range's rows within lower..upper seconds
+  span(range, lower, upper) {
+    const first = this.lowerBound(range.start, range.end, lower);
+    const stop = upper === NO_LENGTH ? range.end : this.lowerBound(first, range.end, upper + 1);
+    return [first, stop];
+  }
+
+  /**
+   * Row indexes within the optional from/to range (CDX timestamp prefixes),
+   * optionally restricted to one urlkey
+   */
+  *indexes({ from, to, urlkey } = {}) {
+    const { lower, upper } = rangeBounds(from, to);
+    for (const range of this.ranges(urlkey)) {
+      const [first, stop] = this.span(range, lower, upper);
+      for (let i = first; i < stop; i++) yield i;
+    }
+  }
+
+  row(i) {
+    // Last range starting at or before i
+    const ranges = this.header.urlkeys;
+    let start = 0;
+    let end = ranges.length;
+    while (start < end) {
+      const mid = (start + end) >>> 1;
+      if (ranges[mid].start <= i) start = mid + 1;
+      else end = mid;
+    }
+    return this.rowFor(i, ranges[start - 1]?.urlkey);
+  }
+
+  rowFor(i, urlkey) {
+    const length = this.lengths[i];
+    return {
+      urlkey,
+      timestamp: secondsToTimestamp(this.timestamps[i]),
+      original: this.header.originals[this.originalIds[i]],
+      mimetype: this.header.mimetypes[this.mimeIds[i]],
+      statuscode: this.header.statuscodes[this.statusIds[i]],
+      digest: this.header.digestExceptions[i] ?? encodeDigest(this.digests, i * DIGEST_BYTES),
+      length: length === NO_LENGTH ? '-' : String(length)
+    };
+  }
+
+  // Decoded rows for a slice, in urlkey/timestamp order
+  *rows({ from, to, urlkey } = {}) {
+    const { lower, upper } = rangeBounds(from, to);
+    for (const range of this.ranges(urlkey)) {
+      const [first, stop] = this.span(range, lower, upper);
+      for (let i = first; i < stop; i++) yield this.rowFor(i, range.urlkey);
+    }
+  }
+
+  // Latest capture time across the segment (for incremental updates)
+  lastSeconds() {
+    let last = 0;
+    for (const range of this.header.urlkeys) {
+      if (range.end > range.start) last = Math.max(last, this.timestamps[range.end - 1]);
+    }
+    return last;
+  }
+}
+
+// --- Store --------------------------------------------------------------
+
+export function storeKey({ url, matchType }) {
+  return `${matchType || 'exact'} ${url.trim().replace(/^https?:\/\//i, '').toLowerCase()}`;
+}
+
+export class CdxStore {
+  constructor({ dir, maxOpenSegments = 32 }) {
+    this.dir = dir;
+    this.indexFile = path.join(dir, 'index.json');
+    this.maxOpenSegments = maxOpenSegments;
+    this.index = {};
+    this.open = new Map(); // decoded segments, insertion order doubles as LRU order
+    this.saving = Promise.resolve();
+    this.counters = { reads: 0, segmentHits: 0, writes: 0, appends: 0, rowsWritten: 0 };
+  }
+
+  async load() {
+    await fs.mkdir(this.dir, { recursive: true });
+    try {
+      this.index = JSON.parse(await fs.readFile(this.indexFile, 'utf8'));
+    } catch (error) {
+      if (error.code !== 'ENOENT') console.error('CDX store index unreadable, starting empty:', error.message);
+      this.index = {};
+    }
+    return this;
+  }
+
+  entry(query) {
+    return this.index[storeKey(query)] || null;
+  }
+
+  async read(query) {
+    const key = storeKey(query);
+    const entry = this.index[key];
+    if (!entry) return null;
+    this.counters.reads++;
+    let segment = this.open.get(key);
+    if (segment) {
+      this.counters.segmentHits++;
+      this.open.delete(key);
+    } else {
+      segment = new CdxSegment(await fs.readFile(path.join(this.dir, entry.file)));
+    }
+    this.open.set(key, segment);
+    for (const stale of this.open.keys()) {
+      if (this.open.size <= this.maxOpenSegments) break;
+      this.open.delete(stale);
+    }
+    return segment;
+  }
+
+  /**
+   * A writer for a query's history: empty (replace) or, with extend, seeded
+   * with the stored segment so only newer captures are added to it
+   */
+  async writer(query, { extend = false } = {}) {
+    const writer = new SegmentWriter();
+    const segment = extend ? await this.read(query) : null;
+    return segment ? writer.extend(segment) : writer;
+  }
+
+  // Store a writer's rows (or an array of rows) as the query's history
+  async write(query, source) {
+    let writer = source;
+    if (Array.isArray(source)) {
+      writer = new SegmentWriter();
+      for (const row of source) writer.add(row);
+    }
+    const key = storeKey(query);
+    if (writer.base) {
+      this.counters.appends++;
+      if (writer.added === 0) {
+        this.index[key].harvestedAt = Date.now();
+        await this.saveIndex();
+        return writer.base;
+      }
+    }
+    const file = crypto.createHash('sha1').update(key).digest('hex').substring(0, 20) + '.cdxc';
+    const buffer = writer.finish();
+    const target = path.join(this.dir, file);
+    const tmp = `${target}.${process.pid}.tmp`;
+    await fs.writeFile(tmp, buffer);
+    await fs.rename(tmp, target);
+
+    const segment = new CdxSegment(buffer);
+    this.open.delete(key);
+    this.open.set(key, segment);
+    this.index[key] = {
+      url: query.url,
+      matchType: query.matchType || 'exact',
+      file,
+      rows: segment.size,
+      bytes: buffer.length,
+      last: segment.size ? secondsToTimestamp(segment.lastSeconds()) : null,
+      harvestedAt: Date.now()
+    };
+    this.counters.writes++;
+    this.counters.rowsWritten += segment.size;
+    await this.saveIndex();
+    return segment;
+  }
+
+  // Merge newly harvested rows into the stored history
+  async append(query, rows) {
+    const writer = await this.writer(query, { extend: true });
+    for (const row of rows) writer.add(row);
+    return this.write(query, writer);
+  }
+
+  // CDX "from" for an incremental harvest: one second after the newest capture
+  nextFrom(query) {
+    const entry = this.entry(query);
+    if (!entry || !entry.last) return null;
+    return secondsToTimestamp(timestampToSeconds(entry.last) + 1);
+  }
+
+  /**
+   * Merge entries other processes (cluster workers) wrote to index.json,
+   * keeping whichever side harvested each history last
+   */
+  async reloadIndex() {
+    let onDisk;
+    try {
+      onDisk = JSON.parse(await fs.readFile(this.indexFile, 'utf8'));
+    } catch {
+      return;
+    }
+    for (const [key, entry] of Object.entries(onDisk)) {
+      const mine = this.index[key];
+      if (!mine || entry.harvestedAt > mine.harvestedAt) {
+        this.index[key] = entry;
+        this.open.delete(key);
+      }
+    }
+  }
+
+  saveIndex() {
+    // Chain writes so concurrent updates never interleave on disk; a failed
+    // write is reported to its caller but doesn't block the ones after it
+    this.saving = this.saving.catch(() => {}).then(async () => {
+      await this.reloadIndex();
+      const tmp = `${this.indexFile}.${process.pid}.tmp`;
+      await fs.writeFile(tmp, JSON.stringify(this.index));
+      await fs.rename(tmp, this.indexFile);
+    });
+    return this.saving;
+  }
+
+  stats() {
+    const entries = Object.values(this.index);
+    return {
+      ...this.counters,
+      entries: entries.length,
+      rows: entries.reduce((sum, entry) => sum + entry.rows, 0),
+      bytes: entries.reduce((sum, entry) => sum + entry.bytes, 0),
+      openSegments: this.open.size
+    };
+  }
+}
@@ -0,0 +1,165 @@
+/**
+ * Circuit breakers and latency tracking per upstream endpoint
+ * A breaker opens after a run of failures (or a high failure rate among
+ * recent calls) and refuses calls outright until a cool-down has passed;
+ * then a single probe decides whether it closes again. Latency windows feed
+ * the hedging delay in upstreamPool.js.
+ */
+
+export const STATES = ['closed', 'half-open', 'open'];
+
+export class CircuitOpenError extends Error {
+  constructor(endpoint, retryAfter) {
+    super(`Upstream ${endpoint} is failing; not sending requests for now`);
+    this.name = 'CircuitOpenError';
+    this.retryAfter = retryAfter;  // ms until the breaker lets a probe through
+  }
+}
+
+// Breakers are per endpoint rather than per host: archive.org's metadata API
+// can be healthy while advancedsearch.php times out.
+// https://web.archive.org/cdx/search/cdx?... -> web.archive.org/cdx
+export function endpointName(url) {
+  const { host, pathname } = new URL(url);
+  return `${host}/${pathname.split('/')[1] || ''}`;
+}
+
+export class CircuitBreaker {
+  constructor(endpoint, { failureThreshold, failureRate, window, openDuration, maxOpenDuration }) {
+    this.endpoint = endpoint;
+    this.failureThreshold = failureThreshold;
+    this.failureRate = failureRate;
+    this.window = window;
+    this.openDuration = openDuration;
+    this.maxOpenDuration = maxOpenDuration;
+    this.state = 'closed';
+    this.outcomes = [];          // recent results, true = failure (at most `window`)
+    this.consecutiveFailures = 0;
+    this.openUntil = 0;
+    this.currentOpenDuration = openDuration;
+    this.probing = false;        // a half-open probe is in flight
+    this.counters = { failures: 0, successes: 0, rejected: 0 };
+    this.transitions = { open: 0, 'half-open': 0, closed: 0 };
+  }
+
+  transition(state) {
+    if (this.state === state) return;
+    console.log(`🔌 Circuit ${this.endpoint}: ${this.state} -> ${state}`);
+    this.state = state;
+    this.transitions[state]++;
+  }
+
+  // Whether a call now would be refused (callers may fall back to stale data)
+  rejecting(now = Date.now()) {
+    if (this.state === 'open') return now < this.openUntil;
+    return this.state === 'half-open' && this.probing;
+  }
+
+  /**
+   * Claim permission to call the endpoint; throws CircuitOpenError if the
+   * breaker is open. Every allowed call must end in success(), failure() or
+   * release().
+   */
+  allow(now = Date.now()) {
+    if (this.state === 'open' && now >= this.openUntil) {
+      this.transition('half-open');
+    }
+    if (this.state === 'closed') return;
+    if (this.state === 'half-open' && !this.probing) {
+      this.probing = true;
+      return;
+    }
+    this.counters.rejected++;
+    throw new CircuitOpenError(this.endpoint, Math.max(0, this.openUntil - now));
+  }
+
+  success() {
+    this.counters.successes++;
+    this.consecutiveFailures = 0;
+    this.push(false);
+    if (this.state === 'half-open') {
+      this.probing = false;
+      this.outcomes = [];
+      this.currentOpenDuration = this.openDuration;
+      this.transition('closed');
+    }
+  }
+
+  failure(now = Date.now()) {
+    this.counters.failures++;
+    this.consecutiveFailures++;
+    this.push(true);
+    if (this.state === 'half-open') {
+      // Still failing: stay away for longer next time
+      this.probing = false;
+      this.currentOpenDuration = Math.min(this.currentOpenDuration * 2, this.maxOpenDuration);
+      this.open(now);
+    } else if (this.state === 'closed' && this.tripped()) {
+      this.open(now);
+    }
+  }
+
+  // The call ended without telling us anything (e.g. the client left)
+  release() {
+    if (this.state === 'half-open') this.probing = false;
+  }
+
+  open(now) {
+    this.openUntil = now + this.currentOpenDuration;
+    this.transition('open');
+  }
+
+  push(failed) {
+    this.outcomes.push(failed);
+    if (this.outcomes.length > this.window) this.outcomes.shift();
+  }
+
+  tripped() {
+    if (this.consecutiveFailures >= this.failureThreshold) return true;
+    if (this.outcomes.length < this.window) return false;
+    const failures = this.outcomes.filter(Boolean).length;
+    return failures / this.outcomes.length >= this.failureRate;
+  }
+
+  stats(now = Date.now()) {
+    return {
+      state: this.state,
+      openForMs: this.state === 'open' ? Math.max(0, this.openUntil - now) : 0,
+      consecutiveFailures: this.consecutiveFailures,
+      ...this.counters,
+      transitions: { ...this.transitions }
+    };
+  }
+}
+
+/**
+ * The last `size` latencies of an endpoint, with cached percentiles (once
+ * the window is full, re-sorted every `size / 10` samples rather than per call)
+ */
+export class LatencyWindow {
+  constructor(size) {
+    this.samples = new Float64Array(size);
+    this.count = 0;
+    this.next = 0;
+    this.sorted = null;
+    this.sinceSort = 0;
+    this.resortEvery = Math.max(1, Math.floor(size / 10));
+  }
+
+  observe(ms) {
+    this.samples[this.next] = ms;
+    this.next = (this.next + 1) % this.samples.length;
+    this.count = Math.min(this.count + 1, this.samples.length);
+    if (++this.sinceSort >= this.resortEvery || this.count < this.samples.length) this.sorted = null;
+  }
+
+  percentile(p) {
+    if (this.count === 0) return null;
+    if (!this.sorted) {
+      this.sorted = this.samples.slice(0, this.count).sort();
+      this.sinceSort = 0;
+    }
+    const { sorted } = this;
+    return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+  }
+}
@@ -0,0 +1,221 @@
+/**
+ * Response compression
+ * Negotiates brotli or gzip from Accept-Encoding. Cache entries carry
+ * pre-compressed variants (made once, when stored) so hits are sent as-is;
+ * everything else is compressed as it is written, through a zlib stream on
+ * the libuv threadpool so large bodies never block the event loop. Streamed
+ * responses (NDJSON, pass-through) are flushed after every burst of writes,
+ * so each line still reaches the client as soon as it is produced.
+ */
+import zlib from 'zlib';
+import { promisify } from 'util';
+
+// Preference order when the client accepts both equally
+export const ENCODINGS = ['br', 'gzip'];
+
+const COMPRESSIBLE = /^(text\/|application\/(json|x-ndjson|javascript|xml|xhtml\+xml|ld\+json)|[^;]*\+json|[^;]*\+xml)/i;
+
+const brotliCompress = promisify(zlib.brotliCompress);
+const gzip = promisify(zlib.gzip);
+
+const counters = {
+  streamed: { br: 0, gzip: 0 },
+  precompressedHits: { br: 0, gzip: 0 },
+  precompressed: 0,
+  bytesIn: 0,
+  bytesOut: 0
+};
+
+export function isCompressible(contentType) {
+  return COMPRESSIBLE.test(contentType || '');
+}
+
+/**
+ * Pick an encoding from an Accept-Encoding header: the highest q-value
+ * among `available`, ties broken by ENCODINGS order. null means identity.
+ */
+export function negotiateEncoding(header, available = ENCODINGS) {
+  if (!header) return null;
+  const q = {};
+  for (const part of header.split(',')) {
+    const [name, ...params] = part.trim().toLowerCase().split(';');
+    if (!name) continue;
+    const qParam = params.find(param => param.trim().startsWith('q='));
+    q[name] = qParam ? parseFloat(qParam.trim().slice(2)) || 0 : 1;
+  }
+  let best = null;
+  let bestQ = 0;
+  for (const encoding of available) {
+    const value = q[encoding] ?? q['*'] ?? 0;
+    if (value > bestQ) {
+      best = encoding;
+      bestQ = value;
+    }
+  }
+  return best;
+}
+
+/**
+ * Compress a cache entry body once in every encoding: { br, gzip } or null
+ * when it is not worth it (small, binary, or incompressible). Runs on the
+ * threadpool.
+ */
+export async function precompress({ body, contentType }, { threshold, brotliQuality, gzipLevel }) {
+  if (body.length < threshold || !isCompressible(contentType)) return null;
+  const [br, gz] = await Promise.all([
+    brotliCompress(body, {
+      params: {
+        [zlib.constants.BROTLI_PARAM_QUALITY]: brotliQuality,
+        [zlib.constants.BROTLI_PARAM_SIZE_HINT]: body.length,
+        [zlib.constants.BROTLI_PARAM_MODE]: zlib.constants.BROTLI_MODE_TEXT
+      }
+    }),
+    gzip(body, { level: gzipLevel })
+  ]);
+  const encoded = {};
+  if (br.length < body.length) encoded.br = br;
+  if (gz.length < body.length) encoded.gzip = gz;
+  if (Object.keys(encoded).length === 0) return null;
+  counters.precompressed++;
+  return encoded;
+}
+
+/**
+ * Send a cache entry, using a stored variant when the client accepts one.
+ * Entries without variants go out uncompressed here and are picked up by
+ * the streaming middleware instead.
+ */
+export function sendEntry(req, res, entry) {
+  res.status(entry.status || 200).type(entry.contentType);
+  const variants = entry.encoded;
+  if (!variants) return res.send(entry.body);
+  res.vary('Accept-Encoding');
+  const encoding = negotiateEncoding(req.get('accept-encoding'), Object.keys(variants));
+  if (!encoding) return res.send(entry.body);
+  counters.precompressedHits[encoding]++;
+  res.set('Content-Encoding', encoding);
+  return res.send(variants[encoding]);
+}
+
+function createEncoder(encoding, { brotliQuality, gzipLevel }) {
+  if (encoding === 'br') {
+    return zlib.createBrotliCompress({
+      params: {
+        [zlib.constants.BROTLI_PARAM_QUALITY]: brotliQuality,
+        [zlib.constants.BROTLI_PARAM_MODE]: zlib.constants.BROTLI_MODE_TEXT
+      }
+    });
+  }
+  return zlib.createGzip({ level: gzipLevel });
+}
+
+/**
+ * Express middleware compressing responses on the fly. Skips responses that
+ * already carry a Content-Encoding (pre-compressed cache hits), are below the
+ * threshold or not text-like, and anything whose headers went out early.
+ * Streams that send their headers before the first line (res.flushHeaders,
+ * as the NDJSON routes do) are decided at that point instead, so they are
+ * compressed too. res.write keeps its back-pressure contract: it returns false while the
+ * encoder is full, and 'drain' is emitted once it has room again.
+ */
+export function compression({ threshold, streamBrotliQuality, gzipLevel }) {
+  const encoderOptions = { brotliQuality: streamBrotliQuality, gzipLevel };
+  return (req, res, next) => {
+    const encoding = req.method === 'HEAD' ? null : negotiateEncoding(req.get('accept-encoding'));
+    if (!encoding) return next();
+
+    const write = res.write;
+    const end = res.end;
+    let encoder = null;
+    let decided = false;
+    let flushScheduled = false;
+    // Sync flush keeps the gzip dictionary (the default full flush resets it)
+    const flushKind = encoding === 'br' ? zlib.constants.BROTLI_OPERATION_FLUSH : zlib.constants.Z_SYNC_FLUSH;
+
+    // Decide on the first write/end, while headers can still change
+    const decide = (chunk, ending) => {
+      decided = true;
+      if (res.headersSent || res.getHeader('Content-Encoding')) return;
+      if (res.statusCode === 204 || res.statusCode === 304) return;
+      const contentType = res.getHeader('Content-Type');
+      if (!isCompressible(contentType)) return;
+      res.vary('Accept-Encoding');
+      const length = ending
+        ? (chunk ? Buffer.byteLength(chunk) : 0)
+        : parseInt(res.getHeader('Content-Length'), 10);
+      if (Number.isFinite(length) && length < threshold) return;
+
+      res.removeHeader('Content-Length');
+      res.set('Content-Encoding', encoding);
+      counters.streamed[encoding]++;
+      encoder = createEncoder(encoding, encoderOptions);
+      encoder.on('data', data => {
+        counters.bytesOut += data.length;
+        if (!write.call(res, data)) encoder.pause();
+      });
+      encoder.on('end', () => end.call(res));
+      encoder.on('drain', () => res.emit('drain'));
+      encoder.on('error', error => res.destroy(error));
+      res.on('drain', () => encoder.resume());
+      res.on('close', () => encoder.destroy());
+    };
+
+    // Push out what has been compressed so far once the current burst of
+    // writes is over (one line of NDJSON, one upstream chunk, ...)
+    const scheduleFlush = () => {
+      if (flushScheduled) return;
+      flushScheduled = true;
+      setImmediate(() => {
+        flushScheduled = false;
+        if (!encoder.writableEnded && !encoder.destroyed) encoder.flush(flushKind);
+      });
+    };
+
+    res.write = function (chunk, chunkEncoding, callback) {
+      if (!decided) decide(chunk, false);
+      if (!encoder) return write.call(this, chunk, chunkEncoding, callback);
+      counters.bytesIn += Buffer.byteLength(chunk, typeof chunkEncoding === 'string' ? chunkEncoding : undefined);
+      const ok = encoder.write(chunk, chunkEncoding, callback);
+      scheduleFlush();
+      return ok;
+    };
+
+    const flushHeaders = res.flushHeaders;
+    res.flushHeaders = function () {
+      if (!decided) decide(null, false);
+      return flushHeaders.call(this);
+    };
+
+    res.end = function (chunk, chunkEncoding, callback) {
+      if (typeof chunk === 'function') {
+        callback = chunk;
+        chunk = undefined;
+      }
+      if (!decided) decide(chunk, true);
+      if (!encoder) return end.call(this, chunk, chunkEncoding, callback);
+      if (typeof chunkEncoding === 'function') {
+        callback = chunkEncoding;
+        chunkEncoding = undefined;
+      }
+      if (callback) res.once('finish', callback);
+      if (chunk) {
+        counters.bytesIn += Buffer.byteLength(chunk, chunkEncoding);
+        encoder.end(chunk, chunkEncoding);
+      } else {
+        encoder.end();
+      }
+      return this;
+    };
+
+    next();
+  };
+}
+
+export function compressionStats() {
+  return {
+    ...counters,
+    streamed: { ...counters.streamed },
+    precompressedHits: { ...counters.precompressedHits },
+    ratio: counters.bytesIn ? counters.bytesOut / counters.bytesIn : null
+  };
+}
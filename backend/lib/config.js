@@ -0,0 +1,216 @@
+/**
+ * Backend tunables
+ * Every value can be overridden with an environment variable (see .env.example)
+ */
+
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+const BACKEND_DIR = fileURLToPath(new URL('..', import.meta.url));
+
+const int = (name, fallback) => {
+  const value = parseInt(process.env[name], 10);
+  return Number.isFinite(value) ? value : fallback;
+};
+
+const float = (name, fallback) => {
+  const value = parseFloat(process.env[name]);
+  return Number.isFinite(value) ? value : fallback;
+};
+
+const SECOND = 1000;
+
+export const config = {
+  // Persistent server state (CDX store, ...)
+  dataDir: process.env.DATA_DIR || path.join(BACKEND_DIR, 'data'),
+  // Largest JSON request body accepted
+  maxBodyBytes: int('MAX_BODY_BYTES', 4 * 1024 * 1024),
+  cache: {
+    // Total bytes of response bodies kept in memory
+    maxBytes: int('CACHE_MAX_BYTES', 64 * 1024 * 1024),
+    // Larger responses are passed through but never cached
+    maxEntryBytes: int('CACHE_MAX_ENTRY_BYTES', 8 * 1024 * 1024),
+    // 'scoped' caches authenticated calls per access key, 'off' never caches them
+    authMode: process.env.CACHE_AUTH_MODE === 'off' ? 'off' : 'scoped'
+  },
+  diskCache: {
+    // Persistent tier under the memory cache (data/cache), survives restarts
+    enabled: process.env.DISK_CACHE !== 'off',
+    maxBytes: int('DISK_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+    // Most requested entries loaded into memory at startup
+    warmEntries: int('DISK_CACHE_WARM_ENTRIES', 200),
+    hitsFlushInterval: int('DISK_CACHE_HITS_FLUSH_SECONDS', 30) * SECOND
+  },
+  rateLimit: {
+    // Token bucket per upstream host: sustained requests/second and burst size
+    // (fractional, so cluster workers can split them exactly)
+    rate: float('RATE_LIMIT_RPS', 10),
+    burst: float('RATE_LIMIT_BURST', 20),
+    // Floor the rate may be halved down to after repeated 429s
+    minRate: 0.5,
+    // Requests waiting per host before new ones are refused
+    maxQueue: int('RATE_LIMIT_MAX_QUEUE', 2000),
+    // Pause after a 429 without Retry-After: base * 2^(strikes-1), capped
+    backoffBase: int('RATE_LIMIT_BACKOFF_MS', 1000),
+    backoffMax: int('RATE_LIMIT_BACKOFF_MAX_MS', 60 * SECOND),
+    // Retries of a throttled GET once the pause has passed
+    maxRetries: int('RATE_LIMIT_MAX_RETRIES', 2)
+  },
+  cluster: {
+    // Workers forked by cluster.js (0 = one per core)
+    workers: int('WEB_CONCURRENCY', 0),
+    // How long a worker may take to finish in-flight requests when stopping
+    shutdownTimeout: int('SHUTDOWN_TIMEOUT_SECONDS', 30) * SECOND,
+    // How often the primary trims the shared disk cache back to its cap
+    diskTrimInterval: int('CLUSTER_DISK_TRIM_SECONDS', 5 * 60) * SECOND
+  },
+  compression: {
+    // brotli/gzip for responses when the client accepts them
+    enabled: process.env.COMPRESSION !== 'off',
+    // Smaller bodies are sent as-is (headers would eat most of the savings)
+    threshold: int('COMPRESSION_THRESHOLD_BYTES', 1024),
+    // Cache entries are compressed once, so they can afford a higher level
+    // than responses compressed while streaming
+    brotliQuality: int('COMPRESSION_CACHE_BROTLI_QUALITY', 9),
+    streamBrotliQuality: int('COMPRESSION_BROTLI_QUALITY', 4),
+    gzipLevel: int('COMPRESSION_GZIP_LEVEL', 6)
+  },
+  tracing: {
+    // Share of requests traced (0 disables; X-Trace-Sampled: 1 forces one)
+    sampleRate: float('TRACE_SAMPLE_RATE', 0.05),
+    // Completed traces kept for /api/traces
+    maxTraces: int('TRACE_MAX_STORED', 1000)
+  },
+  // Upstream base URLs (overridable to point at a local stand-in)
+  endpoints: {
+    archive: (process.env.ARCHIVE_BASE_URL || 'https://archive.org').replace(/\/$/, ''),
+    cdx: process.env.CDX_API_URL || 'https://web.archive.org/cdx/search/cdx',
+    wayback: (process.env.WAYBACK_BASE_URL || 'https://web.archive.org').replace(/\/$/, ''),
+    views: (process.env.VIEWS_BASE_URL || 'https://be-api.us.archive.org').replace(/\/$/, '')
+  },
+  batch: {
+    // Identifiers fetched at once by /api/metadata/batch (callers may ask for up to maxConcurrency)
+    concurrency: int('BATCH_CONCURRENCY', 8),
+    maxConcurrency: int('BATCH_MAX_CONCURRENCY', 32),
+    maxIdentifiers: int('BATCH_MAX_IDENTIFIERS', 1000)
+  },
+  proxyBatch: {
+    // Requests run at once by /api/proxy/batch, and per-call limits
+    concurrency: int('PROXY_BATCH_CONCURRENCY', 6),
+    maxRequests: int('PROXY_BATCH_MAX_REQUESTS', 20),
+    // Larger bodies are reported as errors (stream them through /api/proxy/archive)
+    maxResponseBytes: int('PROXY_BATCH_MAX_RESPONSE_BYTES', 5 * 1024 * 1024)
+  },
+  cdx: {
+    // Rows per upstream CDX page when harvesting
+    pageSize: int('CDX_PAGE_SIZE', 5000),
+    maxPageSize: int('CDX_MAX_PAGE_SIZE', 50000)
+  },
+  cdxStore: {
+    // Persist harvested histories and serve repeat queries from disk
+    enabled: process.env.CDX_STORE !== 'off',
+    // Stored histories older than this get an incremental "since last" harvest
+    refreshAfter: int('CDX_STORE_REFRESH_SECONDS', 30 * 60) * SECOND,
+    // Decoded segments kept in memory
+    maxOpenSegments: int('CDX_STORE_OPEN_SEGMENTS', 32)
+  },
+  saveJobs: {
+    // SavePageNow captures in flight at once, and submissions per minute
+    concurrency: int('SAVE_CONCURRENCY', 4),
+    perMinute: int('SAVE_PER_MINUTE', 12),
+    pollInterval: int('SAVE_POLL_SECONDS', 10) * SECOND,
+    // Give up on a capture SPN has not finished after this long
+    captureTimeout: int('SAVE_CAPTURE_TIMEOUT_SECONDS', 10 * 60) * SECOND,
+    maxAttempts: int('SAVE_MAX_ATTEMPTS', 3),
+    maxUrls: int('SAVE_MAX_URLS', 10000),
+    // Finished jobs are deleted after this long
+    retention: int('SAVE_JOB_RETENTION_DAYS', 7) * 24 * 60 * 60 * SECOND,
+    persistInterval: int('SAVE_PERSIST_SECONDS', 2) * SECOND
+  },
+  credentials: {
+    // Also drop the in-memory credentials when credentials.enc changes on disk
+    watch: process.env.CREDENTIALS_WATCH === 'true'
+  },
+  upstream: {
+    // Sockets per upstream origin
+    maxSockets: int('UPSTREAM_MAX_SOCKETS', 16),
+    // Requests in flight per socket (1 = no HTTP/1.1 pipelining)
+    pipelining: int('UPSTREAM_PIPELINING', 1),
+    keepAliveTimeout: int('UPSTREAM_KEEPALIVE_MS', 30 * SECOND),
+    keepAliveMaxTimeout: int('UPSTREAM_KEEPALIVE_MAX_MS', 10 * 60 * SECOND),
+    connectTimeout: int('UPSTREAM_CONNECT_TIMEOUT_MS', 10 * SECOND),
+    // Give up on (and count as failed) a request with no response headers by then
+    headersTimeout: int('UPSTREAM_HEADERS_TIMEOUT_MS', 60 * SECOND),
+    // Pools kept for origins other than the configured upstreams (least
+    // recently used ones are closed)
+    maxOtherOrigins: int('UPSTREAM_MAX_OTHER_ORIGINS', 16)
+  },
+  circuitBreaker: {
+    // Refuse calls to an endpoint that keeps failing instead of waiting on it
+    enabled: process.env.CIRCUIT_BREAKER !== 'off',
+    // Opens after this many failures (errors, timeouts, 5xx) in a row...
+    failureThreshold: int('CIRCUIT_FAILURE_THRESHOLD', 5),
+    // ...or when this share of the last `window` calls failed
+    failureRate: float('CIRCUIT_FAILURE_RATE', 0.5),
+    window: int('CIRCUIT_WINDOW', 20),
+    // Time before a probe is let through, doubled while probes keep failing
+    openDuration: int('CIRCUIT_OPEN_SECONDS', 30) * SECOND,
+    maxOpenDuration: int('CIRCUIT_MAX_OPEN_SECONDS', 5 * 60) * SECOND
+  },
+  hedging: {
+    // Send a duplicate of a slow interactive GET (off by default: extra upstream load)
+    enabled: process.env.UPSTREAM_HEDGING === 'on',
+    // Hedge after this percentile of the endpoint's recent latency, clamped
+    percentile: float('HEDGE_PERCENTILE', 0.95),
+    minDelay: int('HEDGE_MIN_DELAY_MS', 50),
+    maxDelay: int('HEDGE_MAX_DELAY_MS', 5 * SECOND),
+    // Latencies kept per endpoint, and how many before hedging starts
+    samples: 200,
+    minSamples: int('HEDGE_MIN_SAMPLES', 20),
+    // At most this share of an endpoint's requests may be duplicated
+    budget: float('HEDGE_BUDGET', 0.1)
+  }
+};
+
+// Per-endpoint freshness. ttl = served as fresh, swr = extra window in which a
+// stale copy is served while it is refetched in the background.
+// Matched against host + path of the upstream URL; unmatched URLs are not cached.
+export const CACHE_RULES = [
+  {
+    name: 'metadata',
+    match: /^archive\.org\/metadata\//,
+    ttl: int('CACHE_TTL_METADATA', 10 * 60) * SECOND,
+    swr: int('CACHE_SWR_METADATA', 60 * 60) * SECOND
+  },
+  {
+    name: 'cdx',
+    match: /^web\.archive\.org\/cdx\/search\/cdx/,
+    ttl: int('CACHE_TTL_CDX', 30 * 60) * SECOND,
+    swr: int('CACHE_SWR_CDX', 6 * 60 * 60) * SECOND
+  },
+  {
+    name: 'availability',
+    match: /^archive\.org\/wayback\/available/,
+    ttl: int('CACHE_TTL_AVAILABILITY', 5 * 60) * SECOND,
+    swr: int('CACHE_SWR_AVAILABILITY', 60 * 60) * SECOND
+  },
+  {
+    // Archived pages at a given timestamp hardly ever change
+    name: 'snapshot',
+    match: /^web\.archive\.org\/web\//,
+    ttl: int('CACHE_TTL_SNAPSHOT', 24 * 60 * 60) * SECOND,
+    swr: int('CACHE_SWR_SNAPSHOT', 7 * 24 * 60 * 60) * SECOND
+  },
+  {
+    name: 'views',
+    match: /^be-api\.us\.archive\.org\/views\//,
+    ttl: int('CACHE_TTL_VIEWS', 60 * 60) * SECOND,
+    swr: int('CACHE_SWR_VIEWS', 6 * 60 * 60) * SECOND
+  },
+  {
+    name: 'search',
+    match: /^archive\.org\/(advancedsearch\.php|services\/search\/)/,
+    ttl: int('CACHE_TTL_SEARCH', 5 * 60) * SECOND,
+    swr: int('CACHE_SWR_SEARCH', 30 * 60) * SECOND
+  }
+];
@@ -0,0 +1,332 @@
+/**
+ * Persistent disk tier for the response cache
+ * One file per entry (JSON header line + raw body, then any compressed
+ * variants) under data/cache, so a restarted backend comes back warm. Bounded by total bytes with LRU
+ * eviction; file mtimes carry the LRU order and hits.json the popularity
+ * across restarts. Several processes may share one directory: entries
+ * written by another process are found by their file name on a miss.
+ * Loading only reads the index; files are removed by prune() and evict()
+ * alone, so expired entries stay available as a fallback (and to the CLI).
+ */
+import crypto from 'crypto';
+import fs from 'fs/promises';
+import path from 'path';
+
+const ENTRY_SUFFIX = '.entry';
+const HEADER_PROBE_BYTES = 4096;
+
+// Unique per write, so concurrent writes of one key never share a temp file
+const tmpFile = file => `${file}.${process.pid}.${crypto.randomBytes(6).toString('hex')}.tmp`;
+
+export function entryFile(key) {
+  return crypto.createHash('sha1').update(key).digest('hex') + ENTRY_SUFFIX;
+}
+
+// Read just the JSON header line of an entry file
+async function readHeader(file) {
+  const handle = await fs.open(file, 'r');
+  try {
+    let probe = Buffer.alloc(HEADER_PROBE_BYTES);
+    let length = 0;
+    for (;;) {
+      const { bytesRead } = await handle.read(probe, length, probe.length - length, length);
+      length += bytesRead;
+      const newline = probe.subarray(0, length).indexOf(0x0a);
+      if (newline >= 0) return JSON.parse(probe.toString('utf8', 0, newline));
+      if (bytesRead === 0) throw new Error('Truncated cache entry');
+      probe = Buffer.concat([probe, Buffer.alloc(probe.length)]);
+    }
+  } finally {
+    await handle.close();
+  }
+}
+
+/**
+ * Split an entry file into its body and compressed variants ({ br, gzip }
+ * or null). lengths is the header's encoded map; files written before
+ * variants existed have none.
+ */
+export function splitEntry(raw, lengths) {
+  const start = raw.indexOf(0x0a) + 1;
+  if (!lengths) return { body: raw.subarray(start), encoded: null };
+  let offset = raw.length - Object.values(lengths).reduce((sum, length) => sum + length, 0);
+  const body = raw.subarray(start, offset);
+  const encoded = {};
+  for (const [name, length] of Object.entries(lengths)) {
+    encoded[name] = raw.subarray(offset, offset + length);
+    offset += length;
+  }
+  return { body, encoded };
+}
+
+export class DiskCache {
+  constructor({ dir, maxBytes, maxEntryBytes }) {
+    this.dir = dir;
+    this.hitsFile = path.join(dir, 'hits.json');
+    this.maxBytes = maxBytes;
+    this.maxEntryBytes = maxEntryBytes;
+    this.index = new Map(); // key -> header; insertion order doubles as LRU order
+    this.bytes = 0;
+    this.pendingHits = new Map(); // hits not yet added to hits.json
+    this.unreadable = [];         // entry files load() couldn't parse (removed by prune)
+    this.counters = { hits: 0, misses: 0, writes: 0, writeErrors: 0, evictions: 0, expirations: 0 };
+  }
+
+  // Rebuild the index from the entry files, oldest access first. Nothing
+  // is deleted here - see prune() and evict().
+  async load() {
+    await fs.mkdir(this.dir, { recursive: true });
+    let hits = {};
+    try {
+      hits = JSON.parse(await fs.readFile(this.hitsFile, 'utf8'));
+    } catch {
+      // No popularity yet
+    }
+    const found = [];
+    this.unreadable = [];
+    for (const name of await fs.readdir(this.dir)) {
+      if (!name.endsWith(ENTRY_SUFFIX)) continue;
+      const file = path.join(this.dir, name);
+      try {
+        const [header, stat] = await Promise.all([readHeader(file), fs.stat(file)]);
+        found.push({ ...header, file: name, bytes: stat.size, lastAccess: stat.mtimeMs, hits: hits[header.key] || 0 });
+      } catch (error) {
+        // Possibly still being renamed into place by another process
+        if (error.code !== 'ENOENT') this.unreadable.push(name);
+      }
+    }
+    found.sort((a, b) => a.lastAccess - b.lastAccess);
+    this.index.clear();
+    this.bytes = 0;
+    for (const meta of found) {
+      this.index.set(meta.key, meta);
+      this.bytes += meta.bytes;
+    }
+    return this;
+  }
+
+  /**
+   * Read an entry: { body, status, contentType, size, storedAt, expiresAt,
+   * staleUntil } or null. Entries past their stale window are misses unless
+   * allowExpired, but stay on disk until pruned or evicted.
+   */
+  async get(key, { allowExpired = false } = {}) {
+    const meta = this.index.get(key) || await this.discover(key);
+    if (!meta) {
+      this.counters.misses++;
+      return null;
+    }
+    if (Date.now() > meta.staleUntil && !allowExpired) {
+      this.counters.expirations++;
+      this.counters.misses++;
+      return null;
+    }
+    let raw;
+    try {
+      raw = await fs.readFile(path.join(this.dir, meta.file));
+    } catch {
+      // Removed underneath us (e.g. by the CLI)
+      this.forget(key);
+      this.counters.misses++;
+      return null;
+    }
+    const { body, encoded } = splitEntry(raw, meta.encoded);
+    this.touch(key, meta);
+    this.counters.hits++;
+    return {
+      body,
+      encoded,
+      status: meta.status,
+      contentType: meta.contentType,
+      size: body.length,
+      storedAt: meta.storedAt,
+      expiresAt: meta.expiresAt,
+      staleUntil: meta.staleUntil
+    };
+  }
+
+  // Pick up an entry another process wrote since we loaded the index
+  async discover(key) {
+    const name = entryFile(key);
+    const file = path.join(this.dir, name);
+    try {
+      const [header, stat] = await Promise.all([readHeader(file), fs.stat(file)]);
+      if (header.key !== key) return null;
+      const meta = { ...header, file: name, bytes: stat.size, lastAccess: stat.mtimeMs, hits: 0 };
+      this.index.set(key, meta);
+      this.bytes += meta.bytes;
+      return meta;
+    } catch {
+      return null;
+    }
+  }
+
+  touch(key, meta) {
+    const now = new Date();
+    meta.lastAccess = now.getTime();
+    meta.hits++;
+    this.pendingHits.set(key, (this.pendingHits.get(key) || 0) + 1);
+    this.index.delete(key);
+    this.index.set(key, meta);
+    fs.utimes(path.join(this.dir, meta.file), now, now).catch(() => {});
+  }
+
+  // Persist an entry as stored in the memory tier (see ResponseCache.set)
+  async set(key, entry, ruleName = null) {
+    if (entry.size > this.maxEntryBytes) return false;
+    const variants = Object.entries(entry.encoded || {});
+    const header = {
+      key,
+      rule: ruleName,
+      status: entry.status,
+      contentType: entry.contentType,
+      storedAt: entry.storedAt,
+      expiresAt: entry.expiresAt,
+      staleUntil: entry.staleUntil,
+      // Byte length of each variant, in file order after the body
+      encoded: variants.length ? Object.fromEntries(variants.map(([name, buffer]) => [name, buffer.length])) : undefined
+    };
+    const name = entryFile(key);
+    const file = path.join(this.dir, name);
+    const data = Buffer.concat([
+      Buffer.from(JSON.stringify(header) + '\n'),
+      entry.body,
+      ...variants.map(([, buffer]) => buffer)
+    ]);
+    const tmp = tmpFile(file);
+    try {
+      await fs.writeFile(tmp, data);
+      await fs.rename(tmp, file);
+    } catch (error) {
+      this.counters.writeErrors++;
+      throw error;
+    }
+    const previous = this.index.get(key);
+    if (previous) this.forget(key);
+    this.index.set(key, { ...header, file: name, bytes: data.length, lastAccess: Date.now(), hits: previous?.hits || 0 });
+    this.bytes += data.length;
+    this.counters.writes++;
+    await this.evict();
+    return true;
+  }
+
+  forget(key) {
+    const meta = this.index.get(key);
+    if (!meta) return null;
+    this.bytes -= meta.bytes;
+    this.index.delete(key);
+    return meta;
+  }
+
+  async remove(key) {
+    const meta = this.forget(key);
+    if (!meta) return false;
+    await fs.unlink(path.join(this.dir, meta.file)).catch(() => {});
+    return true;
+  }
+
+  // Drop least-recently-used entries until we fit the byte budget
+  async evict(maxBytes = this.maxBytes) {
+    let evicted = 0;
+    for (const key of this.index.keys()) {
+      if (this.bytes <= maxBytes) break;
+      await this.remove(key);
+      evicted++;
+    }
+    this.counters.evictions += evicted;
+    return evicted;
+  }
+
+  /**
+   * Remove entries: unreadable files, expired ones (past their stale
+   * window), those whose key matches a pattern, and then LRU entries beyond
+   * maxBytes. Popularity of removed entries is forgotten.
+   */
+  async prune({ expired = true, match = null, maxBytes = this.maxBytes } = {}) {
+    const now = Date.now();
+    let removed = 0;
+    for (const name of this.unreadable) {
+      await fs.unlink(path.join(this.dir, name)).catch(() => {});
+    }
+    this.unreadable = [];
+    for (const [key, meta] of [...this.index]) {
+      if ((expired && now > meta.staleUntil) || (match && match.test(key))) {
+        await this.remove(key);
+        if (expired && now > meta.staleUntil) this.counters.expirations++;
+        removed++;
+      }
+    }
+    removed += await this.evict(maxBytes);
+    await this.flushHits();
+    let hits = {};
+    try {
+      hits = JSON.parse(await fs.readFile(this.hitsFile, 'utf8'));
+    } catch {
+      return removed;
+    }
+    if (Object.keys(hits).some(key => !this.index.has(key))) {
+      await this.writeHits(Object.fromEntries(Object.entries(hits).filter(([key]) => this.index.has(key))));
+    }
+    return removed;
+  }
+
+  // Most requested live entries, for warming the memory tier on startup
+  async popular(limit) {
+    const now = Date.now();
+    const keys = [...this.index.values()]
+      .filter(meta => meta.hits > 0 && now <= meta.staleUntil)
+      .sort((a, b) => b.hits - a.hits)
+      .slice(0, limit)
+      .map(meta => meta.key);
+    const entries = [];
+    for (const key of keys) {
+      const meta = this.index.get(key);
+      const entry = await this.get(key);
+      if (!entry) continue;
+      // Warming is not a real hit
+      meta.hits--;
+      this.counters.hits--;
+      this.pendingHits.set(key, this.pendingHits.get(key) - 1);
+      entries.push({ key, entry, rule: meta.rule });
+    }
+    return entries;
+  }
+
+  // Add hits since the last flush to hits.json (merging with other processes)
+  async flushHits() {
+    if (this.pendingHits.size === 0) return;
+    const pending = this.pendingHits;
+    this.pendingHits = new Map();
+    let hits = {};
+    try {
+      hits = JSON.parse(await fs.readFile(this.hitsFile, 'utf8'));
+    } catch {
+      // First flush
+    }
+    for (const [key, delta] of pending) {
+      if (delta > 0) hits[key] = (hits[key] || 0) + delta;
+    }
+    await this.writeHits(hits);
+  }
+
+  async writeHits(hits) {
+    const tmp = tmpFile(this.hitsFile);
+    await fs.writeFile(tmp, JSON.stringify(hits));
+    await fs.rename(tmp, this.hitsFile);
+  }
+
+  entries() {
+    return [...this.index.values()];
+  }
+
+  stats() {
+    return {
+      ...this.counters,
+      entries: this.index.size,
+      expired: [...this.index.values()].filter(meta => Date.now() > meta.staleUntil).length,
+      unreadable: this.unreadable.length,
+      bytes: this.bytes,
+      maxBytes: this.maxBytes
+    };
+  }
+}
@@ -0,0 +1,50 @@
+/**
+ * Public upstream URLs <-> configured base URLs
+ * When ARCHIVE_BASE_URL, WAYBACK_BASE_URL, CDX_API_URL or VIEWS_BASE_URL
+ * point somewhere else (e.g. a local fake archive.org for load tests), the
+ * public URLs the browser asks the proxy for are sent there instead, and
+ * URLs built from the configured bases are keyed and cache-ruled as the
+ * public ones. With no overrides both mappings are the identity.
+ *
+ * Give each overridden upstream its own origin: two upstreams behind one
+ * base URL can't be told apart on the way back.
+ */
+import { config } from './config.js';
+
+const PUBLIC = {
+  cdx: 'https://web.archive.org/cdx/search/cdx',
+  wayback: 'https://web.archive.org',
+  archive: 'https://archive.org',
+  views: 'https://be-api.us.archive.org'
+};
+
+// Overridden bases only, most specific public prefix first (the CDX API
+// lives under the Wayback origin)
+const MAPPINGS = Object.entries(PUBLIC)
+  .filter(([name, base]) => config.endpoints[name] !== base)
+  .map(([name, base]) => ({ public: base, configured: config.endpoints[name] }));
+
+// Swap a prefix only on a path boundary (archive.org must not match archive.org.example)
+function swap(url, from, to) {
+  if (!url.startsWith(from)) return null;
+  const next = url[from.length];
+  return next === undefined || next === '/' || next === '?' ? to + url.slice(from.length) : null;
+}
+
+// Where a request for this URL is actually sent
+export function upstreamUrl(url) {
+  for (const mapping of MAPPINGS) {
+    const mapped = swap(url, mapping.public, mapping.configured);
+    if (mapped) return mapped;
+  }
+  return url;
+}
+
+// The public URL a configured-base URL stands for (for cache keys and rules)
+export function publicUrl(url) {
+  for (const mapping of MAPPINGS) {
+    const mapped = swap(url, mapping.configured, mapping.public);
+    if (mapped) return mapped;
+  }
+  return url;
+}
@@ -0,0 +1,245 @@
+/**
+ * Prometheus-style metrics
+ * Counters, gauges and fixed-bucket histograms rendered in the text
+ * exposition format. Recording is a Map lookup plus a few additions, so it
+ * is cheap enough for the proxy hot path; anything derived from other
+ * modules' stats is collected only when /api/metrics is scraped.
+ */
+import { monitorEventLoopDelay } from 'perf_hooks';
+
+// Latency buckets in seconds (upstream calls range from ms cache hits to slow CDX pages)
+export const LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30];
+
+const SEP = '\u0001';
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+}
+
+function formatLabels(names, values, extra = '') {
+  const parts = names.map((name, i) => `${name}="${escapeLabel(values[i])}"`);
+  if (extra) parts.push(extra);
+  return parts.length ? `{${parts.join(',')}}` : '';
+}
+
+class Metric {
+  constructor(type, name, help, labelNames = []) {
+    this.type = type;
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    this.series = new Map(); // joined label values -> state
+  }
+
+  key(labels) {
+    return labels.length === 1 ? String(labels[0]) : labels.join(SEP);
+  }
+
+  header() {
+    return `# HELP ${this.name} ${this.help}\n# TYPE ${this.name} ${this.type}\n`;
+  }
+}
+
+export class Counter extends Metric {
+  constructor(name, help, labelNames) {
+    super('counter', name, help, labelNames);
+  }
+
+  inc(labels = [], value = 1) {
+    const key = this.key(labels);
+    const series = this.series.get(key);
+    if (series) series.value += value;
+    else this.series.set(key, { labels, value });
+  }
+
+  // Replace a value collected from elsewhere (e.g. a module's stats())
+  set(labels, value) {
+    this.series.set(this.key(labels), { labels, value });
+  }
+
+  render() {
+    let out = this.header();
+    for (const { labels, value } of this.series.values()) {
+      out += `${this.name}${formatLabels(this.labelNames, labels)} ${value}\n`;
+    }
+    return out;
+  }
+}
+
+export class Gauge extends Counter {
+  constructor(name, help, labelNames) {
+    super(name, help, labelNames);
+    this.type = 'gauge';
+  }
+
+  dec(labels = [], value = 1) {
+    this.inc(labels, -value);
+  }
+}
+
+export class Histogram extends Metric {
+  constructor(name, help, labelNames, buckets = LATENCY_BUCKETS) {
+    super('histogram', name, help, labelNames);
+    this.buckets = buckets;
+  }
+
+  observe(labels, value) {
+    const key = this.key(labels);
+    let series = this.series.get(key);
+    if (!series) {
+      series = { labels, counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+      this.series.set(key, series);
+    }
+    series.sum += value;
+    series.count++;
+    for (let i = 0; i < this.buckets.length; i++) {
+      if (value <= this.buckets[i]) {
+        series.counts[i]++;
+        break;
+      }
+    }
+  }
+
+  // Start a timer; call the returned function (with labels) to record seconds elapsed
+  startTimer() {
+    const start = process.hrtime.bigint();
+    return labels => this.observe(labels, Number(process.hrtime.bigint() - start) / 1e9);
+  }
+
+  render() {
+    let out = this.header();
+    for (const { labels, counts, sum, count } of this.series.values()) {
+      let cumulative = 0;
+      for (let i = 0; i < this.buckets.length; i++) {
+        cumulative += counts[i];
+        out += `${this.name}_bucket${formatLabels(this.labelNames, labels, `le="${this.buckets[i]}"`)} ${cumulative}\n`;
+      }
+      out += `${this.name}_bucket${formatLabels(this.labelNames, labels, 'le="+Inf"')} ${count}\n`;
+      out += `${this.name}_sum${formatLabels(this.labelNames, labels)} ${sum}\n`;
+      out += `${this.name}_count${formatLabels(this.labelNames, labels)} ${count}\n`;
+    }
+    return out;
+  }
+}
+
+export class Registry {
+  constructor() {
+    this.metrics = [];
+    this.collectors = [];
+  }
+
+  counter(name, help, labelNames) {
+    return this.add(new Counter(name, help, labelNames));
+  }
+
+  gauge(name, help, labelNames) {
+    return this.add(new Gauge(name, help, labelNames));
+  }
+
+  histogram(name, help, labelNames, buckets) {
+    return this.add(new Histogram(name, help, labelNames, buckets));
+  }
+
+  add(metric) {
+    this.metrics.push(metric);
+    return metric;
+  }
+
+  // fn() runs before every render to refresh collected values
+  collect(fn) {
+    this.collectors.push(fn);
+  }
+
+  render() {
+    for (const fn of this.collectors) {
+      try {
+        fn();
+      } catch (error) {
+        console.error('Metrics collector failed:', error.message);
+      }
+    }
+    return this.metrics.map(metric => metric.render()).join('');
+  }
+}
+
+// Shared registry for the process
+export const registry = new Registry();
+
+// --- Incoming HTTP requests -----------------------------------------------
+
+const httpRequests = registry.counter(
+  'http_requests_total', 'Requests handled, by route and status (status="aborted" if the client left)', ['method', 'route', 'status']
+);
+const httpErrors = registry.counter(
+  'http_request_errors_total', 'Requests that failed with a 5xx or were aborted', ['method', 'route']
+);
+const httpDuration = registry.histogram(
+  'http_request_duration_seconds', 'Time from request arrival to the end of the response', ['method', 'route']
+);
+const httpInFlight = registry.gauge('http_requests_in_flight', 'Requests currently being handled');
+
+// Express middleware recording the metrics above. Routes are labelled by
+// their pattern (not the raw path) to keep the series count bounded.
+export function httpMetrics() {
+  return (req, res, next) => {
+    httpInFlight.inc();
+    const start = process.hrtime.bigint();
+    let recorded = false;
+    const record = () => {
+      if (recorded) return;
+      recorded = true;
+      httpInFlight.dec();
+      const route = req.route ? req.baseUrl + req.route.path : 'unmatched';
+      const status = res.writableFinished ? res.statusCode : 'aborted';
+      httpRequests.inc([req.method, route, status]);
+      httpDuration.observe([req.method, route], Number(process.hrtime.bigint() - start) / 1e9);
+      if (status === 'aborted' || status >= 500) httpErrors.inc([req.method, route]);
+    };
+    res.once('finish', record);
+    res.once('close', record);
+    next();
+  };
+}
+
+// --- Upstream calls (recorded by upstreamPool) ----------------------------
+
+export const upstreamRequests = registry.counter(
+  'upstream_requests_total', 'Upstream requests by host and status (status="error" for network failures)', ['host', 'status']
+);
+export const upstreamDuration = registry.histogram(
+  'upstream_request_duration_seconds', 'Time from sending an upstream request to its response headers', ['host']
+);
+export const upstreamQueueWait = registry.histogram(
+  'upstream_queue_wait_seconds', 'Time spent waiting for the host rate limiter', ['host', 'priority']
+);
+
+// --- Process --------------------------------------------------------------
+
+// The monitor samples with a timer every RESOLUTION_MS; what it measures
+// beyond that interval is the lag
+const RESOLUTION_MS = 20;
+const eventLoop = monitorEventLoopDelay({ resolution: RESOLUTION_MS });
+eventLoop.enable();
+const lagSeconds = nanoseconds => Math.max(0, nanoseconds / 1e9 - RESOLUTION_MS / 1000);
+
+const eventLoopLag = registry.gauge(
+  'nodejs_eventloop_lag_seconds', 'Event-loop delay since the previous scrape', ['quantile']
+);
+const eventLoopLagMax = registry.gauge('nodejs_eventloop_lag_max_seconds', 'Worst event-loop delay since the previous scrape');
+const heap = registry.gauge('nodejs_heap_bytes', 'V8 heap usage', ['kind']);
+const rss = registry.gauge('process_resident_memory_bytes', 'Resident set size');
+const uptime = registry.gauge('process_uptime_seconds', 'Seconds since the process started');
+
+registry.collect(() => {
+  for (const quantile of [0.5, 0.9, 0.99]) {
+    eventLoopLag.set([quantile], lagSeconds(eventLoop.percentile(quantile * 100)));
+  }
+  eventLoopLagMax.set([], lagSeconds(eventLoop.max));
+  eventLoop.reset();
+  const memory = process.memoryUsage();
+  heap.set(['used'], memory.heapUsed);
+  heap.set(['total'], memory.heapTotal);
+  heap.set(['external'], memory.external);
+  rss.set([], memory.rss);
+  uptime.set([], process.uptime());
+});
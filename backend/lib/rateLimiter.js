@@ -0,0 +1,190 @@
+/**
+ * Outbound rate limiting per upstream host
+ * A token bucket per host with a priority queue in front of it, so
+ * interactive requests go ahead of bulk harvests and batch jobs. Upstream
+ * 429s (and 503s with Retry-After) pause the host and halve its rate; the
+ * rate creeps back up as requests succeed again (AIMD).
+ */
+
+export const PRIORITIES = ['interactive', 'bulk', 'batch'];
+
+const WAIT_SAMPLES = 512;
+
+export class QueueFullError extends Error {
+  constructor(host) {
+    super(`Too many queued requests for ${host}`);
+    this.name = 'QueueFullError';
+  }
+}
+
+// Retry-After is either delta-seconds or an HTTP date
+export function parseRetryAfter(value, now = Date.now()) {
+  if (!value) return null;
+  const seconds = Number(value);
+  if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000);
+  const date = Date.parse(value);
+  return Number.isFinite(date) ? Math.max(0, date - now) : null;
+}
+
+class HostLimiter {
+  constructor(host, { rate, burst, minRate, maxQueue, backoffBase, backoffMax }) {
+    this.host = host;
+    this.maxRate = rate;
+    this.rate = rate;
+    // A cluster worker's share may already be below the floor
+    this.minRate = Math.min(minRate, rate);
+    this.burst = burst;
+    this.maxQueue = maxQueue;
+    this.backoffBase = backoffBase;
+    this.backoffMax = backoffMax;
+    this.tokens = burst;
+    this.refilledAt = Date.now();
+    this.pausedUntil = 0;
+    this.strikes = 0; // consecutive throttled responses
+    this.queues = PRIORITIES.map(() => []);
+    this.timer = null;
+    this.waits = [];
+    this.counters = { granted: 0, throttled: 0, rejected: 0, cancelled: 0, totalWaitMs: 0, maxWaitMs: 0 };
+    this.grantedBy = Object.fromEntries(PRIORITIES.map(p => [p, 0]));
+  }
+
+  get queued() {
+    return this.queues.reduce((sum, queue) => sum + queue.length, 0);
+  }
+
+  acquire(priority = 'interactive', signal) {
+    let level = PRIORITIES.indexOf(priority);
+    if (level < 0) level = 0;
+    if (this.queued >= this.maxQueue) {
+      this.counters.rejected++;
+      return Promise.reject(new QueueFullError(this.host));
+    }
+    return new Promise((resolve, reject) => {
+      const waiter = { resolve, reject, priority: PRIORITIES[level], enqueuedAt: Date.now(), signal, onAbort: null };
+      if (signal) {
+        if (signal.aborted) return reject(signal.reason || new Error('Request aborted'));
+        waiter.onAbort = () => {
+          const queue = this.queues[level];
+          const index = queue.indexOf(waiter);
+          if (index >= 0) queue.splice(index, 1);
+          this.counters.cancelled++;
+          reject(signal.reason || new Error('Request aborted'));
+        };
+        signal.addEventListener('abort', waiter.onAbort, { once: true });
+      }
+      this.queues[level].push(waiter);
+      this.drain();
+    });
+  }
+
+  refill(now) {
+    this.tokens = Math.min(this.burst, this.tokens + ((now - this.refilledAt) / 1000) * this.rate);
+    this.refilledAt = now;
+  }
+
+  // Hand out tokens to the highest-priority waiters, then sleep until the next one is due
+  drain() {
+    if (this.timer) return;
+    const now = Date.now();
+    this.refill(now);
+    if (now >= this.pausedUntil) {
+      for (const queue of this.queues) {
+        while (queue.length && this.tokens >= 1) {
+          this.tokens--;
+          this.grant(queue.shift(), now);
+        }
+      }
+    }
+    if (this.queued === 0) return;
+    const tokenDue = this.tokens >= 1 ? 0 : ((1 - this.tokens) / this.rate) * 1000;
+    const delay = Math.max(this.pausedUntil - now, tokenDue, 1);
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.drain();
+    }, delay);
+  }
+
+  grant(waiter, now) {
+    if (waiter.signal) waiter.signal.removeEventListener('abort', waiter.onAbort);
+    const waited = now - waiter.enqueuedAt;
+    this.counters.granted++;
+    this.grantedBy[waiter.priority]++;
+    this.counters.totalWaitMs += waited;
+    this.counters.maxWaitMs = Math.max(this.counters.maxWaitMs, waited);
+    this.waits.push(waited);
+    if (this.waits.length > WAIT_SAMPLES) this.waits.shift();
+    waiter.resolve(waited);
+  }
+
+  /**
+   * Feed back an upstream response. Returns the pause in ms when the host
+   * throttled us, otherwise 0.
+   */
+  observe(status, retryAfterHeader) {
+    const retryAfter = parseRetryAfter(retryAfterHeader);
+    if (status === 429 || (status === 503 && retryAfter !== null)) {
+      this.counters.throttled++;
+      this.strikes++;
+      const backoff = Math.min(this.backoffMax, this.backoffBase * 2 ** (this.strikes - 1));
+      const pause = Math.min(this.backoffMax, retryAfter ?? backoff);
+      this.pausedUntil = Math.max(this.pausedUntil, Date.now() + pause);
+      this.rate = Math.max(this.minRate, this.rate / 2);
+      this.tokens = Math.min(this.tokens, 0);
+      return pause;
+    }
+    if (status < 500) {
+      this.strikes = 0;
+      if (this.rate < this.maxRate) {
+        this.rate = Math.min(this.maxRate, this.rate + this.maxRate / 20);
+      }
+    }
+    return 0;
+  }
+
+  stats() {
+    const sorted = [...this.waits].sort((a, b) => a - b);
+    const pct = p => (sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))] : 0);
+    return {
+      ...this.counters,
+      grantedBy: { ...this.grantedBy },
+      queued: this.queued,
+      queuedBy: Object.fromEntries(PRIORITIES.map((p, i) => [p, this.queues[i].length])),
+      rate: Math.round(this.rate * 100) / 100,
+      maxRate: this.maxRate,
+      pausedForMs: Math.max(0, this.pausedUntil - Date.now()),
+      avgWaitMs: this.counters.granted ? Math.round(this.counters.totalWaitMs / this.counters.granted) : 0,
+      p50WaitMs: pct(0.5),
+      p95WaitMs: pct(0.95)
+    };
+  }
+}
+
+export class RateLimiter {
+  constructor(options) {
+    this.options = options;
+    this.hosts = new Map();
+  }
+
+  forHost(host) {
+    let limiter = this.hosts.get(host);
+    if (!limiter) {
+      limiter = new HostLimiter(host, this.options);
+      this.hosts.set(host, limiter);
+    }
+    return limiter;
+  }
+
+  acquire(host, priority, signal) {
+    return this.forHost(host).acquire(priority, signal);
+  }
+
+  observe(host, status, retryAfter) {
+    return this.forHost(host).observe(status, retryAfter);
+  }
+
+  stats() {
+    const stats = {};
+    for (const [host, limiter] of this.hosts) stats[host] = limiter.stats();
+    return stats;
+  }
+}
@@ -0,0 +1,268 @@
+/**
+ * In-memory LRU + TTL response cache
+ * Bounded by total body bytes (compressed variants included), with
+ * stale-while-revalidate support and an optional persistent tier underneath
+ * (see diskCache.js)
+ */
+import crypto from 'crypto';
+import { CACHE_RULES } from './config.js';
+import { publicUrl } from './endpoints.js';
+
+// Find the freshness rule for an upstream URL (only idempotent GETs are cacheable)
+export function cacheRuleFor(url, method = 'GET') {
+  if (method.toUpperCase() !== 'GET') return null;
+  try {
+    const parsed = new URL(publicUrl(url));
+    const target = `${parsed.hostname.toLowerCase()}${parsed.pathname}`;
+    return CACHE_RULES.find(rule => rule.match.test(target)) || null;
+  } catch {
+    return null;
+  }
+}
+
+// Normalize method + URL so equivalent requests share an entry:
+// lowercase host, no default port or fragment, query parameters sorted by
+// name (stable, so repeated keys like sort[] keep their relative order).
+// URLs on a configured stand-in are keyed as the public URL they replace.
+export function cacheKey(method, url, scope = '') {
+  const parsed = new URL(publicUrl(url));
+  parsed.hash = '';
+  parsed.hostname = parsed.hostname.toLowerCase();
+  const params = [...parsed.searchParams.entries()].sort((a, b) =>
+    a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0
+  );
+  parsed.search = new URLSearchParams(params).toString();
+  return `${method.toUpperCase()} ${parsed.toString()}${scope ? ` [${scope}]` : ''}`;
+}
+
+// Cache scope for authenticated calls - never the key itself
+export function credentialScope(accessKey) {
+  return 'auth:' + crypto.createHash('sha256').update(accessKey).digest('hex').substring(0, 16);
+}
+
+const encodedBytes = encoded => Object.values(encoded).reduce((sum, buffer) => sum + buffer.length, 0);
+
+export class ResponseCache {
+  /**
+   * @param store      lower tier with async get(key) / set(key, entry, ruleName)
+   * @param persist    which keys may be written to the store
+   * @param precompress async entry => { br, gzip } | null, stored alongside
+   *                   the body so hits can be sent compressed as-is
+   */
+  constructor({ maxBytes, maxEntryBytes, store = null, persist = () => true, precompress = null }) {
+    this.maxBytes = maxBytes;
+    this.maxEntryBytes = maxEntryBytes;
+    this.store = store;
+    this.persist = persist;
+    this.precompress = precompress;
+    this.entries = new Map(); // insertion order doubles as LRU order
+    this.bytes = 0;
+    this.revalidating = new Set();
+    this.encoding = new WeakMap(); // entry -> pending precompression
+    this.counters = {
+      hits: 0,
+      staleHits: 0,
+      misses: 0,
+      evictions: 0,
+      expirations: 0,
+      revalidations: 0,
+      revalidationErrors: 0,
+      oversized: 0,
+      storeHits: 0,
+      storeErrors: 0,
+      precompressErrors: 0,
+      // Served past their stale window while the upstream's circuit was open
+      fallbackHits: 0
+    };
+  }
+
+  /**
+   * Look up a key. Returns { entry, stale, expired } or null.
+   * Entries past their stale window are dropped, unless allowExpired (the
+   * upstream is known to be down, so an old answer beats none).
+   */
+  get(key, { allowExpired = false } = {}) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.counters.misses++;
+      return null;
+    }
+    const now = Date.now();
+    const expired = now > entry.staleUntil;
+    if (expired && !allowExpired) {
+      this.delete(key);
+      this.counters.expirations++;
+      this.counters.misses++;
+      return null;
+    }
+    // Move to most-recently-used position
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    const stale = now > entry.expiresAt;
+    if (expired) {
+      this.counters.fallbackHits++;
+    } else if (stale) {
+      this.counters.staleHits++;
+    } else {
+      this.counters.hits++;
+    }
+    return { entry, stale, expired };
+  }
+
+  /**
+   * Like get(), but falls through to the persistent store on a memory miss
+   * and promotes what it finds there
+   */
+  async lookup(key, { allowExpired = false } = {}) {
+    const hit = this.get(key, { allowExpired });
+    if (hit || !this.store) return hit;
+    let entry;
+    try {
+      entry = await this.store.get(key, { allowExpired });
+    } catch (error) {
+      this.counters.storeErrors++;
+      console.error(`Cache store read failed for ${key}:`, error.message);
+      return null;
+    }
+    if (!entry || !this.adopt(key, entry)) return null;
+    this.counters.storeHits++;
+    const now = Date.now();
+    return { entry: this.entries.get(key), stale: now > entry.expiresAt, expired: now > entry.staleUntil };
+  }
+
+  set(key, { body, status = 200, contentType = 'application/json' }, { ttl, swr = 0, name = null }) {
+    const now = Date.now();
+    const entry = {
+      body,
+      status,
+      contentType,
+      size: body.length,
+      storedAt: now,
+      expiresAt: now + ttl,
+      staleUntil: now + ttl + swr
+    };
+    const stored = this.adopt(key, entry);
+    if (stored && this.store && this.persist(key)) {
+      // Written once the compressed variants exist, so disk hits have them too
+      this.encode(key, entry)
+        .then(() => this.store.set(key, entry, name))
+        .catch(error => {
+          this.counters.storeErrors++;
+          console.error(`Cache store write failed for ${key}:`, error.message);
+        });
+    }
+    return stored;
+  }
+
+  // Insert an entry with its own expiry times (no write-through)
+  adopt(key, entry) {
+    if (entry.size > this.maxEntryBytes) {
+      this.counters.oversized++;
+      return false;
+    }
+    this.delete(key);
+    this.entries.set(key, entry);
+    // Entries read back from the store arrive with their variants
+    if (entry.encoded) entry.encodedSize = encodedBytes(entry.encoded);
+    this.bytes += entry.size + (entry.encodedSize || 0);
+    this.evict();
+    this.encode(key, entry);
+    return true;
+  }
+
+  /**
+   * Attach compressed variants to an entry (once; entries read back from the
+   * store may have them already). Never rejects: an entry without variants
+   * is still served, just compressed on the fly.
+   */
+  encode(key, entry) {
+    if (!this.precompress || entry.encoded) return Promise.resolve();
+    let pending = this.encoding.get(entry);
+    if (pending) return pending;
+    pending = this.precompress(entry)
+      .then(encoded => {
+        if (!encoded) return;
+        entry.encoded = encoded;
+        // Variants count against the budget only while the entry is live
+        if (this.entries.get(key) === entry) {
+          entry.encodedSize = encodedBytes(encoded);
+          this.bytes += entry.encodedSize;
+          this.evict();
+        }
+      })
+      .catch(error => {
+        this.counters.precompressErrors++;
+        console.error(`Cache precompression failed for ${key}:`, error.message);
+      });
+    this.encoding.set(entry, pending);
+    return pending;
+  }
+
+  // Pre-load the store's most requested entries into memory
+  async warm(limit) {
+    if (!this.store || limit <= 0) return 0;
+    let warmed = 0;
+    for (const { key, entry } of await this.store.popular(limit)) {
+      if (this.adopt(key, entry)) warmed++;
+    }
+    return warmed;
+  }
+
+  delete(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return false;
+    this.bytes -= entry.size + (entry.encodedSize || 0);
+    this.entries.delete(key);
+    return true;
+  }
+
+  // Drop least-recently-used entries until we fit the byte budget
+  evict() {
+    for (const key of this.entries.keys()) {
+      if (this.bytes <= this.maxBytes) break;
+      this.delete(key);
+      this.counters.evictions++;
+    }
+  }
+
+  /**
+   * Refresh a stale entry in the background; concurrent calls for the same
+   * key start only one refresh. fetcher() resolves to the value for set().
+   */
+  revalidate(key, rule, fetcher) {
+    if (this.revalidating.has(key)) return;
+    this.revalidating.add(key);
+    this.counters.revalidations++;
+    Promise.resolve()
+      .then(fetcher)
+      .then(value => {
+        if (value) this.set(key, value, rule);
+      })
+      .catch(error => {
+        this.counters.revalidationErrors++;
+        // An open circuit refuses instantly; the breaker already logged why
+        if (error.name !== 'CircuitOpenError') {
+          console.error(`Cache revalidation failed for ${key}:`, error.message);
+        }
+      })
+      .finally(() => this.revalidating.delete(key));
+  }
+
+  clear() {
+    this.entries.clear();
+    this.bytes = 0;
+  }
+
+  stats() {
+    const served = this.counters.hits + this.counters.staleHits + this.counters.fallbackHits;
+    const lookups = served + this.counters.misses;
+    return {
+      ...this.counters,
+      entries: this.entries.size,
+      bytes: this.bytes,
+      maxBytes: this.maxBytes,
+      hitRatio: lookups ? (served + this.counters.storeHits) / lookups : 0,
+      store: this.store ? this.store.stats() : null
+    };
+  }
+}
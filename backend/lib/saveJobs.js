@@ -0,0 +1,596 @@
+/**
+ * SavePageNow batch jobs
+ * A job is a list of URLs to capture. URLs are submitted to SPN with at most
+ * `concurrency` captures in flight and at most `perMinute` submissions a
+ * minute, then polled until SPN reports success or failure. Throttling
+ * (429, SPN's "too many captures" errors) pauses all submissions for the
+ * advertised time; transient failures are retried with backoff.
+ *
+ * Jobs are saved to data/save-jobs/<id>.json (debounced) and resumed on
+ * startup: queued URLs are submitted, pending captures polled again. Every
+ * job file names the process running it. A standalone server adopts jobs of
+ * processes that died. Under cluster.js only the worker the primary names
+ * the runner runs jobs (so the SPN budget is spent once per host and no job
+ * is adopted twice); the others write new jobs for it to pick up.
+ */
+import crypto from 'crypto';
+import { EventEmitter } from 'events';
+import fs from 'fs/promises';
+import path from 'path';
+import { upstreamFetch } from './upstreamPool.js';
+import { parseRetryAfter } from './rateLimiter.js';
+
+export const ITEM_STATES = ['queued', 'submitting', 'pending', 'success', 'error', 'cancelled'];
+
+// Job ids as create() makes them; anything else never names a job file
+const JOB_ID = /^[0-9a-f]{12}$/;
+
+export function isJobId(id) {
+  return typeof id === 'string' && JOB_ID.test(id);
+}
+
+const THROTTLE_STATUS = /too-many|session-limit|rate-limit/i;
+const MIN_TICK_MS = 50;
+const IDLE_TICK_MS = 1000;
+// How often to look for jobs to pick up and finished jobs to expire
+const SWEEP_INTERVAL_MS = 60 * 1000;
+
+class SaveError extends Error {
+  constructor(message, { retryable = false, throttled = false, retryAfter = null, auth = false } = {}) {
+    super(message);
+    this.retryable = retryable;
+    this.throttled = throttled;
+    this.retryAfter = retryAfter;
+    this.auth = auth;
+  }
+}
+
+function isAlive(pid) {
+  if (pid === process.pid) return true;
+  try {
+    process.kill(pid, 0);
+    return true;
+  } catch (error) {
+    return error.code === 'EPERM';
+  }
+}
+
+// A job file's contents, checked before use (files are shared between workers
+// and may be truncated, hand-edited or not ours)
+function isJob(job, id) {
+  return !!job && typeof job === 'object' && job.id === id &&
+    Array.isArray(job.items) &&
+    job.items.every(item => !!item && typeof item === 'object' && typeof item.url === 'string' && ITEM_STATES.includes(item.state));
+}
+
+function emptyCounts() {
+  return Object.fromEntries(ITEM_STATES.map(state => [state, 0]));
+}
+
+export class SaveJobQueue extends EventEmitter {
+  /**
+   * @param credentials async () => { accessKey, secretKey } | null
+   * @param saveUrl     SPN endpoint (https://web.archive.org/save)
+   * @param coordinated jobs run only after becomeRunner() (cluster workers)
+   */
+  constructor({ dir, saveUrl, credentials, concurrency, perMinute, pollInterval, captureTimeout, maxAttempts, retention, persistInterval, coordinated = false }) {
+    super();
+    this.setMaxListeners(0);
+    this.dir = dir;
+    this.saveUrl = saveUrl;
+    this.credentials = credentials;
+    this.concurrency = concurrency;
+    this.submitInterval = 60 * 1000 / perMinute;
+    this.pollInterval = pollInterval;
+    this.captureTimeout = captureTimeout;
+    this.maxAttempts = maxAttempts;
+    this.retention = retention;
+    this.persistInterval = persistInterval;
+    this.coordinated = coordinated;
+    this.runner = !coordinated;  // whether this process runs jobs
+    this.jobs = new Map();       // jobs run by this process
+    this.order = [];             // job ids, rotated for round-robin submission
+    this.inFlight = 0;           // items submitting or pending
+    this.nextSubmitAt = 0;
+    this.pausedUntil = 0;
+    this.blocked = null;         // why nothing can be submitted (no credentials, ...)
+    this.dirty = new Set();
+    this.timer = null;
+    this.timerAt = 0;
+    this.counters = { submitted: 0, succeeded: 0, failed: 0, retried: 0, throttled: 0, polls: 0 };
+  }
+
+  // Resume jobs left behind by dead processes (if we run jobs) and start
+  // the periodic persist/sweep
+  async load() {
+    await fs.mkdir(this.dir, { recursive: true });
+    await this.sweep();
+    setInterval(() => this.flush().catch(error => console.error('Save job persist failed:', error.message)), this.persistInterval).unref();
+    setInterval(() => this.sweep().catch(() => {}), SWEEP_INTERVAL_MS).unref();
+    return this;
+  }
+
+  // Start running jobs, picking up every unfinished one (cluster.js names
+  // one runner at a time, after the previous one has exited)
+  async becomeRunner() {
+    if (this.runner) return;
+    this.runner = true;
+    console.log(`📸 Worker ${process.pid} now runs the save jobs`);
+    await this.sweep();
+  }
+
+  /**
+   * Forget and delete finished jobs past retention, and pick up unfinished
+   * jobs nobody runs: new ones written by other workers, or those of a
+   * process that died
+   */
+  async sweep() {
+    const now = Date.now();
+    const expired = job => job.finishedAt && now - job.finishedAt > this.retention;
+    for (const job of [...this.jobs.values()]) {
+      if (expired(job)) await this.forget(job.id);
+    }
+    for (const name of await fs.readdir(this.dir)) {
+      if (!name.endsWith('.json')) continue;
+      const id = name.slice(0, -'.json'.length);
+      if (this.jobs.has(id)) continue;
+      const job = await this.read(id);
+      // (an overlapping sweep may have adopted it meanwhile)
+      if (!job || this.jobs.has(id)) continue;
+      if (expired(job)) {
+        await fs.unlink(path.join(this.dir, name)).catch(() => {});
+        continue;
+      }
+      if (!this.runner || job.finishedAt) continue;
+      // A coordinated runner is the only one; standalone, the owner must be gone
+      if (this.coordinated || !isAlive(job.owner)) this.adopt(job);
+    }
+    this.schedule(0);
+  }
+
+  adopt(job) {
+    job.owner = process.pid;
+    for (const item of job.items) {
+      // A submission cut off by the restart may or may not have reached SPN;
+      // submitting again is harmless (SPN folds recent duplicates)
+      if (item.state === 'submitting') item.state = 'queued';
+      delete item.polling;
+      if (item.state === 'pending') this.inFlight++;
+    }
+    job.counts = this.count(job);
+    job.queue = job.items.flatMap((item, index) => (item.state === 'queued' ? [index] : []));
+    this.jobs.set(job.id, job);
+    this.order.push(job.id);
+    this.markDirty(job);
+    console.log(`📸 Resumed save job ${job.id} (${job.counts.queued} queued, ${job.counts.pending} pending)`);
+  }
+
+  file(id) {
+    return path.join(this.dir, `${id}.json`);
+  }
+
+  // A saved job, or null if the id is malformed or the file missing or invalid
+  async read(id) {
+    if (!isJobId(id)) return null;
+    try {
+      const job = JSON.parse(await fs.readFile(this.file(id), 'utf8'));
+      return isJob(job, id) ? job : null;
+    } catch {
+      return null;
+    }
+  }
+
+  count(job) {
+    const counts = emptyCounts();
+    for (const item of job.items) counts[item.state]++;
+    return counts;
+  }
+
+  /**
+   * Queue a new job. Without the runner role it is only written to disk for
+   * the runner to pick up (see sweep()).
+   */
+  async create(urls, options = {}) {
+    const now = Date.now();
+    const job = {
+      id: crypto.randomBytes(6).toString('hex'),
+      owner: this.runner ? process.pid : null,
+      createdAt: now,
+      updatedAt: now,
+      finishedAt: null,
+      cancelled: false,
+      options: {
+        captureAll: options.captureAll !== false,
+        captureOutlinks: !!options.captureOutlinks,
+        captureScreenshot: !!options.captureScreenshot
+      },
+      items: urls.map(url => ({ url, state: 'queued', attempts: 0 })),
+      counts: null,
+      queue: urls.map((url, index) => index)
+    };
+    job.counts = this.count(job);
+    if (!this.runner) {
+      await this.write(job);
+      return job;
+    }
+    this.jobs.set(job.id, job);
+    this.order.push(job.id);
+    this.markDirty(job);
+    this.schedule(0);
+    return job;
+  }
+
+  // --- Scheduling -----------------------------------------------------------
+
+  // Run tick() after delay ms, unless it is already due sooner
+  schedule(delay) {
+    const at = Date.now() + Math.max(delay, 0);
+    if (this.timer) {
+      if (this.timerAt <= at) return;
+      clearTimeout(this.timer);
+    }
+    this.timerAt = at;
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.tick().catch(error => console.error('Save job scheduler failed:', error));
+    }, Math.max(delay, 0));
+    this.timer.unref();
+  }
+
+  async tick() {
+    const now = Date.now();
+    let wake = now + IDLE_TICK_MS;
+    const busy = [...this.jobs.values()].some(job => !job.finishedAt);
+    if (!busy) return;
+
+    if (this.hasQueued() && now >= this.pausedUntil) {
+      const creds = await this.credentials();
+      this.setBlocked(creds ? null : 'Credentials not configured');
+      while (creds && this.inFlight < this.concurrency && Date.now() >= this.nextSubmitAt) {
+        const next = this.nextQueued(Date.now());
+        if (!next) break;
+        this.nextSubmitAt = Date.now() + this.submitInterval;
+        this.submit(next.job, next.index, creds);
+      }
+      if (this.inFlight < this.concurrency) wake = Math.min(wake, this.nextSubmitAt);
+    } else if (this.pausedUntil > now) {
+      wake = Math.min(wake, this.pausedUntil);
+    }
+
+    for (const job of this.jobs.values()) {
+      for (let index = 0; index < job.items.length; index++) {
+        const item = job.items[index];
+        if (item.state !== 'pending') continue;
+        if (item.nextPollAt <= now && !item.polling) this.poll(job, index);
+        else if (!item.polling) wake = Math.min(wake, item.nextPollAt);
+      }
+      if (job.queue.length) wake = Math.min(wake, Math.max(now, job.items[job.queue[0]].nextAt || 0));
+    }
+    this.schedule(Math.max(MIN_TICK_MS, wake - Date.now()));
+  }
+
+  hasQueued() {
+    for (const job of this.jobs.values()) {
+      if (job.queue.length && !job.cancelled) return true;
+    }
+    return false;
+  }
+
+  // Next URL due for submission, taking jobs in turn
+  nextQueued(now) {
+    for (let turn = 0; turn < this.order.length; turn++) {
+      const id = this.order.shift();
+      this.order.push(id);
+      const job = this.jobs.get(id);
+      if (!job || job.cancelled) continue;
+      const position = job.queue.findIndex(index => !(job.items[index].nextAt > now));
+      if (position < 0) continue;
+      const [index] = job.queue.splice(position, 1);
+      return { job, index };
+    }
+    return null;
+  }
+
+  setBlocked(reason) {
+    if (this.blocked === reason) return;
+    this.blocked = reason;
+    for (const job of this.jobs.values()) {
+      if (!job.finishedAt) this.emit('progress', this.summary(job));
+    }
+  }
+
+  // --- SPN calls --------------------------------------------------------------
+
+  authHeaders(creds) {
+    return {
+      Accept: 'application/json',
+      Authorization: `LOW ${creds.accessKey}:${creds.secretKey}`
+    };
+  }
+
+  async submit(job, index, creds) {
+    const item = job.items[index];
+    this.inFlight++;
+    item.attempts++;
+    this.setState(job, index, 'submitting');
+    const form = new URLSearchParams({ url: item.url });
+    if (job.options.captureAll) form.set('capture_all', '1');
+    if (job.options.captureOutlinks) form.set('capture_outlinks', '1');
+    if (job.options.captureScreenshot) form.set('capture_screenshot', '1');
+    try {
+      const response = await upstreamFetch(this.saveUrl, {
+        method: 'POST',
+        headers: { ...this.authHeaders(creds), 'Content-Type': 'application/x-www-form-urlencoded' },
+        body: form.toString(),
+        priority: 'batch'
+      });
+      const data = await this.readJson(response);
+      if (!data.job_id) {
+        throw new SaveError(data.message || data.status_ext || 'SavePageNow did not start a capture', {
+          throttled: THROTTLE_STATUS.test(data.status_ext || '')
+        });
+      }
+      this.counters.submitted++;
+      item.captureId = data.job_id;
+      item.submittedAt = Date.now();
+      item.nextPollAt = Date.now() + this.pollInterval;
+      this.setState(job, index, 'pending');
+      this.schedule(this.pollInterval);
+    } catch (error) {
+      this.inFlight--;
+      this.handleError(job, index, error);
+    }
+  }
+
+  async poll(job, index) {
+    const item = job.items[index];
+    item.polling = true;
+    this.counters.polls++;
+    try {
+      const creds = await this.credentials();
+      if (!creds) throw new SaveError('Credentials not configured', { retryable: true });
+      const response = await upstreamFetch(`${this.saveUrl}/status/${encodeURIComponent(item.captureId)}`, {
+        headers: this.authHeaders(creds),
+        priority: 'batch'
+      });
+      const data = await this.readJson(response);
+      if (data.status === 'success') {
+        this.inFlight--;
+        this.counters.succeeded++;
+        item.timestamp = data.timestamp;
+        item.snapshotUrl = `https://web.archive.org/web/${data.timestamp}/${data.original_url || item.url}`;
+        this.setState(job, index, 'success');
+      } else if (data.status === 'error') {
+        this.inFlight--;
+        this.handleError(job, index, new SaveError(data.message || data.status_ext || 'Capture failed', {
+          throttled: THROTTLE_STATUS.test(data.status_ext || '')
+        }));
+      } else if (Date.now() - item.submittedAt > this.captureTimeout) {
+        this.inFlight--;
+        this.handleError(job, index, new SaveError('Capture did not finish in time'));
+      } else {
+        item.nextPollAt = Date.now() + this.pollInterval;
+      }
+    } catch (error) {
+      // Could not ask; keep the capture and ask again later
+      item.nextPollAt = Date.now() + this.pollInterval;
+      if (Date.now() - item.submittedAt > this.captureTimeout) {
+        this.inFlight--;
+        this.handleError(job, index, new SaveError(`Capture status unknown: ${error.message}`));
+      }
+    } finally {
+      delete item.polling;
+      this.markDirty(job);
+      this.schedule(this.pollInterval);
+    }
+  }
+
+  async readJson(response) {
+    const text = await response.text();
+    if (response.status === 429) {
+      throw new SaveError('SavePageNow is throttling captures', {
+        throttled: true,
+        retryAfter: parseRetryAfter(response.headers.get('retry-after'))
+      });
+    }
+    if (response.status === 401 || response.status === 403) {
+      throw new SaveError(`SavePageNow rejected the credentials (status ${response.status})`, { auth: true });
+    }
+    if (response.status >= 500) {
+      throw new SaveError(`SavePageNow returned status ${response.status}`, { retryable: true });
+    }
+    try {
+      return JSON.parse(text);
+    } catch {
+      throw new SaveError(`Unexpected SavePageNow response (status ${response.status})`, { retryable: true });
+    }
+  }
+
+  handleError(job, index, error) {
+    const item = job.items[index];
+    const now = Date.now();
+    if (error.throttled || error.auth) {
+      // Not this URL's fault: put it back and hold off everything
+      if (error.throttled) {
+        this.counters.throttled++;
+        this.pausedUntil = Math.max(this.pausedUntil, now + (error.retryAfter ?? 60 * 1000));
+      } else {
+        this.setBlocked(error.message);
+        this.pausedUntil = Math.max(this.pausedUntil, now + 60 * 1000);
+      }
+      item.attempts--;
+      this.requeue(job, index, 0);
+      return;
+    }
+    // Network failures (fetch TypeErrors, undici errors) are worth another try
+    const retryable = error.retryable || error.name === 'TypeError' || String(error.code).startsWith('UND_ERR');
+    if (retryable && item.attempts < this.maxAttempts) {
+      this.counters.retried++;
+      item.error = error.message;
+      this.requeue(job, index, Math.min(2 ** item.attempts * 5 * 1000, 5 * 60 * 1000));
+      return;
+    }
+    this.counters.failed++;
+    item.error = error.message;
+    this.setState(job, index, 'error');
+  }
+
+  requeue(job, index, delay) {
+    const item = job.items[index];
+    delete item.captureId;
+    if (job.cancelled) {
+      this.setState(job, index, 'cancelled');
+      return;
+    }
+    item.nextAt = delay ? Date.now() + delay : undefined;
+    job.queue.push(index);
+    this.setState(job, index, 'queued');
+    this.schedule(delay);
+  }
+
+  // --- State ------------------------------------------------------------------
+
+  setState(job, index, state) {
+    const item = job.items[index];
+    job.counts[item.state]--;
+    job.counts[state]++;
+    item.state = state;
+    if (state === 'success' || state === 'cancelled') delete item.error;
+    job.updatedAt = Date.now();
+    this.markDirty(job);
+    this.emit('item', job.id, { index, ...this.publicItem(item) });
+    if (!job.finishedAt && job.counts.queued + job.counts.submitting + job.counts.pending === 0) {
+      job.finishedAt = Date.now();
+      job.queue = [];
+      console.log(`📸 Save job ${job.id} finished: ${job.counts.success} saved, ${job.counts.error} failed`);
+    }
+    this.emit('progress', this.summary(job));
+  }
+
+  cancel(id) {
+    const job = this.jobs.get(id);
+    if (!job) return null;
+    job.cancelled = true;
+    // Captures already started run to completion; nothing else is submitted
+    for (const index of job.queue.splice(0)) this.setState(job, index, 'cancelled');
+    return this.summary(job);
+  }
+
+  retry(id) {
+    const job = this.jobs.get(id);
+    if (!job) return null;
+    const failed = job.items.flatMap((item, index) => (item.state === 'error' || item.state === 'cancelled' ? [index] : []));
+    if (failed.length === 0) return this.summary(job);
+    job.cancelled = false;
+    job.finishedAt = null;
+    for (const index of failed) {
+      job.items[index].attempts = 0;
+      this.requeue(job, index, 0);
+    }
+    return this.summary(job);
+  }
+
+  // Delete a finished job; false if it is still running (here or elsewhere)
+  // or there is no such job
+  async remove(id) {
+    const job = this.jobs.get(id) || await this.read(id);
+    if (!job || !job.finishedAt) return false;
+    await this.forget(id);
+    return true;
+  }
+
+  async forget(id) {
+    if (!isJobId(id)) return;
+    this.jobs.delete(id);
+    this.order = this.order.filter(other => other !== id);
+    this.dirty.delete(id);
+    await fs.unlink(this.file(id)).catch(() => {});
+  }
+
+  markDirty(job) {
+    this.dirty.add(job.id);
+  }
+
+  // Write changed jobs (called periodically and on shutdown)
+  async flush() {
+    const ids = [...this.dirty];
+    this.dirty.clear();
+    for (const id of ids) {
+      const job = this.jobs.get(id);
+      if (job) await this.write(job);
+    }
+  }
+
+  async write(job) {
+    const { queue, ...saved } = job;
+    const file = this.file(job.id);
+    const tmp = `${file}.${process.pid}.tmp`;
+    await fs.writeFile(tmp, JSON.stringify(saved));
+    await fs.rename(tmp, file);
+  }
+
+  // --- Views ------------------------------------------------------------------
+
+  publicItem({ url, state, attempts, error, timestamp, snapshotUrl }) {
+    return { url, state, attempts, error, timestamp, snapshotUrl };
+  }
+
+  summary(job) {
+    return {
+      id: job.id,
+      createdAt: job.createdAt,
+      updatedAt: job.updatedAt,
+      finishedAt: job.finishedAt,
+      cancelled: job.cancelled,
+      options: job.options,
+      total: job.items.length,
+      counts: { ...job.counts },
+      blocked: job.owner === process.pid && !job.finishedAt ? this.blocked : null,
+      pausedUntil: this.pausedUntil > Date.now() ? this.pausedUntil : null
+    };
+  }
+
+  /**
+   * A job with its items (optionally only those in one state). Jobs run by
+   * another worker are read from their last saved state.
+   */
+  async get(id, { state = null } = {}) {
+    const job = this.jobs.get(id) || await this.read(id);
+    if (!job) return null;
+    job.counts = job.counts || this.count(job);
+    const items = job.items
+      .map((item, index) => ({ index, ...this.publicItem(item) }))
+      .filter(item => !state || item.state === state);
+    return { ...this.summary(job), items };
+  }
+
+  async list() {
+    const ids = new Set(this.jobs.keys());
+    for (const name of await fs.readdir(this.dir).catch(() => [])) {
+      const id = name.slice(0, -'.json'.length);
+      if (name.endsWith('.json') && isJobId(id)) ids.add(id);
+    }
+    const jobs = [];
+    for (const id of ids) {
+      const job = this.jobs.get(id) || await this.read(id);
+      if (job) jobs.push(this.summary({ ...job, counts: job.counts || this.count(job) }));
+    }
+    return jobs.sort((a, b) => b.createdAt - a.createdAt);
+  }
+
+  isLocal(id) {
+    return this.jobs.has(id);
+  }
+
+  stats() {
+    return {
+      ...this.counters,
+      runner: this.runner,
+      jobs: this.jobs.size,
+      active: [...this.jobs.values()].filter(job => !job.finishedAt).length,
+      inFlight: this.inFlight,
+      paused: this.pausedUntil > Date.now(),
+      blocked: this.blocked
+    };
+  }
+}
@@ -0,0 +1,87 @@
+/**
+ * Request coalescing (single-flight)
+ * Concurrent calls with the same key share one in-flight upstream fetch
+ */
+
+export class SingleFlight {
+  constructor() {
+    this.calls = new Map();
+    this.counters = {
+      leaders: 0,    // calls that started an upstream fetch
+      coalesced: 0,  // calls that joined one already in flight
+      errors: 0,
+      cancelled: 0   // upstream fetches aborted because every waiter left
+    };
+  }
+
+  /**
+   * Run fn(signal) once per key while it is in flight and fan the result
+   * (or error) out to every caller. A caller's own signal only detaches that
+   * caller; the shared fetch is aborted when the last waiter detaches.
+   */
+  do(key, fn, { signal } = {}) {
+    let call = this.calls.get(key);
+    if (call) {
+      this.counters.coalesced++;
+    } else {
+      const controller = new AbortController();
+      call = { controller, waiters: 0 };
+      call.promise = Promise.resolve()
+        .then(() => fn(controller.signal))
+        .catch(error => {
+          if (!controller.signal.aborted) this.counters.errors++;
+          throw error;
+        })
+        .finally(() => {
+          if (this.calls.get(key) === call) this.calls.delete(key);
+        });
+      // Waiters attach their own handlers; keep this one from surfacing as unhandled
+      call.promise.catch(() => {});
+      this.calls.set(key, call);
+      this.counters.leaders++;
+    }
+
+    call.waiters++;
+    return new Promise((resolve, reject) => {
+      let settled = false;
+      const detach = () => {
+        settled = true;
+        call.waiters--;
+        if (signal) signal.removeEventListener('abort', onAbort);
+      };
+      const onAbort = () => {
+        if (settled) return;
+        detach();
+        if (call.waiters === 0) {
+          // Nobody is left to receive the result - stop the upstream fetch and
+          // make sure later callers start a fresh one
+          if (this.calls.get(key) === call) this.calls.delete(key);
+          call.controller.abort();
+          this.counters.cancelled++;
+        }
+        reject(signal.reason || new Error('Request aborted'));
+      };
+
+      if (signal) {
+        if (signal.aborted) return onAbort();
+        signal.addEventListener('abort', onAbort, { once: true });
+      }
+      call.promise.then(
+        value => {
+          if (settled) return;
+          detach();
+          resolve(value);
+        },
+        error => {
+          if (settled) return;
+          detach();
+          reject(error);
+        }
+      );
+    });
+  }
+
+  stats() {
+    return { ...this.counters, inFlight: this.calls.size };
+  }
+}
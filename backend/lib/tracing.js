@@ -0,0 +1,237 @@
+/**
+ * Request tracing
+ * A trace follows one sampled client request (X-Trace-Id from the browser,
+ * or generated here) and records a span per upstream call with its timing
+ * breakdown:
+ *   queue     waiting for the host rate limiter
+ *   connect   TCP + TLS handshake (0 when a pooled connection was reused)
+ *   ttfb      request sent -> response headers
+ *   transfer  response headers -> last body byte
+ * plus, for the request as a whole, serialize: last upstream byte (or the
+ * handler start, if nothing went upstream) -> response fully written.
+ * Upstream phases come from undici's diagnostics_channel events, matched to
+ * spans through AsyncLocalStorage. Unsampled requests skip all of this.
+ */
+import { AsyncLocalStorage } from 'async_hooks';
+import crypto from 'crypto';
+import diagnosticsChannel from 'diagnostics_channel';
+
+const TRACE_ID = /^[A-Za-z0-9-]{8,64}$/;
+
+const traceStore = new AsyncLocalStorage();
+const spanStore = new AsyncLocalStorage();
+
+const now = () => performance.now();
+const round = ms => (ms === null ? null : Math.round(ms * 100) / 100);
+
+export function newTraceId() {
+  return crypto.randomBytes(8).toString('hex');
+}
+
+class UpstreamSpan {
+  constructor(trace, host, priority) {
+    this.trace = trace;
+    this.host = host;
+    this.priority = priority;
+    this.url = null;
+    this.status = null;
+    this.error = null;
+    this.t = { start: now() };
+  }
+
+  mark(name) {
+    if (this.t[name] === undefined) this.t[name] = now();
+  }
+
+  toJSON() {
+    const t = this.t;
+    const sent = t.sent ?? t.acquired;
+    const between = (a, b) => (a !== undefined && b !== undefined ? round(b - a) : null);
+    return {
+      host: this.host,
+      url: this.url,
+      priority: this.priority,
+      status: this.status,
+      error: this.error,
+      startMs: round(t.start - this.trace.t0),
+      reusedConnection: t.connectStart === undefined,
+      phases: {
+        queue: between(t.start, t.acquired),
+        connect: t.connectStart === undefined ? 0 : between(t.connectStart, t.connected),
+        ttfb: between(sent, t.headers),
+        transfer: between(t.headers, t.done)
+      },
+      totalMs: between(t.start, t.done ?? t.failed)
+    };
+  }
+}
+
+class Trace {
+  constructor(id, req) {
+    this.id = id;
+    this.method = req.method;
+    this.path = req.path;
+    this.route = null;
+    this.status = null;
+    this.notes = {};
+    this.spans = [];
+    this.startedAt = Date.now();
+    this.t0 = now();
+    this.end = null;
+  }
+
+  annotate(key, value) {
+    this.notes[key] = value;
+  }
+
+  toJSON() {
+    const upstreamDone = Math.max(0, ...this.spans.map(span => span.t.done ?? span.t.failed ?? 0));
+    const serializeFrom = upstreamDone > 0 ? upstreamDone : this.t0;
+    return {
+      traceId: this.id,
+      method: this.method,
+      path: this.path,
+      route: this.route,
+      status: this.status,
+      startedAt: new Date(this.startedAt).toISOString(),
+      totalMs: round(this.end - this.t0),
+      serializeMs: round(Math.max(0, this.end - serializeFrom)),
+      notes: this.notes,
+      spans: this.spans.map(span => span.toJSON())
+    };
+  }
+}
+
+export class Tracer {
+  constructor({ sampleRate, maxTraces }) {
+    this.sampleRate = sampleRate;
+    this.maxTraces = maxTraces;
+    this.traces = new Map(); // completed traces, oldest first
+    this.counters = { seen: 0, sampled: 0 };
+    // Always: X-Trace-Sampled can force a trace even at sampleRate 0, and the
+    // handlers do nothing without an active span
+    this.subscribe();
+  }
+
+  /**
+   * Express middleware: adopt or assign a trace ID (always echoed back in
+   * X-Trace-Id), and trace the request when it is sampled. X-Trace-Sampled: 1
+   * forces sampling for a single request.
+   */
+  middleware() {
+    return (req, res, next) => {
+      this.counters.seen++;
+      const incoming = req.get('x-trace-id');
+      const id = incoming && TRACE_ID.test(incoming) ? incoming : newTraceId();
+      res.set('X-Trace-Id', id);
+      const forced = req.get('x-trace-sampled') === '1';
+      if (!forced && !(Math.random() < this.sampleRate)) return next();
+
+      this.counters.sampled++;
+      const trace = new Trace(id, req);
+      let recorded = false;
+      const record = () => {
+        if (recorded) return;
+        recorded = true;
+        trace.end = now();
+        trace.route = req.route ? req.baseUrl + req.route.path : null;
+        trace.status = res.writableFinished ? res.statusCode : 'aborted';
+        this.store(trace);
+      };
+      res.once('finish', record);
+      res.once('close', record);
+      traceStore.run(trace, next);
+    };
+  }
+
+  store(trace) {
+    this.traces.delete(trace.id);
+    this.traces.set(trace.id, trace);
+    for (const id of this.traces.keys()) {
+      if (this.traces.size <= this.maxTraces) break;
+      this.traces.delete(id);
+    }
+  }
+
+  get(id) {
+    const trace = this.traces.get(id);
+    return trace ? trace.toJSON() : null;
+  }
+
+  // Most recent first, optionally filtered by route and minimum duration
+  list({ limit = 50, route = null, minMs = 0 } = {}) {
+    const out = [];
+    for (const trace of [...this.traces.values()].reverse()) {
+      if (out.length >= limit) break;
+      if (route && trace.route !== route) continue;
+      if (trace.end - trace.t0 < minMs) continue;
+      const { spans, ...summary } = trace.toJSON();
+      out.push({ ...summary, upstreamCalls: spans.length });
+    }
+    return out;
+  }
+
+  stats() {
+    return { ...this.counters, stored: this.traces.size, sampleRate: this.sampleRate };
+  }
+
+  // Map undici's request/connection events onto the active upstream span
+  subscribe() {
+    const spans = new WeakMap(); // undici request / connect params -> span
+    const on = (name, fn) => diagnosticsChannel.subscribe(name, fn);
+
+    on('undici:request:create', ({ request }) => {
+      const span = spanStore.getStore();
+      if (span) spans.set(request, span);
+    });
+    on('undici:client:beforeConnect', ({ connectParams }) => {
+      const span = spanStore.getStore();
+      if (!span) return;
+      spans.set(connectParams, span);
+      span.mark('connectStart');
+    });
+    on('undici:client:connected', ({ connectParams }) => {
+      spans.get(connectParams)?.mark('connected');
+    });
+    on('undici:client:sendHeaders', ({ request }) => {
+      spans.get(request)?.mark('sent');
+    });
+    on('undici:request:headers', ({ request, response }) => {
+      const span = spans.get(request);
+      if (!span) return;
+      span.mark('headers');
+      span.status = response.statusCode;
+    });
+    on('undici:request:trailers', ({ request }) => {
+      spans.get(request)?.mark('done');
+    });
+    on('undici:request:error', ({ request, error }) => {
+      const span = spans.get(request);
+      if (!span) return;
+      span.mark('failed');
+      span.error = error.message;
+    });
+  }
+}
+
+// Note something about the current request's trace (e.g. cache outcome)
+export function annotateTrace(key, value) {
+  traceStore.getStore()?.annotate(key, value);
+}
+
+/**
+ * Open a span for an upstream call if the current request is traced.
+ * Returns null otherwise, so callers can use optional chaining throughout.
+ */
+export function startUpstreamSpan(host, priority) {
+  const trace = traceStore.getStore();
+  if (!trace) return null;
+  const span = new UpstreamSpan(trace, host, priority);
+  trace.spans.push(span);
+  return span;
+}
+
+// Run fn with span as the active upstream span (for the undici events)
+export function withSpan(span, fn) {
+  return span ? spanStore.run(span, fn) : fn();
+}
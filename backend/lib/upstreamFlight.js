@@ -0,0 +1,181 @@
+/**
+ * Streaming pass-through of an upstream response
+ * Upstream bytes are piped to every attached client as they arrive, with
+ * status and content-type preserved. The slowest client sets the read pace
+ * (back-pressure), and at most maxBufferBytes are retained for the cache.
+ */
+import { Readable, Writable, pipeline } from 'stream';
+
+// Upstream headers worth passing on. Content-Length/Encoding are not: fetch
+// has already decoded the body, so they would describe different bytes.
+const FORWARDED_HEADERS = ['content-type', 'etag', 'last-modified', 'content-disposition'];
+
+// Resolve once a writable can take more data, or is gone
+function writable(sub) {
+  return new Promise(resolve => {
+    const done = () => {
+      sub.off('drain', done);
+      sub.off('close', done);
+      resolve();
+    };
+    sub.on('drain', done);
+    sub.on('close', done);
+  });
+}
+
+export class UpstreamFlight {
+  /**
+   * @param response       fetch Response with headers received
+   * @param maxBufferBytes body bytes to keep for onComplete (0 = keep none)
+   * @param onComplete     called with the full body if it fit in the buffer
+   * @param transform      optional Transform the body is rewritten through
+   *                       (clients and the cache both get its output)
+   */
+  constructor(response, { maxBufferBytes = 0, onComplete = null, transform = null } = {}) {
+    this.status = response.status;
+    this.ok = response.ok;
+    this.contentType = response.headers.get('content-type') || 'application/octet-stream';
+    this.headers = {};
+    for (const name of FORWARDED_HEADERS) {
+      const value = response.headers.get(name);
+      if (value) this.headers[name] = value;
+    }
+    this.body = response.body ? Readable.fromWeb(response.body) : null;
+    if (this.body && transform) {
+      // pipeline tears down the upstream body too if the output is destroyed
+      this.body = pipeline(this.body, transform, () => {});
+    }
+    this.maxBufferBytes = maxBufferBytes;
+    this.onComplete = onComplete;
+    this.subscribers = new Set();
+    this.chunks = [];
+    this.bufferedBytes = 0;
+    this.overflowed = false;
+    this.detachedReaders = 0;
+    this.started = false;
+    this.finished = new Promise(resolve => {
+      this.resolveFinished = resolve;
+    });
+  }
+
+  // Start pumping on the next turn so every coalesced waiter can attach first
+  start() {
+    if (this.started) return;
+    this.started = true;
+    setImmediate(() => this.pump());
+  }
+
+  /**
+   * Stream the response to an Express/HTTP response.
+   * Resolves when this client has received everything (or left).
+   */
+  pipeTo(res) {
+    res.status(this.status);
+    res.set(this.headers);
+    if (!this.body) {
+      res.end();
+      return Promise.resolve();
+    }
+    this.subscribers.add(res);
+    res.on('close', () => {
+      this.subscribers.delete(res);
+      this.abandonIfUnwatched();
+    });
+    this.start();
+    return this.finished;
+  }
+
+  // Read the body to the end without a client (e.g. background revalidation)
+  drain() {
+    this.detachedReaders++;
+    this.start();
+    return this.finished;
+  }
+
+  /**
+   * Read the whole body into memory, as one more subscriber (for callers
+   * that need the response as a value rather than a stream). Rejects if it
+   * grows past maxBytes or the signal aborts; either releases the upstream
+   * once nobody else is reading.
+   */
+  collect({ maxBytes = Infinity, signal } = {}) {
+    if (!this.body) return Promise.resolve(Buffer.alloc(0));
+    return new Promise((resolve, reject) => {
+      const chunks = [];
+      let size = 0;
+      const sink = new Writable({
+        write(chunk, encoding, callback) {
+          size += chunk.length;
+          if (size > maxBytes) return callback(new Error(`Response larger than ${maxBytes} bytes`));
+          chunks.push(chunk);
+          callback();
+        },
+        final(callback) {
+          resolve(Buffer.concat(chunks, size));
+          callback();
+        }
+      });
+      const abort = () => sink.destroy(new Error('Request aborted'));
+      signal?.addEventListener('abort', abort, { once: true });
+      sink.on('error', reject);
+      sink.on('close', () => {
+        signal?.removeEventListener('abort', abort);
+        this.subscribers.delete(sink);
+        this.abandonIfUnwatched();
+        reject(new Error('Upstream stream ended early'));  // no-op once settled
+      });
+      if (signal?.aborted) return abort();
+      this.subscribers.add(sink);
+      this.start();
+    });
+  }
+
+  abandonIfUnwatched() {
+    if (this.subscribers.size === 0 && this.detachedReaders === 0 && this.body && !this.body.destroyed) {
+      this.body.destroy();
+    }
+  }
+
+  async pump() {
+    if (!this.body) {
+      this.resolveFinished();
+      return;
+    }
+    try {
+      for await (const chunk of this.body) {
+        if (!this.overflowed) {
+          if (this.bufferedBytes + chunk.length <= this.maxBufferBytes) {
+            this.chunks.push(chunk);
+            this.bufferedBytes += chunk.length;
+          } else {
+            // Too big to cache - stop retaining so memory stays flat
+            this.overflowed = true;
+            this.chunks = [];
+          }
+        }
+        const waits = [];
+        for (const sub of this.subscribers) {
+          if (!sub.write(chunk)) waits.push(writable(sub));
+        }
+        if (waits.length) await Promise.all(waits);
+        if (this.subscribers.size === 0 && this.detachedReaders === 0) {
+          this.body.destroy();
+          break;
+        }
+      }
+      const complete = this.body.readableEnded;
+      for (const sub of this.subscribers) sub.end();
+      if (complete && !this.overflowed && this.onComplete) {
+        this.onComplete(Buffer.concat(this.chunks, this.bufferedBytes));
+      }
+    } catch (error) {
+      // Mid-stream failure: headers are out, so the only signal left is a reset.
+      // (No subscribers left means we cancelled the body ourselves.)
+      if (this.subscribers.size) console.error('Upstream stream error:', error.message);
+      for (const sub of this.subscribers) sub.destroy(error);
+    } finally {
+      this.chunks = [];
+      this.resolveFinished();
+    }
+  }
+}
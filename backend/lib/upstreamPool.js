@@ -0,0 +1,332 @@
+/**
+ * Keep-alive connection pools for Archive.org upstreams
+ * One undici Pool per origin so TLS sessions to archive.org, web.archive.org
+ * and be-api.us.archive.org are reused instead of renegotiated per call.
+ * Every call first waits its turn with the host's rate limiter and passes
+ * the endpoint's circuit breaker; slow interactive GETs may be hedged.
+ * Origins other than the configured upstreams share bounded state.
+ */
+import { Pool, fetch as undiciFetch } from 'undici';
+import { config } from './config.js';
+import { RateLimiter } from './rateLimiter.js';
+import { upstreamRequests, upstreamDuration, upstreamQueueWait } from './metrics.js';
+import { startUpstreamSpan, withSpan } from './tracing.js';
+import { CircuitBreaker, LatencyWindow, endpointName } from './circuitBreaker.js';
+import { upstreamUrl, publicUrl } from './endpoints.js';
+
+const pools = new Map();
+const endpoints = new Map();
+
+// The configured upstreams get a pool, rate limiter, breaker and metric
+// labels of their own. Any other origin a proxy caller names shares the
+// `other` ones (and an LRU of at most maxOtherOrigins pools), so arbitrary
+// URLs can't grow memory or label cardinality without bound.
+const KNOWN_ORIGINS = new Set(Object.values(config.endpoints).map(url => new URL(url).origin));
+const OTHER = 'other';
+const otherPools = new Map();
+const otherStats = { requests: 0, connectionsOpened: 0, connectionsClosed: 0, connectionErrors: 0 };
+
+// Redirects are followed here, one hop at a time, because a Pool only
+// talks to its own origin
+const REDIRECTS = new Set([301, 302, 303, 307, 308]);
+const MAX_REDIRECTS = 20;
+
+// Outbound rate per upstream host, shared by every caller
+const limiter = new RateLimiter(config.rateLimit);
+
+const sleep = (ms, signal) => new Promise((resolve, reject) => {
+  const timer = setTimeout(resolve, ms);
+  signal?.addEventListener('abort', () => {
+    clearTimeout(timer);
+    reject(signal.reason || new Error('Request aborted'));
+  }, { once: true });
+});
+
+function createPool(origin, stats) {
+  const pool = new Pool(origin, {
+    connections: config.upstream.maxSockets,
+    pipelining: config.upstream.pipelining,
+    keepAliveTimeout: config.upstream.keepAliveTimeout,
+    keepAliveMaxTimeout: config.upstream.keepAliveMaxTimeout,
+    connect: { timeout: config.upstream.connectTimeout },
+    headersTimeout: config.upstream.headersTimeout
+  });
+  pool.on('connect', () => stats.connectionsOpened++);
+  pool.on('disconnect', () => stats.connectionsClosed++);
+  pool.on('connectionError', () => stats.connectionErrors++);
+  return { pool, stats };
+}
+
+function poolFor(origin) {
+  if (KNOWN_ORIGINS.has(origin)) {
+    let entry = pools.get(origin);
+    if (!entry) {
+      entry = createPool(origin, { requests: 0, connectionsOpened: 0, connectionsClosed: 0, connectionErrors: 0 });
+      pools.set(origin, entry);
+    }
+    return entry;
+  }
+  let entry = otherPools.get(origin);
+  if (entry) {
+    // Most recently used last
+    otherPools.delete(origin);
+  } else {
+    entry = createPool(origin, otherStats);
+    if (otherPools.size >= config.upstream.maxOtherOrigins) {
+      const [oldest, evicted] = otherPools.entries().next().value;
+      otherPools.delete(oldest);
+      // close() lets requests already sent on it finish
+      evicted.pool.close().catch(() => {});
+    }
+  }
+  otherPools.set(origin, entry);
+  return entry;
+}
+
+// Breaker, latency window and hedging counts of one upstream endpoint
+// (named after the public URL, also when a stand-in serves it); null for
+// origins we aren't configured to use
+function endpointFor(url) {
+  if (!KNOWN_ORIGINS.has(new URL(upstreamUrl(url)).origin)) return null;
+  const name = endpointName(publicUrl(url));
+  let entry = endpoints.get(name);
+  if (!entry) {
+    entry = {
+      breaker: new CircuitBreaker(name, config.circuitBreaker),
+      latency: new LatencyWindow(config.hedging.samples),
+      requests: 0,
+      hedges: 0,
+      hedgeWins: 0
+    };
+    endpoints.set(name, entry);
+  }
+  return entry;
+}
+
+/**
+ * Whether calls to this URL's endpoint are currently being refused by its
+ * circuit breaker (so callers can fall back to expired cached data)
+ */
+export function upstreamUnavailable(url) {
+  const entry = endpoints.get(endpointName(publicUrl(url)));
+  return !!entry && config.circuitBreaker.enabled && entry.breaker.rejecting();
+}
+
+// Delay before hedging a call to this endpoint, or null to not hedge it
+function hedgeDelay(endpoint) {
+  const { percentile, minDelay, maxDelay, minSamples, budget } = config.hedging;
+  if (endpoint.latency.count < minSamples || endpoint.hedges >= endpoint.requests * budget) return null;
+  return Math.min(maxDelay, Math.max(minDelay, endpoint.latency.percentile(percentile)));
+}
+
+/**
+ * Start send(signal, onSent) and, if it has no response `delay` after it
+ * left the rate limiter, a second copy; the first response wins and the
+ * other attempt is aborted. Errors are not hedged: a failure before the
+ * delay rejects straight away.
+ */
+function hedgedFetch(endpoint, delay, signal, send) {
+  return new Promise((resolve, reject) => {
+    const attempts = new Set();
+    let settled = false;
+    let timer = null;
+    // Time from when the request is sent, not from when it joined the queue
+    const arm = () => {
+      if (settled) return;
+      timer = setTimeout(() => {
+        if (settled || endpoint.hedges >= endpoint.requests * config.hedging.budget) return;
+        endpoint.hedges++;
+        launch(true);
+      }, delay);
+    };
+    const launch = hedge => {
+      const controller = new AbortController();
+      attempts.add(controller);
+      send(signal ? AbortSignal.any([signal, controller.signal]) : controller.signal, hedge ? null : arm).then(response => {
+        attempts.delete(controller);
+        if (settled) {
+          response.body?.cancel().catch(() => {});
+          return;
+        }
+        settled = true;
+        clearTimeout(timer);
+        for (const other of attempts) other.abort();
+        if (hedge) endpoint.hedgeWins++;
+        resolve(response);
+      }, error => {
+        attempts.delete(controller);
+        if (settled || attempts.size > 0) return;
+        settled = true;
+        clearTimeout(timer);
+        reject(error);
+      });
+    };
+    launch(false);
+  });
+}
+
+// When each response's request left the rate limiter, for latency samples
+// that leave out the queue wait
+const sentAt = new WeakMap();
+
+// One request: wait for the host's rate limiter, then send it through the
+// pool, calling onSent once it is on its way. Redirects come back as they
+// are (see upstreamFetch).
+async function sendUpstream(url, init, { entry, host, priority, onSent = null }) {
+  const span = startUpstreamSpan(host, priority);
+  if (span) span.url = url;
+  const waited = await limiter.acquire(host, priority, init.signal);
+  span?.mark('acquired');
+  upstreamQueueWait.observe([host, priority], waited / 1000);
+  const sent = Date.now();
+  onSent?.();
+  entry.stats.requests++;
+  const done = upstreamDuration.startTimer();
+  let response;
+  try {
+    response = await withSpan(span, () => undiciFetch(url, { ...init, redirect: 'manual', dispatcher: entry.pool }));
+  } catch (error) {
+    if (span) {
+      span.mark('failed');
+      span.error = span.error || error.message;
+    }
+    if (!init.signal?.aborted) upstreamRequests.inc([host, 'error']);
+    throw error;
+  }
+  done([host]);
+  upstreamRequests.inc([host, response.status]);
+  sentAt.set(response, sent);
+  return response;
+}
+
+// One hop: rate limiting, breaker, hedging and throttling retries
+async function fetchHop(publicOrUpstreamUrl, { priority, ...init }) {
+  const endpoint = endpointFor(publicOrUpstreamUrl);
+  const url = upstreamUrl(publicOrUpstreamUrl);
+  const { origin, host } = new URL(url);
+  const entry = poolFor(origin);
+  // Unconfigured origins share one limiter bucket and metric label
+  const label = KNOWN_ORIGINS.has(origin) ? host : OTHER;
+  const breaker = endpoint?.breaker;
+  const breakerOn = config.circuitBreaker.enabled && !!breaker;
+  const retryable = !init.method || init.method.toUpperCase() === 'GET';
+  // Only interactive reads are worth duplicating; bulk work can wait
+  const hedgeable = config.hedging.enabled && !!endpoint && retryable && priority === 'interactive';
+  const send = (signal, onSent) => sendUpstream(url, { ...init, signal }, { entry, host: label, priority, onSent });
+  for (let attempt = 0; ; attempt++) {
+    if (breakerOn) breaker.allow();
+    if (endpoint) endpoint.requests++;
+    const delay = hedgeable ? hedgeDelay(endpoint) : null;
+    let response;
+    try {
+      response = delay === null ? await send(init.signal) : await hedgedFetch(endpoint, delay, init.signal, send);
+    } catch (error) {
+      // Our own cancellations and a full local queue say nothing about the upstream
+      if (!breakerOn) throw error;
+      if (init.signal?.aborted || error.name === 'QueueFullError') breaker.release();
+      else breaker.failure();
+      throw error;
+    }
+    const pause = limiter.observe(label, response.status, response.headers.get('retry-after'));
+    if (breakerOn) {
+      if (pause) breaker.release();
+      else if (response.status >= 500) breaker.failure();
+      else breaker.success();
+    }
+    if (endpoint && !pause && response.status < 500) endpoint.latency.observe(Date.now() - sentAt.get(response));
+    if (!pause || !retryable || attempt >= config.rateLimit.maxRetries) return response;
+    await response.body?.cancel().catch(() => {});
+    await sleep(pause, init.signal);
+  }
+}
+
+/**
+ * Drop-in replacement for fetch() that routes through the origin's pool.
+ * init.priority ('interactive' | 'bulk' | 'batch', default interactive)
+ * orders the wait for the host's rate limiter. Throttled GETs are retried
+ * once the host's backoff has passed. Throws CircuitOpenError without
+ * calling out while the endpoint's breaker is open. Public archive.org URLs
+ * go to the configured base URLs (see endpoints.js). Redirects are followed
+ * like fetch() does (each hop through its own origin's pool) unless
+ * init.redirect is 'manual'.
+ */
+export async function upstreamFetch(publicOrUpstreamUrl, { priority = 'interactive', redirect = 'follow', ...init } = {}) {
+  let url = publicOrUpstreamUrl;
+  for (let hops = 0; ; hops++) {
+    const response = await fetchHop(url, { ...init, priority });
+    const location = response.headers.get('location');
+    if (redirect === 'manual' || !REDIRECTS.has(response.status) || !location) return response;
+    await response.body?.cancel().catch(() => {});
+    if (redirect === 'error' || hops >= MAX_REDIRECTS) {
+      throw new Error(hops >= MAX_REDIRECTS ? 'Too many upstream redirects' : `Upstream redirected to ${location}`);
+    }
+    const from = new URL(upstreamUrl(url));
+    const next = new URL(location, from);
+    // As fetch(): 303 (and 301/302 after a POST) continue as a bodiless GET,
+    // and credentials don't follow a redirect to another origin
+    const method = (init.method || 'GET').toUpperCase();
+    if (response.status === 303 ? method !== 'HEAD' : [301, 302].includes(response.status) && method === 'POST') {
+      init = { ...init, method: 'GET', body: undefined };
+    }
+    if (next.origin !== from.origin && init.headers) {
+      init = {
+        ...init,
+        headers: Object.fromEntries(Object.entries(init.headers).filter(([name]) => name.toLowerCase() !== 'authorization'))
+      };
+    }
+    url = next.href;
+  }
+}
+
+// Breaker state and hedging per upstream endpoint
+export function circuitStats() {
+  const stats = {};
+  for (const [name, endpoint] of endpoints) {
+    stats[name] = {
+      ...endpoint.breaker.stats(),
+      requests: endpoint.requests,
+      hedges: endpoint.hedges,
+      hedgeWins: endpoint.hedgeWins,
+      p95Ms: endpoint.latency.percentile(0.95)
+    };
+  }
+  return stats;
+}
+
+export function rateLimitStats() {
+  return limiter.stats();
+}
+
+function describePool(stats, pools) {
+  const described = {
+    requests: stats.requests,
+    connectionsOpened: stats.connectionsOpened,
+    connectionsClosed: stats.connectionsClosed,
+    connectionErrors: stats.connectionErrors,
+    // Every request beyond the connections we opened rode an existing socket
+    reusedRequests: Math.max(0, stats.requests - stats.connectionsOpened),
+    reuseRatio: stats.requests ? Math.max(0, stats.requests - stats.connectionsOpened) / stats.requests : 0,
+    connected: 0,
+    free: 0,
+    pending: 0,
+    queued: 0,
+    running: 0,
+    size: 0
+  };
+  for (const pool of pools) {
+    for (const field of ['connected', 'free', 'pending', 'queued', 'running', 'size']) {
+      described[field] += pool.stats[field];
+    }
+  }
+  return described;
+}
+
+// Per configured origin, plus `other` summed over the unconfigured ones
+export function poolStats() {
+  const stats = {};
+  for (const [origin, entry] of pools) stats[origin] = describePool(entry.stats, [entry.pool]);
+  if (otherPools.size || otherStats.requests) {
+    stats[OTHER] = describePool(otherStats, [...otherPools.values()].map(entry => entry.pool));
+  }
+  return stats;
+}
@@ -0,0 +1,196 @@
+/**
+ * Streaming Wayback toolbar stripper
+ * A Transform that removes what the Wayback Machine injects into archived
+ * HTML - the toolbar insert, the wm-ipp/donato containers, /_static/ scripts
+ * and stylesheets, and inline wbinfo scripts - while leaving the rewritten
+ * resource URLs alone, so the page still loads its assets from the archive.
+ *
+ * One pass over the markup with a small tokenizer: only tags, comments and
+ * script bodies are looked at, and only a partial tag (or a script still
+ * being read) is held back between chunks. Bytes are handled as latin1, which
+ * round-trips any charset the page may use.
+ */
+import { Transform } from 'stream';
+
+const TOOLBAR_BEGIN = 'BEGIN WAYBACK TOOLBAR INSERT';
+const TOOLBAR_END = '<!-- END WAYBACK TOOLBAR INSERT -->';
+const SCRIPT_CLOSE = '</script';
+
+const TOOLBAR_CONTAINER = /\sid\s*=\s*["']?(wm-ipp-base|wm-ipp|donato)["'\s/>]/i;
+const STATIC_SRC = /\ssrc\s*=\s*["']?[^"'\s>]*\/_static\//i;
+const STATIC_HREF = /\shref\s*=\s*["']?[^"'\s>]*\/_static\//i;
+const TAG_NAME = /^<(\/?)([a-zA-Z][a-zA-Z0-9-]*)/;
+
+const counters = { documents: 0, elementsRemoved: 0, bytesIn: 0, bytesOut: 0 };
+
+// Index of the '>' closing the tag opened at `from`, skipping quoted values
+function tagEnd(text, from) {
+  let quote = null;
+  for (let i = from; i < text.length; i++) {
+    const c = text[i];
+    if (quote) {
+      if (c === quote) quote = null;
+    } else if (c === '"' || c === "'") {
+      quote = c;
+    } else if (c === '>') {
+      return i;
+    }
+  }
+  return -1;
+}
+
+function indexOfIgnoreCase(text, needle, from) {
+  const lower = needle.toLowerCase();
+  for (let i = text.indexOf('<', from); i >= 0; i = text.indexOf('<', i + 1)) {
+    if (text.substr(i, needle.length).toLowerCase() === lower) return i;
+  }
+  return -1;
+}
+
+export class ToolbarStripper extends Transform {
+  constructor() {
+    super();
+    this.pending = '';       // unprocessed input (a partial tag, comment or script close)
+    this.inToolbar = false;  // between the BEGIN/END toolbar comments
+    this.skipDepth = 0;      // open <div>s of a toolbar container being dropped
+    this.script = null;      // { open, drop, body } while inside <script>
+    this.removed = 0;
+    counters.documents++;
+  }
+
+  _transform(chunk, encoding, callback) {
+    counters.bytesIn += chunk.length;
+    this.pending += chunk.toString('latin1');
+    this.pushText(this.rewrite());
+    callback();
+  }
+
+  _flush(callback) {
+    // Whatever is left is an unterminated construct; keep it unless it was
+    // being dropped
+    let out = '';
+    if (this.script) {
+      if (!this.script.drop && this.skipDepth === 0 && !this.inToolbar) {
+        out = this.script.open + this.script.body + this.pending;
+      }
+    } else if (this.skipDepth === 0 && !this.inToolbar) {
+      out = this.pending;
+    }
+    this.pending = '';
+    this.pushText(out);
+    callback();
+  }
+
+  pushText(text) {
+    if (!text) return;
+    counters.bytesOut += text.length;
+    this.push(Buffer.from(text, 'latin1'));
+  }
+
+  drop() {
+    this.removed++;
+    counters.elementsRemoved++;
+  }
+
+  // Consume as much of this.pending as possible; returns the text to emit
+  rewrite() {
+    const text = this.pending;
+    let out = '';
+    let i = 0;
+    while (i < text.length) {
+      if (this.inToolbar) {
+        const end = text.indexOf(TOOLBAR_END, i);
+        if (end < 0) {
+          // Keep enough of the tail to spot a marker split across chunks
+          i = Math.max(i, text.length - TOOLBAR_END.length);
+          break;
+        }
+        i = end + TOOLBAR_END.length;
+        this.inToolbar = false;
+        continue;
+      }
+
+      if (this.script) {
+        const close = indexOfIgnoreCase(text, SCRIPT_CLOSE, i);
+        const closeEnd = close < 0 ? -1 : text.indexOf('>', close);
+        if (closeEnd < 0) {
+          const keep = close < 0 ? Math.max(i, text.length - SCRIPT_CLOSE.length) : close;
+          this.script.body += text.slice(i, keep);
+          i = keep;
+          break;
+        }
+        const { open, body } = this.script;
+        const content = body + text.slice(i, close);
+        const drop = this.script.drop || content.includes('wbinfo');
+        if (drop && this.skipDepth === 0) this.drop();
+        if (!drop && this.skipDepth === 0) out += open + content + text.slice(close, closeEnd + 1);
+        this.script = null;
+        i = closeEnd + 1;
+        continue;
+      }
+
+      const lt = text.indexOf('<', i);
+      if (lt < 0) {
+        if (this.skipDepth === 0) out += text.slice(i);
+        i = text.length;
+        break;
+      }
+      if (this.skipDepth === 0) out += text.slice(i, lt);
+      i = lt;
+
+      if (text.startsWith('<!--', i)) {
+        const end = text.indexOf('-->', i + 4);
+        if (end < 0) break;
+        const comment = text.slice(i, end + 3);
+        i = end + 3;
+        if (comment.includes(TOOLBAR_BEGIN)) {
+          this.inToolbar = true;
+          this.drop();
+        } else if (this.skipDepth === 0) {
+          out += comment;
+        }
+        continue;
+      }
+
+      if (i + 1 >= text.length) break;
+      // A '<' not followed by a tag name is just text ("a < b")
+      if (!/[a-zA-Z/!?]/.test(text[i + 1])) {
+        if (this.skipDepth === 0) out += '<';
+        i++;
+        continue;
+      }
+      const gt = tagEnd(text, i + 1);
+      if (gt < 0) break;
+      const tag = text.slice(i, gt + 1);
+      i = gt + 1;
+      const match = TAG_NAME.exec(tag);
+      const closing = match?.[1] === '/';
+      const name = match?.[2].toLowerCase();
+
+      if (name === 'script' && !closing) {
+        this.script = { open: tag, drop: STATIC_SRC.test(tag), body: '' };
+        continue;
+      }
+      if (this.skipDepth > 0) {
+        if (name === 'div') this.skipDepth += closing ? -1 : 1;
+        continue;
+      }
+      if (name === 'div' && !closing && TOOLBAR_CONTAINER.test(tag)) {
+        this.skipDepth = 1;
+        this.drop();
+        continue;
+      }
+      if (name === 'link' && STATIC_HREF.test(tag)) {
+        this.drop();
+        continue;
+      }
+      out += tag;
+    }
+    this.pending = text.slice(i);
+    return out;
+  }
+}
+
+export function toolbarStats() {
+  return { ...counters };
+}
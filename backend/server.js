@@ -6,8 +6,26 @@ import express from 'express';
 import cors from 'cors';
 import crypto from 'crypto';
 import fs from 'fs/promises';
+import { watch } from 'fs';
+import cluster from 'cluster';
 import path from 'path';
 import { fileURLToPath } from 'url';
+import { config, CACHE_RULES } from './lib/config.js';
+import { ResponseCache, cacheRuleFor, cacheKey, credentialScope } from './lib/responseCache.js';
+import { SingleFlight } from './lib/singleFlight.js';
+import { DiskCache } from './lib/diskCache.js';
+import { upstreamFetch, upstreamUnavailable, poolStats, rateLimitStats, circuitStats } from './lib/upstreamPool.js';
+import { STATES as CIRCUIT_STATES } from './lib/circuitBreaker.js';
+import { UpstreamFlight } from './lib/upstreamFlight.js';
+import { harvestCdx } from './lib/cdxHarvest.js';
+import { aggregateCdx, CdxAggregator, BUCKET_WIDTHS } from './lib/cdxStats.js';
+import { CdxStore, STORE_FIELDS, storeKey } from './lib/cdxStore.js';
+import { isIdentifier, projectMetadata, forEachConcurrent } from './lib/batchMetadata.js';
+import { registry, httpMetrics } from './lib/metrics.js';
+import { Tracer, annotateTrace } from './lib/tracing.js';
+import { compression, precompress, sendEntry, compressionStats, isCompressible } from './lib/compression.js';
+import { ToolbarStripper, toolbarStats } from './lib/waybackToolbar.js';
+import { SaveJobQueue, isJobId } from './lib/saveJobs.js';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
@@ -25,17 +43,30 @@ const corsOptions = {
   ].filter(Boolean),  // Remove undefined values
   credentials: true,
   methods: ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-  allowedHeaders: ['Content-Type', 'Authorization']
+  allowedHeaders: ['Content-Type', 'Authorization', 'X-Trace-Id', 'X-Trace-Sampled'],
+  exposedHeaders: ['X-Cache', 'X-Cdx-Store', 'X-Trace-Id']
 };
 
 // Middleware
+app.use(httpMetrics());
 app.use(cors(corsOptions));
-app.use(express.json());
+
+// Per-request traces with upstream timing breakdowns (sampled)
+const tracer = new Tracer(config.tracing);
+app.use(tracer.middleware());
+
+// brotli/gzip negotiation; cache hits bring their own pre-compressed bodies
+if (config.compression.enabled) {
+  app.use(compression(config.compression));
+}
+
+// Large enough for a SavePageNow batch of SAVE_MAX_URLS URLs
+app.use(express.json({ limit: config.maxBodyBytes }));
 
 // Encryption setup
 const ENCRYPTION_KEY = process.env.ENCRYPTION_KEY || crypto.randomBytes(32).toString('hex');
 const ALGORITHM = 'aes-256-gcm';
-const CREDENTIALS_FILE = path.join(__dirname, 'credentials.enc');
+const CREDENTIALS_FILE = process.env.CREDENTIALS_FILE || path.join(__dirname, 'credentials.enc');
 
 // Encrypt data
 function encrypt(text) {
@@ -64,15 +95,35 @@ function decrypt(encrypted) {
   return decrypted;
 }
 
+// Decrypted credentials held in memory so the hot proxy path never touches
+// the disk. undefined = not loaded yet, null = none stored.
+let cachedCredentials;
+let credentialsLoad = null;
+let credentialsGeneration = 0;
+
+function invalidateCredentials() {
+  cachedCredentials = undefined;
+  credentialsLoad = null;
+  credentialsGeneration++;
+}
+
+// Under cluster.js, tell the other workers to drop their copies
+function broadcastCredentialsChanged() {
+  if (process.send) process.send({ type: 'credentials-changed' });
+}
+
 // Save credentials
 async function saveCredentials(accessKey, secretKey) {
   const data = JSON.stringify({ accessKey, secretKey });
   const encrypted = encrypt(data);
   await fs.writeFile(CREDENTIALS_FILE, JSON.stringify(encrypted), 'utf8');
+  invalidateCredentials();
+  cachedCredentials = { accessKey, secretKey };
+  broadcastCredentialsChanged();
 }
 
-// Load credentials
-async function loadCredentials() {
+// Read and decrypt credentials from disk
+async function readCredentialsFile() {
   try {
     const encryptedData = await fs.readFile(CREDENTIALS_FILE, 'utf8');
     const encrypted = JSON.parse(encryptedData);
@@ -83,6 +134,23 @@ async function loadCredentials() {
   }
 }
 
+// Load credentials (decrypted once, then served from memory)
+async function loadCredentials() {
+  if (cachedCredentials !== undefined) return cachedCredentials;
+  if (!credentialsLoad) {
+    const generation = credentialsGeneration;
+    credentialsLoad = readCredentialsFile().then(creds => {
+      // Ignore a read that raced with a save/delete
+      if (generation === credentialsGeneration) {
+        cachedCredentials = creds;
+        credentialsLoad = null;
+      }
+      return creds;
+    });
+  }
+  return credentialsLoad;
+}
+
 // Delete credentials
 async function deleteCredentials() {
   try {
@@ -90,6 +158,124 @@ async function deleteCredentials() {
   } catch (error) {
     // File doesn't exist, that's fine
   }
+  invalidateCredentials();
+  cachedCredentials = null;
+  broadcastCredentialsChanged();
+}
+
+// Optionally pick up credentials.enc edits made outside the API
+if (config.credentials.watch) {
+  watch(path.dirname(CREDENTIALS_FILE), (eventType, filename) => {
+    if (filename === path.basename(CREDENTIALS_FILE)) invalidateCredentials();
+  });
+}
+
+// Persistent tier so restarts come back warm
+const diskCache = config.diskCache.enabled
+  ? new DiskCache({
+    dir: path.join(config.dataDir, 'cache'),
+    maxBytes: config.diskCache.maxBytes,
+    maxEntryBytes: config.cache.maxEntryBytes
+  })
+  : null;
+
+// Upstream response cache for idempotent Archive.org GETs
+const responseCache = new ResponseCache({
+  ...config.cache,
+  store: diskCache,
+  // Credential-scoped responses stay in memory only
+  persist: key => !key.includes(' [auth:'),
+  precompress: config.compression.enabled ? entry => precompress(entry, config.compression) : null
+});
+
+if (diskCache) {
+  // Only the size cap is enforced here: expired entries are kept as a
+  // fallback for when an upstream's circuit breaker is open
+  diskCache.load()
+    .then(() => diskCache.evict())
+    .then(() => responseCache.warm(config.diskCache.warmEntries))
+    .then(warmed => console.log(`💾 Disk cache: ${diskCache.index.size} entries, ${warmed} warmed into memory`))
+    .catch(error => console.error('Disk cache unavailable:', error.message));
+  setInterval(() => diskCache.flushHits().catch(() => {}), config.diskCache.hitsFlushInterval).unref();
+}
+
+// Identical concurrent GETs share one upstream fetch
+const singleFlight = new SingleFlight();
+
+// Start an upstream request and return a streaming flight once headers arrive.
+// Successful bodies that fit in a cache entry are stored when fully read.
+// transform(response) may return a stream to rewrite a successful body through.
+async function openUpstream(url, { method, headers, body, priority, signal, transform }, cache) {
+  const response = await upstreamFetch(url, {
+    method,
+    headers,
+    body: body ? JSON.stringify(body) : undefined,
+    priority,
+    signal
+  });
+  const cacheable = cache && response.ok;
+  return new UpstreamFlight(response, {
+    transform: transform && response.ok ? transform(response) : null,
+    maxBufferBytes: cacheable ? responseCache.maxEntryBytes : 0,
+    onComplete: cacheable
+      ? buffer => responseCache.set(cache.key, {
+        body: buffer,
+        status: response.status,
+        contentType: response.headers.get('content-type') || 'application/octet-stream'
+      }, cache.rule)
+      : null
+  });
+}
+
+// X-Cache value for a cache lookup. FALLBACK: past its stale window, served
+// because the upstream's circuit breaker is open.
+const cacheLabel = cached => (cached.expired ? 'FALLBACK' : cached.stale ? 'STALE' : 'HIT');
+
+// Requests refused here rather than failed upstream get a 503 with a hint of
+// when to come back. Returns false for any other error.
+function refuse(res, error) {
+  if (error.name === 'QueueFullError') {
+    res.status(503).set('Retry-After', '1').json({ error: error.message });
+    return true;
+  }
+  if (error.name === 'CircuitOpenError') {
+    res.status(503).set('Retry-After', String(Math.max(1, Math.ceil(error.retryAfter / 1000)))).json({ error: error.message });
+    return true;
+  }
+  return false;
+}
+
+// Fetch and parse an upstream JSON document through the response cache and
+// single-flight - for server-side fan-out, where the body is needed here
+// rather than streamed to a client. Shares cache entries with the proxy.
+async function cachedUpstreamJson(url, rule, { priority, signal } = {}) {
+  const key = cacheKey('GET', url);
+  const fetchBody = flightSignal => upstreamFetch(url, {
+    headers: { 'User-Agent': 'Archive-OmniDash/1.0' },
+    priority,
+    signal: flightSignal
+  }).then(async response => {
+    if (!response.ok) {
+      throw new Error(`Upstream returned status ${response.status}`);
+    }
+    const value = {
+      body: Buffer.from(await response.arrayBuffer()),
+      status: response.status,
+      contentType: response.headers.get('content-type') || 'application/json'
+    };
+    responseCache.set(key, value, rule);
+    return value;
+  });
+
+  const cached = await responseCache.lookup(key, { allowExpired: upstreamUnavailable(url) });
+  if (cached) {
+    if (cached.stale) {
+      responseCache.revalidate(key, rule, () => singleFlight.do(`JSON ${key}`, fetchBody));
+    }
+    return { data: JSON.parse(cached.entry.body), cache: cacheLabel(cached) };
+  }
+  const value = await singleFlight.do(`JSON ${key}`, fetchBody, { signal });
+  return { data: JSON.parse(value.body), cache: 'MISS' };
 }
 
 // Routes
@@ -99,6 +285,117 @@ app.get('/api/health', (req, res) => {
   res.json({ status: 'healthy', version: '1.0.0' });
 });
 
+// Runtime counters (cache hit/miss/eviction, ...)
+app.get('/api/stats', (req, res) => {
+  res.json({
+    cache: responseCache.stats(),
+    singleFlight: singleFlight.stats(),
+    upstream: poolStats(),
+    rateLimit: rateLimitStats(),
+    circuits: circuitStats(),
+    tracing: tracer.stats(),
+    compression: compressionStats(),
+    waybackToolbar: toolbarStats(),
+    saveJobs: saveJobs.stats(),
+    cdxStore: cdxStore ? cdxStore.stats() : null
+  });
+});
+
+// Module stats, re-exported as Prometheus series at scrape time
+const cacheEvents = registry.counter('cache_events_total', 'Response cache lookups and maintenance, by event', ['event']);
+const cacheHitRatio = registry.gauge('cache_hit_ratio', 'Share of cache lookups served from memory or disk');
+const cacheSize = registry.gauge('cache_size', 'Response cache size by tier', ['tier', 'unit']);
+const flightCalls = registry.counter('singleflight_calls_total', 'Coalescing outcomes for identical concurrent GETs', ['result']);
+const flightInFlight = registry.gauge('singleflight_in_flight', 'Distinct upstream fetches currently shared');
+const poolConnections = registry.gauge('upstream_pool_connections', 'Pooled upstream connections by state', ['origin', 'state']);
+const poolOpened = registry.counter('upstream_pool_connections_opened_total', 'Connections opened per origin', ['origin']);
+const queueDepth = registry.gauge('upstream_queue_depth', 'Requests waiting for the host rate limiter', ['host', 'priority']);
+const upstreamRate = registry.gauge('upstream_rate_limit_rps', 'Current allowed request rate per host', ['host']);
+const upstreamThrottled = registry.counter('upstream_throttled_total', 'Upstream 429 / Retry-After responses', ['host']);
+const circuitState = registry.gauge('upstream_circuit_state', 'Circuit breaker state per upstream endpoint (0 closed, 1 half-open, 2 open)', ['endpoint']);
+const circuitTransitions = registry.counter('upstream_circuit_transitions_total', 'Circuit breaker state changes, by state entered', ['endpoint', 'state']);
+const circuitRejections = registry.counter('upstream_circuit_rejections_total', 'Calls refused without contacting the upstream', ['endpoint']);
+const upstreamHedges = registry.counter('upstream_hedged_requests_total', 'Duplicate requests sent after the hedge delay, and how many answered first', ['endpoint', 'result']);
+const compressedResponses = registry.counter('http_compressed_responses_total', 'Compressed responses by encoding and source', ['encoding', 'source']);
+const compressionBytes = registry.counter('http_compression_bytes_total', 'Bytes through the streaming compressor', ['direction']);
+
+registry.collect(() => {
+  const cache = responseCache.stats();
+  for (const event of ['hits', 'staleHits', 'storeHits', 'misses', 'evictions', 'expirations', 'revalidations', 'revalidationErrors', 'oversized', 'fallbackHits']) {
+    cacheEvents.set([event], cache[event]);
+  }
+  cacheHitRatio.set([], cache.hitRatio);
+  cacheSize.set(['memory', 'bytes'], cache.bytes);
+  cacheSize.set(['memory', 'entries'], cache.entries);
+  if (cache.store) {
+    cacheSize.set(['disk', 'bytes'], cache.store.bytes);
+    cacheSize.set(['disk', 'entries'], cache.store.entries);
+  }
+
+  const flights = singleFlight.stats();
+  for (const result of ['leaders', 'coalesced', 'errors', 'cancelled']) {
+    flightCalls.set([result], flights[result]);
+  }
+  flightInFlight.set([], flights.inFlight);
+
+  for (const [origin, pool] of Object.entries(poolStats())) {
+    for (const state of ['connected', 'free', 'pending', 'running']) {
+      poolConnections.set([origin, state], pool[state]);
+    }
+    poolOpened.set([origin], pool.connectionsOpened);
+  }
+
+  for (const [host, limits] of Object.entries(rateLimitStats())) {
+    for (const [priority, depth] of Object.entries(limits.queuedBy)) {
+      queueDepth.set([host, priority], depth);
+    }
+    upstreamRate.set([host], limits.rate);
+    upstreamThrottled.set([host], limits.throttled);
+  }
+
+  for (const [endpoint, circuit] of Object.entries(circuitStats())) {
+    circuitState.set([endpoint], CIRCUIT_STATES.indexOf(circuit.state));
+    for (const [state, count] of Object.entries(circuit.transitions)) {
+      circuitTransitions.set([endpoint, state], count);
+    }
+    circuitRejections.set([endpoint], circuit.rejected);
+    upstreamHedges.set([endpoint, 'sent'], circuit.hedges);
+    upstreamHedges.set([endpoint, 'won'], circuit.hedgeWins);
+  }
+
+  const compressed = compressionStats();
+  for (const encoding of ['br', 'gzip']) {
+    compressedResponses.set([encoding, 'stream'], compressed.streamed[encoding]);
+    compressedResponses.set([encoding, 'cache'], compressed.precompressedHits[encoding]);
+  }
+  compressionBytes.set(['in'], compressed.bytesIn);
+  compressionBytes.set(['out'], compressed.bytesOut);
+});
+
+// Recent sampled traces, newest first (?route=/api/proxy/archive&minMs=500&limit=50)
+app.get('/api/traces', (req, res) => {
+  res.json(tracer.list({
+    limit: Math.min(parseInt(req.query.limit, 10) || 50, config.tracing.maxTraces),
+    route: req.query.route || null,
+    minMs: parseFloat(req.query.minMs) || 0
+  }));
+});
+
+// One trace with its upstream spans and phase timings
+app.get('/api/traces/:id', (req, res) => {
+  const trace = tracer.get(req.params.id);
+  if (!trace) {
+    return res.status(404).json({ error: 'Trace not found (not sampled, or already rotated out)' });
+  }
+  res.json(trace);
+});
+
+// Prometheus scrape endpoint. Under cluster.js each scrape is answered by
+// whichever worker takes the connection.
+app.get('/api/metrics', (req, res) => {
+  res.type('text/plain; version=0.0.4').send(registry.render());
+});
+
 // Save credentials
 app.post('/api/credentials', async (req, res) => {
   try {
@@ -145,11 +442,11 @@ app.post('/api/credentials/validate', async (req, res) => {
     // Test credentials with Archive.org metadata API
     // Use a known public item that always exists: 'internetarchive'
     // This is a read-only operation that requires authentication
-    const testUrl = 'https://archive.org/metadata/internetarchive';
+    const testUrl = `${config.endpoints.archive}/metadata/internetarchive`;
 
     try {
       // Make request with proper Archive.org S3 authentication header
-      const response = await fetch(testUrl, {
+      const response = await upstreamFetch(testUrl, {
         method: 'GET',
         headers: {
           'Authorization': `LOW ${creds.accessKey}:${creds.secretKey}`,
@@ -215,43 +512,795 @@ app.delete('/api/credentials', async (req, res) => {
   }
 });
 
+// Resolve one proxy request to a cache hit ({ entry, cache }) or an open
+// upstream flight ({ flight, cache }). Shared by /api/proxy/archive and
+// /api/proxy/batch; errors the client caused carry an HTTP status.
+async function openProxy({ url, method = 'GET', body, requiresAuth = false }, signal) {
+  const headers = {
+    'Content-Type': 'application/json'
+  };
+  
+  // Authenticated calls are cached per access key, or not at all
+  let scope = '';
+  
+  // Add credentials if required
+  if (requiresAuth) {
+    const creds = await loadCredentials();
+    if (!creds) {
+      const error = new Error('Credentials not configured');
+      error.status = 401;
+      throw error;
+    }
+    // Add Archive.org S3 authentication headers
+    headers['Authorization'] = `LOW ${creds.accessKey}:${creds.secretKey}`;
+    scope = credentialScope(creds.accessKey);
+  }
+  
+  const rule = requiresAuth && config.cache.authMode === 'off' ? null : cacheRuleFor(url, method);
+  const key = rule ? cacheKey(method, url, scope) : null;
+  const init = { method, headers, body };
+  
+  const cache = key ? { key, rule } : null;
+  
+  // Concurrent identical GETs (cacheable or not) are coalesced into one fetch;
+  // every waiter then streams from the same upstream body
+  const flightKey = method.toUpperCase() === 'GET' ? cacheKey(method, url, scope) : null;
+  const openShared = (flightSignal, priority = 'interactive') => flightKey
+    ? singleFlight.do(flightKey, upstreamSignal => openUpstream(url, { ...init, priority, signal: upstreamSignal }, cache), { signal: flightSignal })
+    : openUpstream(url, { ...init, priority, signal: flightSignal }, cache);
+  
+  if (key) {
+    const cached = await responseCache.lookup(key, { allowExpired: upstreamUnavailable(url) });
+    if (cached) {
+      if (cached.stale) {
+        // The flight stores the refreshed body itself once fully read
+        responseCache.revalidate(key, rule, async () => {
+          const flight = await openShared(undefined, 'bulk');
+          await flight.drain();
+          return null;
+        });
+      }
+      return { entry: cached.entry, cache: cacheLabel(cached) };
+    }
+  }
+  
+  const flight = await openShared(signal);
+  return { flight, cache: key ? 'MISS' : null };
+}
+
 // Proxy Archive.org API calls with credentials
 app.post('/api/proxy/archive', async (req, res) => {
   try {
-    const { url, method = 'GET', body, requiresAuth = false } = req.body;
+    // Stop waiting (and let single-flight cancel the upstream) if the client goes away
+    const clientGone = new AbortController();
+    res.on('close', () => {
+      if (!res.writableFinished) clientGone.abort();
+    });
     
-    const headers = {
-      'Content-Type': 'application/json'
+    const { entry, flight, cache } = await openProxy(req.body, clientGone.signal);
+    if (cache) {
+      res.set('X-Cache', cache);
+      annotateTrace('cache', cache);
+    }
+    if (entry) {
+      return sendEntry(req, res, entry);
+    }
+    // Pass upstream bytes straight through - status and content-type preserved,
+    // whether the body is JSON, CDX text or an archived HTML page
+    await flight.pipeTo(res);
+  } catch (error) {
+    if (res.destroyed || res.headersSent) return;  // client gone or stream already started
+    if (error.status) {
+      return res.status(error.status).json({ error: error.message });
+    }
+    if (refuse(res, error)) return;
+    console.error('Proxy error:', error);
+    res.status(500).json({ error: 'Proxy request failed', details: error.message });
+  }
+});
+
+// A buffered upstream body as NDJSON fields: parsed JSON, text, or base64
+function bodyFields({ body, contentType }) {
+  if (/json/i.test(contentType)) {
+    try {
+      return { data: JSON.parse(body) };
+    } catch {
+      // Not valid JSON after all - pass it on as text
+    }
+  }
+  if (isCompressible(contentType)) return { text: body.toString('utf8') };
+  return { base64: body.toString('base64') };
+}
+
+const batchItems = registry.counter('proxy_batch_items_total', 'Requests run through /api/proxy/batch, by outcome', ['result']);
+
+// Multiplexed proxy: many proxy requests in one round trip. They run
+// concurrently, pooled, cached and coalesced exactly like /api/proxy/archive,
+// and each result is written as one NDJSON line the moment it is complete
+// (completion order, not request order).
+// Body: { requests: [{ id?, url, method?, body?, requiresAuth? }], concurrency? }
+// Lines: {"index","id"?,"status","contentType","cache","ms","data"|"text"|"base64"}
+//        or {"index","id"?,"error","status"?}, then {"type":"end",...}.
+app.post('/api/proxy/batch', async (req, res) => {
+  const { requests } = req.body || {};
+  if (!Array.isArray(requests) || requests.length === 0) {
+    return res.status(400).json({ error: 'requests must be a non-empty array' });
+  }
+  if (requests.length > config.proxyBatch.maxRequests) {
+    return res.status(400).json({ error: `At most ${config.proxyBatch.maxRequests} requests per batch` });
+  }
+  const concurrency = Math.min(
+    parseInt(req.body.concurrency, 10) || config.proxyBatch.concurrency,
+    config.proxyBatch.concurrency
+  );
+
+  const clientGone = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) clientGone.abort();
+  });
+
+  res.status(200).type('application/x-ndjson');
+  res.set('Cache-Control', 'no-store');
+  res.flushHeaders();
+
+  const started = Date.now();
+  const stats = { requested: requests.length, ok: 0, failed: 0, cacheHits: 0 };
+  const items = requests.map((request, index) => ({ index, request }));
+
+  await forEachConcurrent(items, concurrency, async ({ request }) => {
+    const begun = Date.now();
+    if (!request || typeof request.url !== 'string') {
+      const error = new Error('url is required');
+      error.status = 400;
+      throw error;
+    }
+    const { entry, flight, cache } = await openProxy(request, clientGone.signal);
+    const response = entry || {
+      status: flight.status,
+      contentType: flight.contentType,
+      body: await flight.collect({ maxBytes: config.proxyBatch.maxResponseBytes, signal: clientGone.signal })
     };
-    
-    // Add credentials if required
-    if (requiresAuth) {
-      const creds = await loadCredentials();
-      if (!creds) {
-        return res.status(401).json({ error: 'Credentials not configured' });
+    return {
+      status: response.status,
+      contentType: response.contentType,
+      cache,
+      ms: Date.now() - begun,
+      ...bodyFields(response)
+    };
+  }, async ({ index, request }, error, result) => {
+    const id = request?.id !== undefined ? { id: request.id } : {};
+    if (error) {
+      stats.failed++;
+      batchItems.inc(['error']);
+      await writeLine(res, { index, ...id, error: error.message, ...(error.status && { status: error.status }) });
+    } else {
+      stats.ok++;
+      const hit = result.cache !== 'MISS' && result.cache !== null;
+      if (hit) stats.cacheHits++;
+      batchItems.inc([hit ? 'hit' : 'fetched']);
+      await writeLine(res, { index, ...id, ...result });
+    }
+  }, { signal: clientGone.signal });
+
+  if (res.destroyed) return;
+  stats.ms = Date.now() - started;
+  await writeLine(res, { type: 'end', ...stats });
+  res.end();
+});
+
+// Batch metadata: fetch many identifiers with bounded concurrency
+// Body: { identifiers: [...], fields?: [...], exclude?: ['files'], concurrency?, stream? }
+// Returns { results: {id: metadata}, errors: {id: message}, stats } or, with
+// stream: true (or Accept: application/x-ndjson), one line per identifier as
+// it completes - {"identifier","data"} / {"identifier","error"} - then
+// {"type":"end",...}.
+app.post('/api/metadata/batch', async (req, res) => {
+  const { identifiers, fields, exclude } = req.body || {};
+  if (!Array.isArray(identifiers) || identifiers.length === 0) {
+    return res.status(400).json({ error: 'identifiers must be a non-empty array' });
+  }
+  if (identifiers.length > config.batch.maxIdentifiers) {
+    return res.status(400).json({ error: `At most ${config.batch.maxIdentifiers} identifiers per batch` });
+  }
+  const unique = [...new Set(identifiers.map(id => String(id).trim()))];
+  const concurrency = Math.min(
+    parseInt(req.body.concurrency, 10) || config.batch.concurrency,
+    config.batch.maxConcurrency
+  );
+  const stream = req.body.stream === true || (req.get('accept') || '').includes('application/x-ndjson');
+  const rule = CACHE_RULES.find(r => r.name === 'metadata');
+  const projection = { fields, exclude };
+
+  const clientGone = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) clientGone.abort();
+  });
+
+  const started = Date.now();
+  const stats = { requested: unique.length, ok: 0, failed: 0, cacheHits: 0 };
+  const results = {};
+  const errors = {};
+
+  if (stream) {
+    res.status(200).type('application/x-ndjson');
+    res.set('Cache-Control', 'no-store');
+    res.flushHeaders();
+  }
+
+  await forEachConcurrent(unique, concurrency, async identifier => {
+    if (!isIdentifier(identifier)) {
+      throw new Error('Invalid identifier');
+    }
+    const { data, cache } = await cachedUpstreamJson(
+      `${config.endpoints.archive}/metadata/${identifier}`,
+      rule,
+      { priority: 'batch', signal: clientGone.signal }
+    );
+    if (cache !== 'MISS') stats.cacheHits++;
+    // The metadata API answers unknown identifiers with an empty object
+    if (!data || Object.keys(data).length === 0) {
+      throw new Error('Item not found');
+    }
+    return projectMetadata(data, projection);
+  }, async (identifier, error, data) => {
+    if (error) {
+      stats.failed++;
+      if (stream) await writeLine(res, { identifier, error: error.message });
+      else errors[identifier] = error.message;
+    } else {
+      stats.ok++;
+      if (stream) await writeLine(res, { identifier, data });
+      else results[identifier] = data;
+    }
+  }, { signal: clientGone.signal });
+
+  if (res.destroyed) return;
+  stats.ms = Date.now() - started;
+  if (stream) {
+    await writeLine(res, { type: 'end', ...stats });
+    res.end();
+  } else {
+    res.json({ results, errors, stats });
+  }
+});
+
+// Write one NDJSON line, waiting for the client to drain when its buffer is full
+function writeLine(res, value) {
+  if (res.write(JSON.stringify(value) + '\n')) return Promise.resolve();
+  return new Promise(resolve => {
+    const done = () => {
+      res.off('drain', done);
+      res.off('close', done);
+      resolve();
+    };
+    res.on('drain', done);
+    res.on('close', done);
+  });
+}
+
+// Archived page with the Wayback toolbar stripped, fetched and cleaned here
+// in one streaming pass and cached by timestamp + URL.
+//   ?url=https://web.archive.org/web/20200101000000/http://example.com/
+//   ?url=http://example.com/&timestamp=20200101000000
+const WAYBACK_URL = /^https?:\/\/web\.archive\.org\/web\/(\d{1,14})([a-z]{2}_)?\/(.+)$/;
+
+app.get('/api/wayback/snapshot', async (req, res) => {
+  let { url, timestamp } = req.query;
+  let modifier = '';
+  const parsed = typeof url === 'string' ? WAYBACK_URL.exec(url) : null;
+  if (parsed) {
+    [, timestamp, modifier = '', url] = parsed;
+  }
+  if (!url || !/^\d{1,14}$/.test(timestamp || '')) {
+    return res.status(400).json({ error: 'url must be a Wayback snapshot URL, or pass url and timestamp' });
+  }
+
+  const snapshotUrl = `${config.endpoints.wayback}/web/${timestamp}${modifier}/${url}`;
+  const rule = CACHE_RULES.find(r => r.name === 'snapshot');
+  const key = `SNAPSHOT ${timestamp}${modifier} ${url}`;
+  const isHtml = response => (response.headers.get('content-type') || '').includes('html');
+  const open = (signal, priority = 'interactive') => singleFlight.do(key, upstreamSignal => openUpstream(snapshotUrl, {
+    method: 'GET',
+    headers: { 'User-Agent': 'Archive-OmniDash/1.0' },
+    priority,
+    signal: upstreamSignal,
+    transform: response => (isHtml(response) ? new ToolbarStripper() : null)
+  }, { key, rule }), { signal });
+
+  try {
+    const cached = await responseCache.lookup(key, { allowExpired: upstreamUnavailable(snapshotUrl) });
+    if (cached) {
+      if (cached.stale) {
+        responseCache.revalidate(key, rule, async () => {
+          const flight = await open(undefined, 'bulk');
+          await flight.drain();
+          return null;
+        });
       }
-      // Add Archive.org S3 authentication headers
-      headers['Authorization'] = `LOW ${creds.accessKey}:${creds.secretKey}`;
+      res.set('X-Cache', cacheLabel(cached));
+      annotateTrace('cache', cacheLabel(cached));
+      return sendEntry(req, res, cached.entry);
     }
-    
-    const response = await fetch(url, {
-      method,
-      headers,
-      body: body ? JSON.stringify(body) : undefined
+
+    const clientGone = new AbortController();
+    res.on('close', () => {
+      if (!res.writableFinished) clientGone.abort();
     });
-    
-    const data = await response.json();
-    res.json(data);
+    const flight = await open(clientGone.signal);
+    res.set('X-Cache', 'MISS');
+    annotateTrace('cache', 'MISS');
+    await flight.pipeTo(res);
   } catch (error) {
-    console.error('Proxy error:', error);
-    res.status(500).json({ error: 'Proxy request failed', details: error.message });
+    if (res.destroyed || res.headersSent) return;
+    if (refuse(res, error)) return;
+    console.error('Snapshot error:', error);
+    res.status(502).json({ error: 'Snapshot fetch failed', details: error.message });
+  }
+});
+
+// SavePageNow batch jobs: queued server-side, submitted under the SPN
+// concurrency/rate budget, polled to completion, persisted across restarts.
+// Under cluster.js they run in the one worker the primary names the runner.
+const saveJobs = new SaveJobQueue({
+  ...config.saveJobs,
+  dir: path.join(config.dataDir, 'save-jobs'),
+  saveUrl: `${config.endpoints.wayback}/save`,
+  credentials: loadCredentials,
+  coordinated: cluster.isWorker
+});
+saveJobs.load().catch(error => console.error('Save jobs unavailable:', error.message));
+
+// Cancel/retry/delete of a job this worker does not run, relayed by the
+// primary to the runner; resolves null if no runner answers in time
+const JOB_ACTION_TIMEOUT_MS = 5000;
+const pendingJobActions = new Map();
+
+function forwardJobAction(id, action) {
+  if (!process.send) return Promise.resolve(null);
+  return new Promise(resolve => {
+    const requestId = crypto.randomBytes(6).toString('hex');
+    const timer = setTimeout(() => {
+      pendingJobActions.delete(requestId);
+      resolve(null);
+    }, JOB_ACTION_TIMEOUT_MS);
+    pendingJobActions.set(requestId, result => {
+      clearTimeout(timer);
+      pendingJobActions.delete(requestId);
+      resolve(result);
+    });
+    process.send({ type: 'save-job-action', requestId, id, action });
+  });
+}
+
+// Run a relayed action on the runner; a job written moments ago by another
+// worker may not have been picked up yet
+async function runJobAction({ id, action }) {
+  if (!saveJobs.isLocal(id)) await saveJobs.sweep();
+  if (action === 'cancel') return saveJobs.cancel(id);
+  if (action === 'retry') return saveJobs.retry(id);
+  if (action === 'remove') return saveJobs.remove(id);
+  return null;
+}
+
+// Open Server-Sent Event streams, closed on shutdown so the server can exit
+const eventStreams = new Set();
+
+// Body: { urls: [...], captureAll?, captureOutlinks?, captureScreenshot? }
+app.post('/api/save/jobs', async (req, res) => {
+  const { urls, ...options } = req.body || {};
+  if (!Array.isArray(urls) || urls.length === 0) {
+    return res.status(400).json({ error: 'urls must be a non-empty array' });
+  }
+  const unique = [...new Set(urls.map(url => String(url).trim()).filter(Boolean))];
+  if (unique.length > config.saveJobs.maxUrls) {
+    return res.status(400).json({ error: `At most ${config.saveJobs.maxUrls} URLs per job` });
+  }
+  const invalid = unique.filter(url => !/^https?:\/\/[^\s/]+/i.test(url));
+  if (invalid.length) {
+    return res.status(400).json({ error: `Not http(s) URLs: ${invalid.slice(0, 5).join(', ')}${invalid.length > 5 ? ', ...' : ''}` });
+  }
+  try {
+    if (!await loadCredentials()) {
+      return res.status(401).json({ error: 'Credentials not configured' });
+    }
+    const job = await saveJobs.create(unique, options);
+    // Written for the runner; have the primary point it at the new job
+    if (!saveJobs.isLocal(job.id) && process.send) process.send({ type: 'save-jobs-created' });
+    res.status(202).json(saveJobs.summary(job));
+  } catch (error) {
+    console.error('Error creating save job:', error);
+    res.status(500).json({ error: 'Failed to create save job' });
+  }
+});
+
+app.get('/api/save/jobs', async (req, res) => {
+  try {
+    res.json(await saveJobs.list());
+  } catch (error) {
+    res.status(500).json({ error: 'Failed to list save jobs' });
+  }
+});
+
+// Job ids name files under data/save-jobs: anything that is not one
+// (e.g. a decoded "..%2F") is not a job
+app.use('/api/save/jobs/:id', (req, res, next) => {
+  if (!isJobId(req.params.id)) return res.status(404).json({ error: 'Job not found' });
+  next();
+});
+
+// ?state=error to list only the failed URLs
+app.get('/api/save/jobs/:id', async (req, res) => {
+  try {
+    const job = await saveJobs.get(req.params.id, { state: req.query.state || null });
+    if (!job) return res.status(404).json({ error: 'Job not found' });
+    res.json(job);
+  } catch (error) {
+    res.status(500).json({ error: 'Failed to read save job' });
+  }
+});
+
+// Progress as Server-Sent Events:
+//   snapshot  the job with all its items, sent on (re)connect
+//   item      one URL changed state ({ index, url, state, error?, snapshotUrl? })
+//   progress  the job's counts after each change
+//   end       the job has finished; the stream then closes
+// Jobs run by another cluster worker are followed through their saved state.
+app.get('/api/save/jobs/:id/events', async (req, res) => {
+  let initial;
+  try {
+    initial = await saveJobs.get(req.params.id);
+  } catch (error) {
+    return res.status(500).json({ error: 'Failed to read save job' });
+  }
+  if (!initial) return res.status(404).json({ error: 'Job not found' });
+
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+  });
+  const send = (event, data) => res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+  const id = req.params.id;
+  let closed = false;
+  let last = initial.updatedAt;
+  const end = summary => {
+    if (closed) return;
+    closed = true;
+    send('end', summary);
+    res.end();
+  };
+
+  send('snapshot', initial);
+  if (initial.finishedAt) return end(initial);
+
+  const onItem = (jobId, item) => {
+    if (jobId === id) send('item', item);
+  };
+  const onProgress = summary => {
+    if (summary.id !== id) return;
+    send('progress', summary);
+    if (summary.finishedAt) end(summary);
+  };
+  // Not ours: re-read the saved job whenever it changes
+  const follow = async () => {
+    const job = await saveJobs.get(id);
+    if (closed || !job || job.updatedAt === last) return;
+    last = job.updatedAt;
+    send('snapshot', job);
+    if (job.finishedAt) end(job);
+  };
+  const local = saveJobs.isLocal(id);
+  if (local) {
+    saveJobs.on('item', onItem);
+    saveJobs.on('progress', onProgress);
+  }
+  const poll = local ? null : setInterval(() => follow().catch(() => {}), config.saveJobs.persistInterval);
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), 15 * 1000);
+  eventStreams.add(res);
+  res.on('close', () => {
+    closed = true;
+    eventStreams.delete(res);
+    saveJobs.off('item', onItem);
+    saveJobs.off('progress', onProgress);
+    clearInterval(poll);
+    clearInterval(heartbeat);
+  });
+});
+
+// Run a job action here if this worker runs the job, else on the runner
+const jobAction = async (id, action) => {
+  if (saveJobs.isLocal(id) || !cluster.isWorker) return runJobAction({ id, action });
+  return forwardJobAction(id, action);
+};
+
+const ownedJob = async (req, res, action) => {
+  try {
+    const result = await jobAction(req.params.id, action);
+    if (result) return res.json(result);
+    const job = await saveJobs.get(req.params.id);
+    if (!job) return res.status(404).json({ error: 'Job not found' });
+    res.status(503).json({ error: 'No worker is running save jobs right now; try again' });
+  } catch (error) {
+    res.status(500).json({ error: `Failed to ${action} save job` });
+  }
+};
+
+// Stop submitting (captures already started still finish)
+app.post('/api/save/jobs/:id/cancel', (req, res) => ownedJob(req, res, 'cancel'));
+
+// Queue the failed and cancelled URLs again
+app.post('/api/save/jobs/:id/retry', (req, res) => ownedJob(req, res, 'retry'));
+
+app.delete('/api/save/jobs/:id', async (req, res) => {
+  try {
+    // No runner to ask: a finished job can still be deleted from disk here
+    const removed = await jobAction(req.params.id, 'remove') ?? await saveJobs.remove(req.params.id);
+    if (!removed) {
+      if (!await saveJobs.get(req.params.id)) return res.status(404).json({ error: 'Job not found' });
+      return res.status(409).json({ error: 'Job is still running; cancel it first' });
+    }
+    res.json({ success: true });
+  } catch (error) {
+    res.status(500).json({ error: 'Failed to delete save job' });
+  }
+});
+
+// Harvest a full CDX history as NDJSON, page by page
+// Rows are plain objects; control lines carry a "type":
+//   {"type":"checkpoint","resumeKey":"...","rows":N}  after every page
+//   {"type":"end","rows":N}                            when complete
+//   {"type":"error","error":"...","resumeKey":"..."}   on upstream failure
+// Reconnect with ?resumeKey=<last checkpoint> to continue after a drop.
+app.get('/api/cdx/harvest', async (req, res) => {
+  const { url, resumeKey, from, to, matchType, filter, collapse } = req.query;
+  if (!url) {
+    return res.status(400).json({ error: 'url is required' });
+  }
+  const pageSize = Math.min(
+    parseInt(req.query.pageSize, 10) || config.cdx.pageSize,
+    config.cdx.maxPageSize
+  );
+  const maxRows = parseInt(req.query.maxRows, 10) || Infinity;
+
+  const cancelled = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) cancelled.abort();
+  });
+
+  res.status(200).type('application/x-ndjson');
+  res.set('Cache-Control', 'no-store');
+  res.flushHeaders();
+
+  let rows = 0;
+  let checkpoint = resumeKey || null;
+  try {
+    for await (const page of harvestCdx({
+      url, pageSize, resumeKey, from, to, matchType, filter, collapse,
+      signal: cancelled.signal
+    })) {
+      for (const row of page.rows) {
+        if (rows >= maxRows || res.destroyed) break;
+        await writeLine(res, row);
+        rows++;
+      }
+      if (res.destroyed) return;
+      checkpoint = page.resumeKey;
+      if (rows >= maxRows) break;
+      if (checkpoint) await writeLine(res, { type: 'checkpoint', resumeKey: checkpoint, rows });
+    }
+    await writeLine(res, { type: 'end', rows });
+    res.end();
+  } catch (error) {
+    if (res.destroyed) return;  // client hung up - the abort stopped the harvest
+    console.error('CDX harvest error:', error);
+    await writeLine(res, { type: 'error', error: error.message, resumeKey: checkpoint, rows });
+    res.end();
+  }
+});
+
+// Columnar store of full CDX histories (see lib/cdxStore.js)
+const cdxStore = config.cdxStore.enabled
+  ? new CdxStore({ dir: path.join(config.dataDir, 'cdx'), maxOpenSegments: config.cdxStore.maxOpenSegments })
+  : null;
+const cdxStoreReady = cdxStore ? cdxStore.load() : null;
+
+// The stored segment for a url + matchType if it is fresh enough to serve
+// as-is, else null
+async function freshCdxSegment(query) {
+  await cdxStoreReady;
+  if (!cdxStore.entry(query)) await cdxStore.reloadIndex();
+  const entry = cdxStore.entry(query);
+  if (!entry || Date.now() - entry.harvestedAt >= config.cdxStore.refreshAfter) return null;
+  return cdxStore.read(query);
+}
+
+/**
+ * Stored history for a url + matchType, harvesting it first if needed.
+ * Missing histories are harvested in full; stored ones older than
+ * refreshAfter (or with refresh set) only fetch captures since the newest
+ * stored one. Pages go straight into the segment writer's columns.
+ * Resolves to { segment, source: 'store' | 'incremental' | 'harvest' }.
+ */
+async function storedCdx(query, { refresh = false, signal } = {}) {
+  const fresh = refresh ? null : await freshCdxSegment(query);
+  if (fresh) return { segment: fresh, source: 'store' };
+  await cdxStoreReady;
+  return singleFlight.do(`CDXSTORE ${storeKey(query)}`, async flightSignal => {
+    const from = cdxStore.nextFrom(query);
+    const writer = await cdxStore.writer(query, { extend: !!from });
+    for await (const page of harvestCdx({
+      ...query,
+      from: from || undefined,
+      pageSize: config.cdx.maxPageSize,
+      signal: flightSignal
+    })) {
+      for (const row of page.rows) writer.add(row);
+    }
+    const segment = await cdxStore.write(query, writer);
+    return { segment, source: from ? 'incremental' : 'harvest' };
+  }, { signal });
+}
+
+// CDX from/to: a timestamp prefix of 1-14 digits
+const CDX_TIMESTAMP = /^\d{1,14}$/;
+
+// Serve a URL's CDX history (or a date-range slice of it) from the local
+// store, in the upstream CDX JSON shape: [[fields], [row], ...], written
+// row by row. ?refresh=true forces an incremental update first.
+app.get('/api/cdx/store', async (req, res) => {
+  const { url, matchType, from, to, urlkey } = req.query;
+  if (!cdxStore) {
+    return res.status(404).json({ error: 'CDX store is disabled' });
+  }
+  if (!url) {
+    return res.status(400).json({ error: 'url is required' });
+  }
+  for (const [name, value] of [['from', from], ['to', to]]) {
+    if (value !== undefined && !CDX_TIMESTAMP.test(value)) {
+      return res.status(400).json({ error: `${name} must be a timestamp of 1-14 digits (YYYYMMDDhhmmss prefix)` });
+    }
+  }
+  const offset = parseInt(req.query.offset, 10) || 0;
+  const limit = parseInt(req.query.limit, 10) || Infinity;
+
+  const clientGone = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) clientGone.abort();
+  });
+  let segment;
+  let source;
+  try {
+    ({ segment, source } = await storedCdx({ url, matchType }, {
+      refresh: req.query.refresh === 'true',
+      signal: clientGone.signal
+    }));
+  } catch (error) {
+    if (res.destroyed) return;
+    console.error('CDX store error:', error);
+    return res.status(502).json({ error: error.message });
+  }
+  res.set('X-Cdx-Store', source.toUpperCase());
+  res.type('application/json');
+  res.write('[' + JSON.stringify(STORE_FIELDS));
+  let index = 0;
+  let sent = 0;
+  for (const row of segment.rows({ from, to, urlkey })) {
+    if (index++ < offset) continue;
+    if (sent++ >= limit || res.destroyed) break;
+    if (!res.write(',\n' + JSON.stringify(STORE_FIELDS.map(field => row[field])))) {
+      await new Promise(resolve => {
+        res.once('drain', resolve);
+        res.once('close', resolve);
+      });
+    }
+  }
+  res.end(']');
+});
+
+// CDX aggregates for charts: capture counts per year/month/day, status and
+// MIME breakdowns and unique digests, computed server-side in one pass
+app.get('/api/cdx/stats', async (req, res) => {
+  const { url, from, to, matchType } = req.query;
+  const bucket = req.query.bucket || 'year';
+  if (!url) {
+    return res.status(400).json({ error: 'url is required' });
+  }
+  if (!BUCKET_WIDTHS[bucket]) {
+    return res.status(400).json({ error: `bucket must be one of: ${Object.keys(BUCKET_WIDTHS).join(', ')}` });
+  }
+  for (const [name, value] of [['from', from], ['to', to]]) {
+    if (value !== undefined && !CDX_TIMESTAMP.test(value)) {
+      return res.status(400).json({ error: `${name} must be a timestamp of 1-14 digits (YYYYMMDDhhmmss prefix)` });
+    }
+  }
+
+  const rule = CACHE_RULES.find(r => r.name === 'cdx');
+  const key = `CDXSTATS ${bucket} ${new URLSearchParams({ url, from: from || '', to: to || '', matchType: matchType || '' })}`;
+  const aggregate = async signal => {
+    // A fresh stored history answers locally; otherwise aggregate in one
+    // streaming pass rather than harvesting the whole history into the store
+    const segment = cdxStore ? await freshCdxSegment({ url, matchType }) : null;
+    if (!segment) {
+      return aggregateCdx({ url, from, to, matchType }, { bucket, pageSize: config.cdx.maxPageSize, signal });
+    }
+    const aggregator = new CdxAggregator(bucket);
+    for (const row of segment.rows({ from, to })) aggregator.add(row);
+    return aggregator.result();
+  };
+  const compute = signal => aggregate(signal).then(stats => {
+    const value = { body: Buffer.from(JSON.stringify({ url, ...stats })), status: 200, contentType: 'application/json' };
+    responseCache.set(key, value, rule);
+    return value;
+  });
+
+  const cached = await responseCache.lookup(key, { allowExpired: upstreamUnavailable(config.endpoints.cdx) });
+  if (cached) {
+    if (cached.stale) {
+      responseCache.revalidate(key, rule, () => singleFlight.do(key, compute));
+    }
+    res.set('X-Cache', cacheLabel(cached));
+    return sendEntry(req, res, cached.entry);
+  }
+
+  const clientGone = new AbortController();
+  res.on('close', () => {
+    if (!res.writableFinished) clientGone.abort();
+  });
+  try {
+    const value = await singleFlight.do(key, compute, { signal: clientGone.signal });
+    res.set('X-Cache', 'MISS');
+    res.type('application/json').send(value.body);
+  } catch (error) {
+    if (res.destroyed) return;
+    if (refuse(res, error)) return;
+    console.error('CDX stats error:', error);
+    res.status(502).json({ error: error.message });
   }
 });
 
 // Start server
-app.listen(PORT, () => {
+const server = app.listen(PORT, () => {
+  if (cluster.isWorker) {
+    console.log(`🚀 Worker ${process.pid} listening on port ${PORT}`);
+    return;
+  }
   console.log(`🚀 Archive OmniDash Backend running on port ${PORT}`);
   console.log(`🔐 Encryption key: ${ENCRYPTION_KEY.substring(0, 8)}...`);
   console.log(`📁 Credentials file: ${CREDENTIALS_FILE}`);
   console.log(`🌐 CORS enabled for: ${corsOptions.origin.filter(Boolean).join(', ')}`);
 });
+
+// Graceful shutdown: stop accepting connections, let in-flight requests
+// finish (up to the timeout), persist cache popularity and save jobs, then exit
+let stopping = false;
+function shutdown() {
+  if (stopping) return;
+  stopping = true;
+  const forced = setTimeout(() => process.exit(1), config.cluster.shutdownTimeout);
+  forced.unref();
+  server.close(() => {
+    Promise.all([diskCache?.flushHits(), saveJobs.flush()])
+      .catch(() => {})
+      .finally(() => process.exit(0));
+  });
+  // Event streams never finish on their own; clients reconnect elsewhere
+  for (const stream of eventStreams) stream.end();
+  server.closeIdleConnections();
+}
+
+process.once('SIGTERM', shutdown);
+process.once('SIGINT', shutdown);
+
+// Messages from the cluster primary (cluster.js)
+process.on('message', message => {
+  if (message?.type === 'shutdown') shutdown();
+  if (message?.type === 'credentials-changed') invalidateCredentials();
+  if (message?.type === 'save-runner') saveJobs.becomeRunner().catch(error => console.error('Save jobs unavailable:', error.message));
+  if (message?.type === 'save-jobs-created') saveJobs.sweep().catch(() => {});
+  if (message?.type === 'save-job-action') {
+    runJobAction(message)
+      .catch(() => null)
+      .then(result => process.send({ type: 'save-job-result', requestId: message.requestId, to: message.from, result }));
+  }
+  if (message?.type === 'save-job-result') pendingJobActions.get(message.requestId)?.(message.result);
+});
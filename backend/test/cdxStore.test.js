@@ -0,0 +1,129 @@
+/**
+ * CDX store tests
+ * Segment encode/decode, slice queries and incremental appends.
+ *
+ *   npm test
+ */
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'fs/promises';
+import os from 'os';
+import path from 'path';
+import { CdxSegment, CdxStore, encodeSegment, rangeBounds, secondsToTimestamp, timestampToSeconds } from '../lib/cdxStore.js';
+
+const DIGEST = 'SHA1AAAAAAAAAAAAAAAAAAAAAAAAAAAA';
+
+function row(urlkey, timestamp, overrides = {}) {
+  return {
+    urlkey,
+    timestamp,
+    original: `http://${urlkey.replace(/^com,(\w+)\)/, '$1.com')}`,
+    mimetype: 'text/html',
+    statuscode: '200',
+    digest: DIGEST,
+    length: '1234',
+    ...overrides
+  };
+}
+
+const decode = buffer => [...new CdxSegment(buffer).rows()];
+
+async function tempStore() {
+  const dir = await fs.mkdtemp(path.join(os.tmpdir(), 'cdx-store-'));
+  return new CdxStore({ dir }).load();
+}
+
+test('timestamps round-trip at second resolution', () => {
+  assert.equal(secondsToTimestamp(timestampToSeconds('20200102030405')), '20200102030405');
+  // Prefixes start at the beginning of their period
+  assert.equal(secondsToTimestamp(timestampToSeconds('2015')), '20150101000000');
+  const { lower, upper } = rangeBounds('2015', '2015');
+  assert.equal(secondsToTimestamp(lower), '20150101000000');
+  assert.equal(secondsToTimestamp(upper), '20151231235959');
+});
+
+test('encode/decode keeps every column', () => {
+  const rows = [
+    row('com,example)/', '20200101000000'),
+    row('com,example)/', '20210101000000', { statuscode: '301', mimetype: 'unk', length: '-' }),
+    row('com,example)/a', '20200601120000', { digest: 'odd-digest' })
+  ];
+  assert.deepEqual(decode(encodeSegment(rows)), rows);
+});
+
+test('rows come back in urlkey then timestamp order', () => {
+  const rows = [
+    row('com,example)/b', '20200101000000'),
+    row('com,example)/a', '20220101000000', { digest: 'second-odd' }),
+    row('com,example)/a', '20210101000000', { digest: 'first-odd' }),
+    row('com,example)/b', '20190101000000')
+  ];
+  const decoded = decode(encodeSegment(rows));
+  assert.deepEqual(decoded.map(r => `${r.urlkey} ${r.timestamp}`), [
+    'com,example)/a 20210101000000',
+    'com,example)/a 20220101000000',
+    'com,example)/b 20190101000000',
+    'com,example)/b 20200101000000'
+  ]);
+  // Odd digests follow their rows through the sort
+  assert.deepEqual(decoded.slice(0, 2).map(r => r.digest), ['first-odd', 'second-odd']);
+});
+
+test('slices by date range and urlkey', () => {
+  const rows = [];
+  for (const key of ['com,example)/a', 'com,example)/b', 'com,example)/c']) {
+    for (const year of [2018, 2019, 2020, 2021]) rows.push(row(key, `${year}0615000000`));
+  }
+  const segment = new CdxSegment(encodeSegment(rows));
+  const keys = slice => [...segment.rows(slice)].map(r => `${r.urlkey.slice(-1)}${r.timestamp.slice(0, 4)}`);
+
+  assert.equal(keys({}).length, 12);
+  assert.deepEqual(keys({ from: '2019', to: '2020' }), ['a2019', 'a2020', 'b2019', 'b2020', 'c2019', 'c2020']);
+  assert.deepEqual(keys({ urlkey: 'com,example)/b' }), ['b2018', 'b2019', 'b2020', 'b2021']);
+  assert.deepEqual(keys({ urlkey: 'com,example)/c', from: '202106', to: '202106' }), ['c2021']);
+  assert.deepEqual(keys({ urlkey: 'com,example)/zz' }), []);
+  assert.deepEqual(keys({ from: '2022' }), []);
+  assert.equal(segment.row(5).urlkey, 'com,example)/b');
+  assert.equal(secondsToTimestamp(segment.lastSeconds()), '20210615000000');
+});
+
+test('append adds only captures newer than the stored history', async () => {
+  const store = await tempStore();
+  const query = { url: 'example.com', matchType: 'exact' };
+  assert.equal(store.nextFrom(query), null);
+
+  await store.write(query, [row('com,example)/', '20200101000000'), row('com,example)/', '20200101000010')]);
+  // One second after the newest capture, so it is not harvested twice
+  assert.equal(store.nextFrom(query), '20200101000011');
+
+  // An overlapping harvest: the already-stored capture is skipped
+  await store.append(query, [
+    row('com,example)/', '20200101000010'),
+    row('com,example)/', '20200101000011'),
+    row('com,example)/', '20230101000000', { digest: 'odd-digest' })
+  ]);
+  const segment = await store.read(query);
+  assert.deepEqual([...segment.rows()].map(r => r.timestamp), [
+    '20200101000000', '20200101000010', '20200101000011', '20230101000000'
+  ]);
+  assert.equal([...segment.rows()][3].digest, 'odd-digest');
+  assert.equal(store.entry(query).rows, 4);
+  assert.equal(store.nextFrom(query), '20230101000001');
+
+  // Nothing new: the segment is kept as is
+  const before = store.entry(query).file;
+  await store.append(query, [row('com,example)/', '20230101000000')]);
+  assert.equal(store.entry(query).file, before);
+  assert.equal((await store.read(query)).size, 4);
+  await fs.rm(store.dir, { recursive: true, force: true });
+});
+
+test('the index survives a reload', async () => {
+  const store = await tempStore();
+  const query = { url: 'https://Example.com/', matchType: 'prefix' };
+  await store.write(query, [row('com,example)/', '20200101000000')]);
+  const reopened = await new CdxStore({ dir: store.dir }).load();
+  assert.equal(reopened.entry({ url: 'example.com/', matchType: 'prefix' }).rows, 1);
+  assert.deepEqual([...(await reopened.read(query)).rows()], [row('com,example)/', '20200101000000')]);
+  await fs.rm(store.dir, { recursive: true, force: true });
+});
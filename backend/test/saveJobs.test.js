@@ -0,0 +1,161 @@
+/**
+ * Save job tests
+ * Job id validation and which process runs (owns) a job.
+ *
+ *   npm test
+ */
+import { test } from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'fs/promises';
+import os from 'os';
+import path from 'path';
+import { SaveJobQueue, isJobId } from '../lib/saveJobs.js';
+
+const OPTIONS = {
+  saveUrl: 'https://web.archive.org/save',
+  // No credentials: jobs are queued and owned but nothing is submitted
+  credentials: async () => null,
+  concurrency: 2,
+  perMinute: 6,
+  pollInterval: 1000,
+  captureTimeout: 60 * 1000,
+  maxAttempts: 2,
+  retention: 60 * 1000,
+  persistInterval: 60 * 1000
+};
+
+async function tempDir() {
+  return fs.mkdtemp(path.join(os.tmpdir(), 'save-jobs-'));
+}
+
+async function queue(dir, options = {}) {
+  return new SaveJobQueue({ ...OPTIONS, dir, ...options }).load();
+}
+
+function savedJob(id, overrides = {}) {
+  const now = Date.now();
+  return {
+    id,
+    owner: null,
+    createdAt: now,
+    updatedAt: now,
+    finishedAt: null,
+    cancelled: false,
+    options: {},
+    items: [{ url: 'https://example.com/', state: 'queued', attempts: 0 }],
+    ...overrides
+  };
+}
+
+test('job ids are 12 hex digits', () => {
+  assert.ok(isJobId('0123456789ab'));
+  for (const id of ['', '0123456789AB', '0123456789a', '../../etc/x', '..%2Fx', 'aaaaaaaaaaaa/', null, 42]) {
+    assert.equal(isJobId(id), false, String(id));
+  }
+});
+
+test('ids outside the jobs directory are never read or deleted', async () => {
+  const root = await tempDir();
+  const dir = path.join(root, 'data', 'save-jobs');
+  await fs.mkdir(dir, { recursive: true });
+  await fs.writeFile(path.join(root, 'victim.json'), JSON.stringify({ hello: 'world' }));
+  const jobs = await queue(dir);
+
+  assert.equal(await jobs.get('../../victim'), null);
+  assert.equal(await jobs.remove('../../victim'), false);
+  await jobs.forget('../../victim');
+  assert.equal(JSON.parse(await fs.readFile(path.join(root, 'victim.json'), 'utf8')).hello, 'world');
+  await fs.rm(root, { recursive: true, force: true });
+});
+
+test('job files that are not jobs are ignored', async () => {
+  const dir = await tempDir();
+  await fs.writeFile(path.join(dir, 'aaaaaaaaaaaa.json'), JSON.stringify({ id: 'aaaaaaaaaaaa', items: null }));
+  await fs.writeFile(path.join(dir, 'bbbbbbbbbbbb.json'), JSON.stringify(savedJob('cccccccccccc')));
+  await fs.writeFile(path.join(dir, 'dddddddddddd.json'), '{"truncated');
+  const jobs = await queue(dir);
+
+  for (const id of ['aaaaaaaaaaaa', 'bbbbbbbbbbbb', 'dddddddddddd']) {
+    assert.equal(await jobs.get(id), null, id);
+    assert.equal(await jobs.remove(id), false, id);
+  }
+  assert.deepEqual(await jobs.list(), []);
+  assert.equal(jobs.stats().jobs, 0);
+  await fs.rm(dir, { recursive: true, force: true });
+});
+
+test('a standalone queue runs its own jobs and removes them once finished', async () => {
+  const dir = await tempDir();
+  const jobs = await queue(dir);
+  const job = await jobs.create(['https://example.com/']);
+  assert.ok(isJobId(job.id));
+  assert.ok(jobs.isLocal(job.id));
+  assert.equal(job.owner, process.pid);
+
+  assert.equal(await jobs.remove(job.id), false, 'still running');
+  assert.equal(jobs.cancel(job.id).cancelled, true);
+  assert.ok((await jobs.get(job.id)).finishedAt);
+  assert.equal(await jobs.remove(job.id), true);
+  assert.equal(await jobs.get(job.id), null);
+  await fs.rm(dir, { recursive: true, force: true });
+});
+
+test('a standalone queue adopts jobs of dead processes only', async () => {
+  const dir = await tempDir();
+  // process.ppid is alive; a pid above the kernel limit never is
+  await fs.writeFile(path.join(dir, 'aaaaaaaaaaaa.json'), JSON.stringify(savedJob('aaaaaaaaaaaa', { owner: process.ppid })));
+  await fs.writeFile(path.join(dir, 'bbbbbbbbbbbb.json'), JSON.stringify(savedJob('bbbbbbbbbbbb', { owner: 2 ** 22 + 1 })));
+  const jobs = await queue(dir);
+
+  assert.equal(jobs.isLocal('aaaaaaaaaaaa'), false);
+  assert.equal(jobs.isLocal('bbbbbbbbbbbb'), true);
+  assert.equal(jobs.cancel('aaaaaaaaaaaa'), null, 'not ours to cancel');
+  await fs.rm(dir, { recursive: true, force: true });
+});
+
+test('coordinated workers leave jobs to the runner, which adopts each once', async () => {
+  const dir = await tempDir();
+  const worker = await queue(dir, { coordinated: true });
+  const runner = await queue(dir, { coordinated: true });
+
+  const job = await worker.create(['https://example.com/', 'https://example.org/']);
+  assert.equal(worker.isLocal(job.id), false);
+  assert.equal(JSON.parse(await fs.readFile(path.join(dir, `${job.id}.json`), 'utf8')).owner, null);
+  assert.equal(worker.cancel(job.id), null);
+  // Readable from any worker through its file
+  assert.equal((await worker.get(job.id)).total, 2);
+
+  await runner.sweep();
+  assert.equal(runner.isLocal(job.id), false, 'not the runner yet');
+
+  await Promise.all([runner.becomeRunner(), runner.sweep(), runner.sweep()]);
+  assert.equal(runner.isLocal(job.id), true);
+  assert.deepEqual(runner.order, [job.id]);
+  assert.equal(runner.jobs.get(job.id).owner, process.pid);
+  assert.equal(runner.stats().runner, true);
+  assert.equal(worker.stats().runner, false);
+  await fs.rm(dir, { recursive: true, force: true });
+});
+
+test('finished jobs are dropped once past retention', async () => {
+  const dir = await tempDir();
+  const old = Date.now() - 2 * OPTIONS.retention;
+  await fs.writeFile(path.join(dir, 'aaaaaaaaaaaa.json'), JSON.stringify(savedJob('aaaaaaaaaaaa', {
+    finishedAt: old,
+    items: [{ url: 'https://example.com/', state: 'success', attempts: 1 }]
+  })));
+  const jobs = await queue(dir);
+  const job = await jobs.create(['https://example.com/']);
+  jobs.cancel(job.id);
+  await jobs.flush();
+
+  await jobs.sweep();
+  assert.equal(await jobs.get('aaaaaaaaaaaa'), null);
+  assert.equal(jobs.isLocal(job.id), true, 'within retention');
+
+  jobs.jobs.get(job.id).finishedAt = old;
+  await jobs.sweep();
+  assert.equal(jobs.isLocal(job.id), false);
+  assert.deepEqual(await fs.readdir(dir), []);
+  await fs.rm(dir, { recursive: true, force: true });
+});
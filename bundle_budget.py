@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Production-build asset budget analyzer
+
+Reads the Vite output in dist/ and reports raw, gzip and brotli sizes per
+chunk. Modules are mapped to chunks through dist/.vite/manifest.json and
+dist/.vite/chunk-modules.json (written by the chunk-module-report plugin in
+vite.config.ts).
+
+Budgets live in bundle-budgets.json. Every passing run is appended to
+bundle-history.json, and a chunk that grows past max_growth_percent since
+the previous run fails too, so regressions are caught even under budget.
+A failure names the modules responsible.
+
+Usage:
+    npm run build && python3 bundle_budget.py
+    python3 bundle_budget.py --no-record        # check without writing history
+    python3 bundle_budget.py --json             # machine-readable output
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = 'dist'
+BUDGETS_FILE = 'bundle-budgets.json'
+HISTORY_FILE = 'bundle-history.json'
+HISTORY_LIMIT = 200
+ASSET_EXTENSIONS = ('.js', '.css')
+
+
+def human(n):
+    return '—' if n is None else f"{n / 1024:.1f} KB"
+
+
+def compressed_sizes(data):
+    gz = len(gzip.compress(data, compresslevel=9, mtime=0))
+    br = len(brotli.compress(data, quality=11)) if brotli else None
+    return gz, br
+
+
+def chunk_name(file_name, modules_report, manifest_names):
+    """Stable name for a chunk across builds (hashes stripped)"""
+    info = modules_report.get(file_name)
+    if info and info.get('name'):
+        return info['name']
+    if file_name in manifest_names:
+        return manifest_names[file_name]
+    base = os.path.basename(file_name)
+    return re.sub(r'-[A-Za-z0-9_-]{8}(?=\.)', '', base)
+
+
+def module_owner(module_id):
+    """Group node_modules files by package so reports stay readable"""
+    parts = module_id.replace('\\', '/').split('/')
+    if 'node_modules' in parts:
+        i = len(parts) - 1 - parts[::-1].index('node_modules')
+        pkg = parts[i + 1:i + 3] if parts[i + 1].startswith('@') else parts[i + 1:i + 2]
+        return 'npm:' + '/'.join(pkg)
+    return module_id
+
+
+def analyze(dist_dir):
+    vite_dir = os.path.join(dist_dir, '.vite')
+    manifest, modules_report = {}, {}
+    for path, target in ((os.path.join(vite_dir, 'manifest.json'), 'manifest'),
+                         (os.path.join(vite_dir, 'chunk-modules.json'), 'modules')):
+        if os.path.exists(path):
+            with open(path) as f:
+                if target == 'manifest':
+                    manifest = json.load(f)
+                else:
+                    modules_report = json.load(f)
+
+    manifest_names = {}
+    for src, entry in manifest.items():
+        manifest_names[entry['file']] = entry.get('name') or os.path.splitext(os.path.basename(src))[0]
+        for css in entry.get('css', []):
+            manifest_names.setdefault(css, (entry.get('name') or 'style') + '.css')
+
+    chunks = {}
+    for dirpath, _, filenames in os.walk(dist_dir):
+        if os.path.relpath(dirpath, dist_dir).startswith('.vite'):
+            continue
+        for filename in sorted(filenames):
+            if not filename.endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, dist_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            gz, br = compressed_sizes(data)
+            modules = {}
+            for module_id, size in (modules_report.get(rel, {}).get('modules') or {}).items():
+                owner = module_owner(module_id)
+                modules[owner] = modules.get(owner, 0) + size
+            name = chunk_name(rel, modules_report, manifest_names)
+            if name in chunks:
+                name = f"{name} ({rel})"
+            chunks[name] = {
+                'file': rel,
+                'raw': len(data),
+                'gzip': gz,
+                'brotli': br,
+                'entry': bool(modules_report.get(rel, {}).get('isEntry')),
+                'modules': dict(sorted(modules.items(), key=lambda kv: -kv[1])),
+            }
+    return chunks
+
+
+def budget_for(name, budgets):
+    chunk_budgets = budgets.get('chunks', {})
+    if name in chunk_budgets:
+        return chunk_budgets[name]
+    ext = '.css' if name.endswith('.css') else '.js'
+    return chunk_budgets.get('*' + ext) or chunk_budgets.get('*')
+
+
+def module_growth(current, previous):
+    """Modules sorted by how much they grew since the previous run"""
+    growth = []
+    for module, size in current.items():
+        delta = size - previous.get(module, 0)
+        if delta > 0:
+            growth.append((module, delta, module not in previous))
+    return sorted(growth, key=lambda g: -g[1])
+
+
+def check(chunks, budgets, previous_run):
+    failures = []
+    metric_keys = ('raw', 'gzip', 'brotli')
+    previous_chunks = (previous_run or {}).get('chunks', {})
+    max_growth = budgets.get('max_growth_percent')
+
+    for name, chunk in chunks.items():
+        budget = budget_for(name, budgets) or {}
+        prev = previous_chunks.get(name)
+        culprits = module_growth(chunk['modules'], prev.get('modules', {})) if prev else []
+        top_modules = list(chunk['modules'].items())[:3]
+
+        def offenders():
+            if culprits:
+                return ', '.join(f"{m} (+{human(d)}{', new' if new else ''})" for m, d, new in culprits[:3])
+            return ', '.join(f"{m} ({human(s)})" for m, s in top_modules) or 'no module map - rebuild with vite.config.ts plugin'
+
+        for key in metric_keys:
+            limit = budget.get(key)
+            if limit is not None and chunk[key] is not None and chunk[key] > limit:
+                failures.append(f"{name}: {key} {human(chunk[key])} exceeds budget {human(limit)}; "
+                                f"largest contributors: {offenders()}")
+        if prev and max_growth is not None and prev.get('gzip'):
+            growth = (chunk['gzip'] - prev['gzip']) / prev['gzip'] * 100
+            if growth > max_growth:
+                failures.append(f"{name}: gzip grew {growth:.1f}% since {previous_run['date']} "
+                                f"({human(prev['gzip'])} -> {human(chunk['gzip'])}); "
+                                f"grew most: {offenders()}")
+
+    total_budget = budgets.get('total', {})
+    for key in metric_keys:
+        limit = total_budget.get(key)
+        total = sum(c[key] for c in chunks.values() if c[key] is not None)
+        if limit is not None and total > limit:
+            biggest = max(chunks.items(), key=lambda kv: kv[1][key])
+            failures.append(f"total {key} {human(total)} exceeds budget {human(limit)}; "
+                            f"largest chunk: {biggest[0]} ({human(biggest[1][key])})")
+    return failures
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check production bundle sizes against budgets')
+    parser.add_argument('--dist', default=DIST_DIR)
+    parser.add_argument('--budgets', default=BUDGETS_FILE)
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--no-record', action='store_true', help='Do not append a passing run to the history')
+    parser.add_argument('--json', action='store_true', help='Print the analysis as JSON')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dist):
+        print(f"❌ {args.dist}/ not found - run 'npm run build' first")
+        return 2
+
+    chunks = analyze(args.dist)
+    budgets = load_json(args.budgets, {})
+    history = load_json(args.history, [])
+    previous_run = history[-1] if history else None
+    failures = check(chunks, budgets, previous_run)
+
+    run = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'chunks': chunks,
+    }
+
+    if args.json:
+        print(json.dumps(dict(run, failures=failures), indent=2))
+    else:
+        print("=" * 80)
+        print("BUNDLE SIZE REPORT" + ('' if brotli else ' (pip install brotli for brotli sizes)'))
+        print("=" * 80)
+        print(f"{'Chunk':<32}{'Raw':>12}{'Gzip':>12}{'Brotli':>12}  Top module")
+        for name, c in sorted(chunks.items(), key=lambda kv: -kv[1]['raw']):
+            top = next(iter(c['modules']), '')
+            print(f"{name[:31]:<32}{human(c['raw']):>12}{human(c['gzip']):>12}{human(c['brotli']):>12}  {top}")
+        print("-" * 80)
+        for key in ('raw', 'gzip', 'brotli'):
+            total = sum(c[key] for c in chunks.values() if c[key] is not None)
+            print(f"   Total {key}: {human(total)}")
+
+        if failures:
+            print("\n❌ BUDGET FAILURES:")
+            for failure in failures:
+                print(f"   - {failure}")
+        else:
+            print("\n✅ All chunks within budget")
+
+    # Only passing runs become the baseline, so a regression keeps failing until fixed
+    if not args.no_record and not failures:
+        history.append(run)
+        with open(args.history, 'w') as f:
+            json.dump(history[-HISTORY_LIMIT:], f, indent=2)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
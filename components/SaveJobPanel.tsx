@@ -0,0 +1,243 @@
+import React, { useState, useEffect } from 'react';
+import { Layers, CheckCircle, XCircle, Loader2, RotateCcw, Square, X, AlertTriangle } from 'lucide-react';
+import {
+  backendService,
+  SaveJob,
+  SaveJobItem,
+  SaveJobSummary,
+} from '../services/backendService';
+import { Button } from './ui/Button';
+
+// The job being followed, so a reload picks its progress up again
+const JOB_KEY = 'omnidash_save_job';
+const RECENT_LIMIT = 10;
+const FAILED_SHOWN = 50;
+
+const parseUrls = (text: string) =>
+  text
+    .split(/\s+/)
+    .map(url => url.trim())
+    .filter(Boolean)
+    .map(url => (!url.startsWith('http') && url.includes('.') ? 'http://' + url : url));
+
+/**
+ * Batch SavePageNow: queue a list of URLs on the backend and follow the
+ * job's progress as it streams in. Only counts, failures and the latest
+ * captures are kept in state, so jobs of thousands of URLs stay cheap.
+ */
+const SaveJobPanel: React.FC = () => {
+  const [text, setText] = useState('');
+  const [captureOutlinks, setCaptureOutlinks] = useState(false);
+  const [jobId, setJobId] = useState<string | null>(() => localStorage.getItem(JOB_KEY));
+  const [summary, setSummary] = useState<SaveJobSummary | null>(null);
+  const [failed, setFailed] = useState<Map<number, SaveJobItem>>(new Map());
+  const [recent, setRecent] = useState<SaveJobItem[]>([]);
+  const [watchCount, setWatchCount] = useState(0);
+  const [busy, setBusy] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    if (!jobId) return;
+    const applySnapshot = (job: SaveJob) => {
+      const { items, ...rest } = job;
+      setSummary(rest);
+      setFailed(new Map(items.filter(item => item.state === 'error').map(item => [item.index, item])));
+      setRecent(items.filter(item => item.state === 'success').slice(-RECENT_LIMIT).reverse());
+    };
+    const applyItem = (item: SaveJobItem) => {
+      setFailed(prev => {
+        if (item.state !== 'error' && !prev.has(item.index)) return prev;
+        const next = new Map(prev);
+        if (item.state === 'error') next.set(item.index, item);
+        else next.delete(item.index);
+        return next;
+      });
+      if (item.state === 'success') {
+        setRecent(prev => [item, ...prev].slice(0, RECENT_LIMIT));
+      }
+    };
+    try {
+      return backendService.watchSaveJob(jobId, {
+        onSnapshot: applySnapshot,
+        onItem: applyItem,
+        onProgress: setSummary,
+        onEnd: setSummary,
+      });
+    } catch (e: any) {
+      setError(e.message);
+    }
+  }, [jobId, watchCount]);
+
+  const urls = parseUrls(text);
+
+  const startJob = async () => {
+    setError(null);
+    setBusy(true);
+    try {
+      const job = await backendService.createSaveJob(urls, { captureOutlinks });
+      localStorage.setItem(JOB_KEY, job.id);
+      setSummary(job);
+      setFailed(new Map());
+      setRecent([]);
+      setJobId(job.id);
+      setText('');
+    } catch (e: any) {
+      setError(e.message);
+    } finally {
+      setBusy(false);
+    }
+  };
+
+  const updateJob = async (action: 'cancel' | 'retry') => {
+    if (!jobId) return;
+    setError(null);
+    try {
+      setSummary(await backendService.updateSaveJob(jobId, action));
+      // A retried job streams again; the previous stream ended with the job
+      if (action === 'retry') setWatchCount(count => count + 1);
+    } catch (e: any) {
+      setError(e.message);
+    }
+  };
+
+  const dismiss = () => {
+    localStorage.removeItem(JOB_KEY);
+    setJobId(null);
+    setSummary(null);
+    setFailed(new Map());
+    setRecent([]);
+  };
+
+  const counts = summary?.counts;
+  const done = counts ? counts.success + counts.error + counts.cancelled : 0;
+  const percent = summary && summary.total ? Math.round((done / summary.total) * 100) : 0;
+
+  return (
+    <div className="bg-gray-800 border border-gray-700 rounded-xl overflow-hidden mb-6">
+      <div className="bg-gray-900 px-6 py-3 border-b border-gray-700 font-medium text-gray-300 flex justify-between items-center">
+        <span className="flex items-center gap-2">
+          <Layers className="w-4 h-4" /> Batch Capture
+        </span>
+        <span className="text-xs text-gray-500">Runs on the backend, survives reloads</span>
+      </div>
+
+      <div className="p-4 space-y-3">
+        <textarea
+          value={text}
+          onChange={e => setText(e.target.value)}
+          rows={4}
+          placeholder="One URL per line (thousands are fine)"
+          className="w-full bg-gray-900 border border-gray-600 rounded-lg p-3 text-sm font-mono text-gray-100 focus:ring-2 focus:ring-indigo-500 outline-none placeholder-gray-500"
+        />
+        <div className="flex items-center justify-between">
+          <label className="flex items-center gap-2 text-sm text-gray-400">
+            <input
+              type="checkbox"
+              checked={captureOutlinks}
+              onChange={e => setCaptureOutlinks(e.target.checked)}
+            />
+            Also capture outlinks
+          </label>
+          <Button
+            onClick={startJob}
+            isLoading={busy}
+            disabled={urls.length === 0}
+            className="bg-indigo-600 hover:bg-indigo-500"
+          >
+            Queue {urls.length || ''} URL{urls.length === 1 ? '' : 's'}
+          </Button>
+        </div>
+
+        {error && (
+          <div className="flex items-center gap-2 text-red-400 bg-red-500/10 p-3 rounded-lg border border-red-500/20 text-sm">
+            <AlertTriangle className="w-4 h-4" /> {error}
+          </div>
+        )}
+
+        {summary && counts && (
+          <div className="border-t border-gray-700 pt-3 space-y-3">
+            <div className="flex items-center justify-between text-sm">
+              <span className="text-gray-300">
+                {summary.finishedAt ? 'Finished' : 'Capturing'}: {done.toLocaleString()} of{' '}
+                {summary.total.toLocaleString()} ({percent}%)
+              </span>
+              <div className="flex items-center gap-2">
+                {!summary.finishedAt && (
+                  <Button variant="ghost" onClick={() => updateJob('cancel')} title="Stop submitting">
+                    <Square className="w-4 h-4" /> Cancel
+                  </Button>
+                )}
+                {summary.finishedAt && counts.error + counts.cancelled > 0 && (
+                  <Button variant="secondary" onClick={() => updateJob('retry')}>
+                    <RotateCcw className="w-4 h-4" /> Retry {counts.error + counts.cancelled}
+                  </Button>
+                )}
+                {summary.finishedAt && (
+                  <Button variant="ghost" onClick={dismiss} title="Dismiss">
+                    <X className="w-4 h-4" />
+                  </Button>
+                )}
+              </div>
+            </div>
+            <div className="h-2 bg-gray-700 rounded-full overflow-hidden">
+              <div className="h-full bg-indigo-500 transition-all" style={{ width: `${percent}%` }} />
+            </div>
+            <div className="flex flex-wrap gap-3 text-xs">
+              <span className="text-green-400">{counts.success} saved</span>
+              <span className="text-yellow-400">
+                {counts.pending + counts.submitting} capturing
+              </span>
+              <span className="text-gray-400">{counts.queued} queued</span>
+              <span className="text-red-400">{counts.error} failed</span>
+              {counts.cancelled > 0 && <span className="text-gray-500">{counts.cancelled} cancelled</span>}
+            </div>
+            {summary.blocked && (
+              <div className="text-xs text-yellow-400">Paused: {summary.blocked}</div>
+            )}
+            {!summary.blocked && summary.pausedUntil && (
+              <div className="text-xs text-yellow-400 flex items-center gap-1.5">
+                <Loader2 className="w-3 h-3 animate-spin" /> SavePageNow is throttling; resuming at{' '}
+                {new Date(summary.pausedUntil).toLocaleTimeString()}
+              </div>
+            )}
+
+            {recent.length > 0 && (
+              <div className="space-y-1">
+                {recent.map(item => (
+                  <div key={item.index} className="flex items-center gap-2 text-xs">
+                    <CheckCircle className="w-3 h-3 text-green-400 shrink-0" />
+                    <a
+                      href={item.snapshotUrl}
+                      target="_blank"
+                      rel="noreferrer"
+                      className="font-mono text-gray-300 truncate hover:text-indigo-300"
+                    >
+                      {item.url}
+                    </a>
+                  </div>
+                ))}
+              </div>
+            )}
+
+            {failed.size > 0 && (
+              <div className="space-y-1 max-h-48 overflow-auto custom-scrollbar">
+                {[...failed.values()].slice(0, FAILED_SHOWN).map(item => (
+                  <div key={item.index} className="flex items-center gap-2 text-xs" title={item.error}>
+                    <XCircle className="w-3 h-3 text-red-400 shrink-0" />
+                    <span className="font-mono text-gray-300 truncate">{item.url}</span>
+                    <span className="text-red-400/80 truncate">{item.error}</span>
+                  </div>
+                ))}
+                {failed.size > FAILED_SHOWN && (
+                  <div className="text-xs text-gray-500">and {failed.size - FAILED_SHOWN} more</div>
+                )}
+              </div>
+            )}
+          </div>
+        )}
+      </div>
+    </div>
+  );
+};
+
+export default SaveJobPanel;
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Scripted dashboard interactions shared by the harness tools
+
+Each flow navigates to a view through the sidebar, optionally switches tab,
+submits a query and waits for the view's submit button to leave its loading
+state. run_flow() returns how long that took, so network_matrix.py and
+soak_test.py can time the same user-visible work.
+"""
+
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+APP_URL = 'http://localhost:3001'
+
+FLOWS = [
+    {'view': 'Home', 'nav': 'Home'},
+    {'view': 'Item Search', 'nav': 'Item Search',
+     'input': 'Enter Identifier or paste Archive.org URL', 'query': 'nasa'},
+    {'view': 'Deep Search', 'nav': 'Deep Search',
+     'input': 'Search for anything', 'query': 'grateful dead'},
+    {'view': 'Wayback Check URL', 'nav': 'Wayback Machine', 'tab': 'Check URL',
+     'input': 'Enter URL to check availability', 'query': 'example.com'},
+    {'view': 'Wayback History', 'nav': 'Wayback Machine', 'tab': 'History',
+     'input': 'Enter URL to view history', 'query': 'example.com'},
+    {'view': 'View Analytics', 'nav': 'View Analytics',
+     'input': 'Enter Identifier', 'query': 'nasa'},
+]
+
+
+def enable_demo_mode(driver, base_url=APP_URL):
+    """Point the app at its built-in mock service (the local API stand-in)"""
+    driver.get(base_url)
+    driver.execute_script(
+        "const s = JSON.parse(localStorage.getItem('omnidash_settings') || '{}');"
+        "s.demoMode = true;"
+        "localStorage.setItem('omnidash_settings', JSON.stringify(s));"
+    )
+    driver.refresh()
+    time.sleep(2)
+
+
+def navigate_to(driver, label, timeout=10):
+    """Click a sidebar entry by its visible label"""
+    button = WebDriverWait(driver, timeout).until(
+        lambda d: d.find_element(By.XPATH, f"//button[.//span[text()='{label}']]")
+    )
+    button.click()
+
+
+def run_flow(driver, flow, timeout=60):
+    """Run one flow and return {'view', 'ms', 'ok', 'error'}"""
+    started = time.perf_counter()
+    try:
+        navigate_to(driver, flow['nav'])
+        if flow.get('tab'):
+            WebDriverWait(driver, 10).until(
+                lambda d: d.find_element(By.XPATH, f"//button[normalize-space()='{flow['tab']}']")
+            ).click()
+        if flow.get('input'):
+            field = WebDriverWait(driver, 10).until(
+                lambda d: d.find_element(By.XPATH, f"//input[starts-with(@placeholder, '{flow['input']}')]")
+            )
+            submit = field.find_element(By.XPATH, "./ancestor::form//button[@type='submit']")
+            field.clear()
+            field.send_keys(flow['query'])
+            field.send_keys(Keys.ENTER)
+            # The submit button is disabled while the view is loading
+            try:
+                WebDriverWait(driver, 2).until(lambda d: not submit.is_enabled())
+            except TimeoutException:
+                pass  # finished before we looked
+            WebDriverWait(driver, timeout).until(lambda d: submit.is_enabled())
+        return {'view': flow['view'], 'ms': (time.perf_counter() - started) * 1000, 'ok': True, 'error': None}
+    except (TimeoutException, WebDriverException) as e:
+        return {
+            'view': flow['view'],
+            'ms': (time.perf_counter() - started) * 1000,
+            'ok': False,
+            'error': str(e).splitlines()[0] if str(e) else type(e).__name__,
+        }
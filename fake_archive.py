@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the archive.org APIs the backend proxies
+
+Answers with deterministic fake data (the same URL always gets the same
+body) for:
+
+    /metadata/<identifier>          archive origin   ("missing-*" -> {})
+    /advancedsearch.php             archive origin
+    /wayback/available              archive origin
+    /cdx/search/cdx                 wayback origin
+    /views/v1/short/<identifier>    views origin
+
+Each upstream listens on its own port, because the backend maps stand-in
+URLs back to the public hosts by origin (backend/lib/endpoints.js).
+Response times are log-normal around --latency-ms, and --error-rate of the
+responses are 503s, so the breaker and retry paths get exercised too.
+Every metadata document carries "_fake_archive": true, which load_test.py
+checks before it sends any load.
+
+Usage:
+    python3 fake_archive.py --port 8780          # ports 8780-8782
+    python3 fake_archive.py --latency-ms 300 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import math
+import random
+import socket
+import sys
+from aiohttp import web
+
+ORIGINS = ('archive', 'wayback', 'views')
+FORMATS = ['JPEG', 'Text PDF', 'DjVuTXT', 'Metadata', 'Archive BitTorrent', 'VBR MP3', 'h.264']
+MEDIATYPES = ['texts', 'audio', 'movies', 'image', 'software', 'collection']
+
+
+def seeded(*parts):
+    """A Random seeded from the request, so repeated URLs get identical bodies"""
+    digest = hashlib.sha256('\x00'.join(str(p) for p in parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def fake_doc(rng, identifier):
+    return {
+        'identifier': identifier,
+        'title': identifier.replace('-', ' ').title(),
+        'mediatype': rng.choice(MEDIATYPES),
+        'date': f"{rng.randint(1900, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'downloads': rng.randint(0, 2_000_000),
+        'description': ' '.join(rng.choice(['archive', 'public', 'domain', 'scan', 'audio', 'film'])
+                                for _ in range(rng.randint(5, 40))),
+    }
+
+
+class FakeArchive:
+    def __init__(self, latency_ms=80.0, jitter=0.5, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = collections.Counter()
+        self.app = web.Application(middlewares=[self.shape])
+        self.app.add_routes([
+            web.get('/metadata/{identifier}', self.metadata),
+            web.get('/advancedsearch.php', self.search),
+            web.get('/wayback/available', self.available),
+            web.get('/cdx/search/cdx', self.cdx),
+            web.get('/views/v1/short/{identifier}', self.views),
+        ])
+
+    @web.middleware
+    async def shape(self, request, handler):
+        """Count, delay and occasionally fail every request"""
+        route = request.match_info.route.resource
+        self.requests[route.canonical if route else 'unmatched'] += 1
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.rng.lognormvariate(math.log(self.latency_ms / 1000), self.jitter))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return web.json_response({'error': 'Injected failure'}, status=503)
+        return await handler(request)
+
+    async def metadata(self, request):
+        identifier = request.match_info['identifier']
+        auth = request.headers.get('Authorization')
+        if auth is not None and (not auth.startswith('LOW ') or ':' not in auth):
+            return web.json_response({'error': 'Bad authorization'}, status=401)
+        if identifier.startswith('missing-'):
+            return web.json_response({})
+        rng = seeded('metadata', identifier)
+        files = [{
+            'name': f"{identifier}_{i:04d}.{rng.choice(['jpg', 'pdf', 'txt', 'xml', 'mp3', 'mp4'])}",
+            'source': rng.choice(['original', 'derivative']),
+            'format': rng.choice(FORMATS),
+            'size': str(rng.randint(1_000, 50_000_000)),
+            'md5': '%032x' % rng.getrandbits(128),
+        } for i in range(rng.randint(3, 120))]
+        return web.json_response({
+            '_fake_archive': True,
+            'created': 1700000000,
+            'd1': f"ia80{rng.randint(0, 9)}{rng.randint(100, 999)}.us.archive.org",
+            'dir': f"/{rng.randint(1, 30)}/items/{identifier}",
+            'files': files,
+            'files_count': len(files),
+            'item_size': sum(int(f['size']) for f in files),
+            'metadata': dict(fake_doc(rng, identifier), collection=['opensource', 'community']),
+            'uniq': rng.getrandbits(31),
+        })
+
+    async def search(self, request):
+        query = request.query.get('q', '')
+        rows = min(int(request.query.get('rows', 50)), 10_000)
+        page = max(int(request.query.get('page', 1)), 1)
+        rng = seeded('search', query)
+        found = rng.randint(0, 50_000)
+        start = (page - 1) * rows
+        count = max(0, min(rows, found - start))
+        slug = ''.join(c if c.isalnum() else '-' for c in query.lower())[:40] or 'item'
+        docs = [fake_doc(seeded('doc', query, start + i), f"{slug}-{start + i}") for i in range(count)]
+        return web.json_response({
+            'responseHeader': {'status': 0, 'QTime': rng.randint(1, 200), 'params': dict(request.query)},
+            'response': {'numFound': found, 'start': start, 'docs': docs},
+        })
+
+    async def available(self, request):
+        url = request.query.get('url', '')
+        rng = seeded('available', url)
+        if rng.random() < 0.2:
+            return web.json_response({'url': url, 'archived_snapshots': {}})
+        timestamp = f"{rng.randint(1997, 2024)}0101000000"
+        return web.json_response({'url': url, 'archived_snapshots': {'closest': {
+            'status': '200', 'available': True, 'timestamp': timestamp,
+            'url': f"http://web.archive.org/web/{timestamp}/{url}",
+        }}})
+
+    async def cdx(self, request):
+        url = request.query.get('url', '')
+        fields = request.query.get('fl', 'urlkey,timestamp,original,mimetype,statuscode,digest,length').split(',')
+        limit = int(request.query.get('limit', 10_000))
+        rng = seeded('cdx', url)
+        total = rng.randint(0, 5_000)
+        rows = []
+        for i in range(total):
+            # Spread over 1997-2024 in order, like a real capture history
+            row = {
+                'urlkey': url, 'original': url, 'mimetype': 'text/html',
+                'timestamp': '%04d%02d%02d000000' % (1997 + i * 28 // total, 1 + i % 12, 1 + i % 28),
+                'statuscode': rng.choice(['200', '200', '200', '301', '404']),
+                'digest': '%032X' % rng.getrandbits(128), 'length': str(rng.randint(500, 90_000)),
+            }
+            rows.append([row.get(f, '') for f in fields])
+        rows = rows[limit:] if limit < 0 else rows[:limit]
+        if request.query.get('output') != 'json':
+            return web.Response(text=''.join(' '.join(r) + '\n' for r in rows), content_type='text/plain')
+        return web.json_response([fields] + rows if rows else [])
+
+    async def views(self, request):
+        identifier = request.match_info['identifier']
+        rng = seeded('views', identifier)
+        days = [rng.randint(0, 500) for _ in range(30)]
+        return web.json_response({identifier: {
+            'have_data': True, 'all_time': sum(days) * rng.randint(10, 100),
+            'last_7day': sum(days[-7:]), 'last_30day': sum(days),
+        }})
+
+
+def bind(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    return sock
+
+
+async def start_fake_archive(host='127.0.0.1', port=0, **options):
+    """
+    Serve a FakeArchive on one port per origin (port, port+1, port+2; or
+    free ports with port=0). Returns (fake, runner, env) where env holds the
+    backend's base-URL overrides.
+    """
+    fake = FakeArchive(**options)
+    runner = web.AppRunner(fake.app, access_log=None)
+    await runner.setup()
+    bases = {}
+    for offset, origin in enumerate(ORIGINS):
+        sock = bind(host, port + offset if port else 0)
+        await web.SockSite(runner, sock).start()
+        bases[origin] = f"http://{host}:{sock.getsockname()[1]}"
+    env = {
+        'ARCHIVE_BASE_URL': bases['archive'],
+        'WAYBACK_BASE_URL': bases['wayback'],
+        'CDX_API_URL': f"{bases['wayback']}/cdx/search/cdx",
+        'VIEWS_BASE_URL': bases['views'],
+    }
+    return fake, runner, env
+
+
+async def serve(args):
+    fake, runner, env = await start_fake_archive(
+        args.host, args.port, latency_ms=args.latency_ms, jitter=args.jitter,
+        error_rate=args.error_rate, seed=args.seed)
+    print("🗄️  Fake archive.org running. Start the backend with:")
+    for name, value in env.items():
+        print(f"   {name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        print(f"\n📊 Requests served: {dict(fake.requests)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a fake archive.org for local load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8780, help='First of three consecutive ports')
+    parser.add_argument('--latency-ms', type=float, default=80, help='Median response time')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Log-normal sigma of response times')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of responses that are 503s')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
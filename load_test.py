@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Load test for the backend proxy against a local fake archive.org
+
+Replays a mixed workload - metadata, CDX and advanced search through
+/api/proxy/archive, plus credentials status and validate - from closed-loop
+asyncio workers, ramping concurrency level by level. For each level it
+records throughput, p50/p95/p99 latency (overall and per operation) and the
+error rate, then names the saturation point: the first level where adding
+workers stops paying (throughput gain below --min-gain), errors pass
+--max-error-rate, or p95 passes --p95-slo-ms.
+
+Upstream traffic never leaves the machine. By default the script starts
+fake_archive.py and spawns `node backend/server.js` with its base URLs,
+credentials file and data dir pointed at the stand-in and a temp dir, and
+with the outbound rate limiter opened up so the run measures the proxy
+rather than the limiter. With --backend it drives a backend you started
+yourself against `python3 fake_archive.py` (credentials are then left
+alone); a sentinel request checks it really answers from the fake first.
+
+Identifiers, queries and sites are drawn Zipf-style from --keyspace keys, so
+the response cache and single-flight see a realistic mix of hits and misses.
+
+Usage:
+    python3 load_test.py
+    python3 load_test.py --levels 1,4,16,64,256 --step-seconds 30 --latency-ms 150
+    python3 load_test.py --mix metadata=60,search=40 --backend-env CLUSTER=1 --cluster
+    python3 load_test.py --backend http://localhost:3002 --fake-port 8780
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+import aiohttp
+
+from fake_archive import start_fake_archive
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+DEFAULT_LEVELS = [1, 2, 4, 8, 16, 32, 64, 128]
+DEFAULT_MIX = {'metadata': 40, 'search': 20, 'cdx': 20, 'credentials_status': 15, 'validate': 5}
+CDX_FIELDS = 'urlkey,timestamp,original,mimetype,statuscode,digest,length'
+SENTINEL_ID = 'omnidash-loadtest-sentinel'
+
+# Spawned backends get an open limiter unless --backend-env says otherwise
+SPAWN_ENV = {
+    'RATE_LIMIT_RPS': '100000',
+    'RATE_LIMIT_BURST': '100000',
+    'RATE_LIMIT_MAX_QUEUE': '100000',
+}
+
+
+class Keyspace:
+    """Zipf-distributed keys: a few hot ones, a long tail of cold ones"""
+
+    def __init__(self, size, exponent=1.1):
+        weights = [1 / (rank ** exponent) for rank in range(1, size + 1)]
+        total, running = sum(weights), 0.0
+        self.cumulative = []
+        for w in weights:
+            running += w / total
+            self.cumulative.append(running)
+        self.ranks = list(range(size))
+
+    def pick(self, rng):
+        return rng.choices(self.ranks, cum_weights=self.cumulative)[0]
+
+
+# --- Operations: each returns (status, ok) ----------------------------------
+
+async def proxy(session, base, url):
+    async with session.post(f"{base}/api/proxy/archive", json={'url': url}) as res:
+        await res.read()
+        return res.status, res.status < 400
+
+
+async def op_metadata(session, base, rng, keys):
+    return await proxy(session, base, f"https://archive.org/metadata/item-{keys.pick(rng)}")
+
+
+async def op_search(session, base, rng, keys):
+    params = [('q', f"subject:topic{keys.pick(rng)}")]
+    params += [('fl[]', f) for f in ('identifier', 'title', 'mediatype', 'date', 'downloads')]
+    params += [('rows', '50'), ('page', '1'), ('output', 'json'), ('sort[]', 'downloads desc')]
+    return await proxy(session, base, f"https://archive.org/advancedsearch.php?{urlencode(params)}")
+
+
+async def op_cdx(session, base, rng, keys):
+    params = {'url': f"site{keys.pick(rng)}.example.com", 'output': 'json', 'limit': '1000', 'fl': CDX_FIELDS}
+    return await proxy(session, base, f"https://web.archive.org/cdx/search/cdx?{urlencode(params)}")
+
+
+async def op_credentials_status(session, base, rng, keys):
+    async with session.get(f"{base}/api/credentials/status") as res:
+        await res.read()
+        return res.status, res.status < 400
+
+
+async def op_validate(session, base, rng, keys):
+    async with session.post(f"{base}/api/credentials/validate") as res:
+        body = await res.json(content_type=None)
+        # A rejection is a correct answer; only a failed check is an error
+        return res.status, res.status < 400 and ('valid' in body)
+
+
+OPERATIONS = {
+    'metadata': op_metadata,
+    'search': op_search,
+    'cdx': op_cdx,
+    'credentials_status': op_credentials_status,
+    'validate': op_validate,
+}
+
+
+# --- Statistics -------------------------------------------------------------
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'mean': sum(ordered) / len(ordered) if ordered else None,
+        'max': ordered[-1] if ordered else None,
+    }
+
+
+def summarize(concurrency, samples, elapsed):
+    """One level's results: samples are (op, ms, ok, status)"""
+    errors = {}
+    for _, _, ok, status in samples:
+        if not ok:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    by_op = {}
+    for op in sorted({s[0] for s in samples}):
+        mine = [s for s in samples if s[0] == op]
+        failed = sum(1 for s in mine if not s[2])
+        by_op[op] = {
+            'requests': len(mine),
+            'error_rate': failed / len(mine),
+            'latency_ms': latency_summary([s[1] for s in mine]),
+        }
+    failed = sum(errors.values())
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'goodput_rps': (len(samples) - failed) / elapsed if elapsed else 0.0,
+        'error_rate': failed / len(samples) if samples else 0.0,
+        'errors': errors,
+        'latency_ms': latency_summary([s[1] for s in samples]),
+        'by_op': by_op,
+    }
+
+
+def find_saturation(levels, min_gain, max_error_rate, p95_slo_ms):
+    """First level past the knee, with the reason; None if never reached"""
+    for i, level in enumerate(levels):
+        if level['error_rate'] > max_error_rate:
+            return level['concurrency'], f"error rate {level['error_rate']:.1%} > {max_error_rate:.1%}"
+        p95 = level['latency_ms']['p95']
+        if p95_slo_ms and p95 is not None and p95 > p95_slo_ms:
+            return level['concurrency'], f"p95 {p95:.0f} ms > SLO {p95_slo_ms:.0f} ms"
+        if i > 0:
+            previous = levels[i - 1]['throughput_rps']
+            gain = level['throughput_rps'] / previous - 1 if previous else 0.0
+            if gain < min_gain:
+                return level['concurrency'], f"throughput gain {gain:+.1%} < {min_gain:.0%}"
+    return None, 'not reached - add higher --levels'
+
+
+# --- Load -------------------------------------------------------------------
+
+async def run_level(session, base, concurrency, duration, warmup, mix, keys, rng):
+    """Closed loop: each worker sends its next request when the last returns"""
+    loop = asyncio.get_running_loop()
+    ops, weights = list(mix), list(mix.values())
+    measure_from = loop.time() + warmup
+    deadline = measure_from + duration
+    samples = []
+
+    async def worker(seed):
+        worker_rng = random.Random(seed)
+        while loop.time() < deadline:
+            op = worker_rng.choices(ops, weights)[0]
+            started = loop.time()
+            try:
+                status, ok = await OPERATIONS[op](session, base, worker_rng, keys)
+            except asyncio.TimeoutError:
+                status, ok = 'timeout', False
+            except (aiohttp.ClientError, ValueError) as e:
+                status, ok = type(e).__name__, False
+            if started >= measure_from:
+                samples.append((op, (loop.time() - started) * 1000, ok, status))
+
+    await asyncio.gather(*(worker(rng.random()) for _ in range(concurrency)))
+    return samples, loop.time() - measure_from
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def spawn_backend(fake_env, extra_env, workdir, cluster):
+    """Start node backend/server.js (or cluster.js) wired to the fake"""
+    if not shutil.which('node'):
+        raise RuntimeError('node not found on PATH - start the backend yourself and pass --backend')
+    port = free_port()
+    env = dict(os.environ, **SPAWN_ENV)
+    env.update(fake_env)
+    env.update({
+        'PORT': str(port),
+        'DATA_DIR': os.path.join(workdir, 'data'),
+        'CREDENTIALS_FILE': os.path.join(workdir, 'credentials.enc'),
+        'ENCRYPTION_KEY': secrets.token_hex(32),
+    })
+    env.update(extra_env)
+    log = open(os.path.join(workdir, 'backend.log'), 'w')
+    process = subprocess.Popen(['node', 'cluster.js' if cluster else 'server.js'],
+                               cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}", log.name
+
+
+async def wait_healthy(session, base, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process and process.poll() is not None:
+            raise RuntimeError(f"backend exited with status {process.returncode}")
+        try:
+            async with session.get(f"{base}/api/health") as res:
+                if res.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"backend at {base} not healthy after {timeout} s")
+
+
+async def check_sentinel(session, base):
+    """Refuse to load anything but the fake archive"""
+    async with session.post(f"{base}/api/proxy/archive",
+                            json={'url': f"https://archive.org/metadata/{SENTINEL_ID}"}) as res:
+        body = await res.json(content_type=None)
+    if not (isinstance(body, dict) and body.get('_fake_archive')):
+        raise RuntimeError('backend is not answering from the fake archive - start it with the '
+                           'base-URL overrides fake_archive.py prints')
+
+
+async def backend_stats(session, base):
+    try:
+        async with session.get(f"{base}/api/stats") as res:
+            return await res.json() if res.status == 200 else None
+    except aiohttp.ClientError:
+        return None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}' (have {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_env(values):
+    env = {}
+    for value in values:
+        name, _, setting = value.partition('=')
+        env[name] = setting
+    return env
+
+
+async def run(args):
+    mix = args.mix or DEFAULT_MIX
+    keys = Keyspace(args.keyspace)
+    rng = random.Random(args.seed)
+    fake, fake_runner, fake_env = await start_fake_archive(
+        port=args.fake_port, latency_ms=args.latency_ms, jitter=args.jitter,
+        error_rate=args.error_rate, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix='omnidash-load-')
+    process, log_path = None, None
+    levels = []
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            if args.backend:
+                base = args.backend.rstrip('/')
+                print("🗄️  Fake archive.org - the backend must run with:")
+                for name, value in fake_env.items():
+                    print(f"   {name}={value}")
+            else:
+                process, base, log_path = spawn_backend(fake_env, parse_env(args.backend_env), workdir, args.cluster)
+            await wait_healthy(session, base, process)
+            await check_sentinel(session, base)
+            if process:
+                # Private credentials file, so validate has something to check
+                async with session.post(f"{base}/api/credentials",
+                                        json={'accessKey': 'LOADTEST', 'secretKey': 'load-test-secret'}) as res:
+                    res.raise_for_status()
+
+            print("=" * 70)
+            print(f"🔥 LOAD TEST: {base}  levels {args.levels}  {args.step_seconds:.0f} s each"
+                  f" (+{args.warmup_seconds:.0f} s warm-up)")
+            print(f"   mix {mix}  keyspace {args.keyspace}  fake latency {args.latency_ms:.0f} ms"
+                  f"  fake errors {args.error_rate:.1%}")
+            print("=" * 70)
+            print(f"   {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+
+            for concurrency in args.levels:
+                samples, elapsed = await run_level(session, base, concurrency, args.step_seconds,
+                                                   args.warmup_seconds, mix, keys, rng)
+                level = summarize(concurrency, samples, elapsed)
+                levels.append(level)
+                lat = level['latency_ms']
+                print(f"   {concurrency:>5} {level['throughput_rps']:>9.1f} {lat['p50'] or 0:>9.1f} "
+                      f"{lat['p95'] or 0:>9.1f} {lat['p99'] or 0:>9.1f} {level['error_rate']:>8.2%}")
+
+            stats = await backend_stats(session, base)
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        await fake_runner.cleanup()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    saturation_at, reason = find_saturation(levels, args.min_gain, args.max_error_rate, args.p95_slo_ms)
+    before = [lv for lv in levels if saturation_at is None or lv['concurrency'] < saturation_at] or levels[:1]
+    best = max(before, key=lambda lv: lv['throughput_rps'])
+    saturation = {
+        'concurrency': saturation_at,
+        'reason': reason,
+        'max_sustainable_concurrency': best['concurrency'],
+        'max_sustainable_throughput_rps': best['throughput_rps'],
+        'peak_throughput_rps': max(lv['throughput_rps'] for lv in levels),
+    }
+
+    print("\n" + "=" * 70)
+    if saturation_at is None:
+        print(f"📈 No saturation up to {levels[-1]['concurrency']} workers ({reason})")
+    else:
+        print(f"🧱 Saturation at {saturation_at} workers: {reason}")
+    print(f"   Best before the knee: {best['concurrency']} workers, {best['throughput_rps']:.1f} req/s")
+    upstream_calls = sum(fake.requests.values())
+    total_requests = sum(lv['requests'] for lv in levels)
+    print(f"   Upstream calls that reached the fake: {upstream_calls} for {total_requests} measured requests")
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump({
+            'benchmark': 'backend-proxy-load',
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'config': {
+                'backend': args.backend or ('spawned cluster.js' if args.cluster else 'spawned server.js'),
+                'backend_env': {**(SPAWN_ENV if not args.backend else {}), **parse_env(args.backend_env)},
+                'levels': args.levels,
+                'step_seconds': args.step_seconds,
+                'warmup_seconds': args.warmup_seconds,
+                'mix': mix,
+                'keyspace': args.keyspace,
+                'timeout_s': args.timeout,
+                'seed': args.seed,
+                'fake': {'latency_ms': args.latency_ms, 'jitter': args.jitter, 'error_rate': args.error_rate},
+                'saturation_rules': {'min_gain': args.min_gain, 'max_error_rate': args.max_error_rate,
+                                     'p95_slo_ms': args.p95_slo_ms},
+            },
+            'levels': levels,
+            'saturation': saturation,
+            'upstream_requests': dict(fake.requests),
+            'backend_stats': stats,
+        }, f, indent=2)
+    print(f"\n📄 Benchmark result saved: {args.out}")
+    if log_path and args.keep_workdir:
+        print(f"📄 Backend log: {log_path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ramp a mixed workload against the backend proxy')
+    parser.add_argument('--levels', type=lambda s: [int(x) for x in s.split(',')], default=DEFAULT_LEVELS,
+                        help='Comma-separated worker counts, in order')
+    parser.add_argument('--step-seconds', type=float, default=20, help='Measured time per level')
+    parser.add_argument('--warmup-seconds', type=float, default=3, help='Unmeasured ramp-in per level')
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help='op=weight,... from ' + ', '.join(OPERATIONS))
+    parser.add_argument('--keyspace', type=int, default=1000, help='Distinct identifiers/queries/sites')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout (s)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--backend', default=None, help='Use a running backend instead of spawning one')
+    parser.add_argument('--backend-env', action='append', default=[], metavar='NAME=VALUE',
+                        help='Extra environment for the spawned backend (repeatable)')
+    parser.add_argument('--cluster', action='store_true', help='Spawn cluster.js instead of server.js')
+    parser.add_argument('--keep-workdir', action='store_true', help='Keep the temp dir (backend log, data)')
+    parser.add_argument('--fake-port', type=int, default=0, help='First fake archive port (0 = any free)')
+    parser.add_argument('--latency-ms', type=float, default=80, help='Fake archive median latency')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Fake archive latency log-normal sigma')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of fake archive 503s')
+    parser.add_argument('--min-gain', type=float, default=0.10,
+                        help='Throughput gain per level below which the backend counts as saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--p95-slo-ms', type=float, default=None)
+    parser.add_argument('--out', default='test_screenshots/load_test_report.json')
+    args = parser.parse_args()
+    if args.backend and not args.fake_port:
+        args.fake_port = 8780  # a fixed port the hand-started backend can be pointed at
+    try:
+        return asyncio.run(run(args))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Network waterfall and HAR capture for Selenium test steps
+
+Chrome's performance log carries every CDP Network.* event. NetworkRecorder
+drains that log at step boundaries, rebuilds a HAR 1.2 file per step and
+summarises request count, transferred bytes, cache hits and the slowest
+upstream call (archive.org, CORS proxies, ...) for each view.
+
+Usage inside a test script:
+    options = Options()
+    enable_network_logging(options)
+    driver = webdriver.Chrome(options=options)
+    recorder = NetworkRecorder(driver)
+
+    recorder.start_step('Load app')
+    driver.get('http://localhost:3001')
+    recorder.start_step('Open Settings')   # closes the previous step
+    ...
+    recorder.finish()
+    recorder.write_report('test_screenshots/network_report.html')
+
+Scripts opt in with --har or OMNIDASH_HAR=1 (see har_mode_requested).
+"""
+
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from html import escape
+from urllib.parse import urlparse, parse_qsl
+
+HAR_DIR = 'test_screenshots/har'
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '0.0.0.0', '::1')
+
+
+def har_mode_requested():
+    """True when the calling script was started with --har or OMNIDASH_HAR=1"""
+    return '--har' in sys.argv or os.environ.get('OMNIDASH_HAR') == '1'
+
+
+def enable_network_logging(options):
+    """Turn on Chrome performance logging with Network events"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    options.add_experimental_option('perfLoggingPrefs', {
+        'enableNetwork': True,
+        'enablePage': False,
+    })
+    return options
+
+
+def classify_upstream(url):
+    """Label a request with the upstream it hit - used in summaries"""
+    parsed = urlparse(url)
+    host = parsed.hostname or ''
+    path = parsed.path
+    if host in LOCAL_HOSTS:
+        return 'backend proxy' if path.startswith('/api/') else 'app'
+    if 'allorigins' in host:
+        return 'AllOrigins'
+    if 'corsproxy.io' in host:
+        return 'corsproxy.io'
+    if '/cdx/' in path:
+        return 'CDX'
+    if 'advancedsearch' in path:
+        return 'advancedsearch'
+    if '/services/search/' in path:
+        return 'scrape'
+    if path.startswith('/metadata/'):
+        return 'metadata'
+    if '/views/' in path:
+        return 'views'
+    if path.startswith('/wayback/available'):
+        return 'availability'
+    if host.endswith('archive.org'):
+        return host
+    return 'third-party'
+
+
+def _is_upstream(url):
+    host = urlparse(url).hostname or ''
+    return bool(host) and host not in LOCAL_HOSTS and not url.startswith('data:')
+
+
+def _headers_list(headers):
+    return [{'name': k, 'value': str(v)} for k, v in (headers or {}).items()]
+
+
+def _iso(wall_time):
+    return datetime.fromtimestamp(wall_time, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class NetworkRecorder:
+    def __init__(self, driver, enabled=True, har_dir=HAR_DIR):
+        self.driver = driver
+        self.enabled = enabled
+        self.har_dir = har_dir
+        self.steps = []
+        self.current = None
+        if enabled:
+            os.makedirs(har_dir, exist_ok=True)
+            self._drain()  # discard anything logged before the first step
+
+    def _drain(self):
+        events = []
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            if message.get('method', '').startswith('Network.'):
+                events.append(message)
+        return events
+
+    def start_step(self, name):
+        """Begin a named step, closing the previous one"""
+        if not self.enabled:
+            return
+        if self.current:
+            self._close_step()
+        self.current = name
+
+    def finish(self):
+        """Close the last open step"""
+        if self.enabled and self.current:
+            self._close_step()
+            self.current = None
+
+    def _close_step(self):
+        index = len(self.steps) + 1
+        entries = self._build_entries(self._drain())
+        slug = re.sub(r'[^a-z0-9]+', '_', self.current.lower()).strip('_')
+        har_path = os.path.join(self.har_dir, f"{index:02d}_{slug}.har")
+        har = {
+            'log': {
+                'version': '1.2',
+                'creator': {'name': 'Archive-OmniDash network_capture', 'version': '1.0'},
+                'pages': [{
+                    'id': f"step_{index}",
+                    'title': self.current,
+                    'startedDateTime': entries[0]['startedDateTime'] if entries else _iso(datetime.now().timestamp()),
+                    'pageTimings': {},
+                }],
+                'entries': entries,
+            }
+        }
+        with open(har_path, 'w') as f:
+            json.dump(har, f, indent=2)
+        summary = self.summarize(entries)
+        summary.update({'step': self.current, 'har': har_path})
+        self.steps.append(summary)
+        slowest = summary['slowest_upstream']
+        print(f"🌐 {self.current}: {summary['requests']} requests, "
+              f"{summary['bytes'] / 1024:.1f} KB, {summary['cache_hits']} cached"
+              + (f", slowest {slowest['upstream']} {slowest['time_ms']:.0f} ms" if slowest else ''))
+
+    def _build_entries(self, events):
+        """Fold CDP Network events into HAR entries keyed by requestId"""
+        requests = {}
+        order = []
+        for event in events:
+            method = event['method']
+            params = event.get('params', {})
+            request_id = params.get('requestId')
+            if not request_id:
+                continue
+            if method == 'Network.requestWillBeSent':
+                if request_id in requests and params.get('redirectResponse'):
+                    # A redirect reuses the requestId; keep the hop as its own entry
+                    hop = requests.pop(request_id)
+                    hop['response'] = params['redirectResponse']
+                    hop['finished'] = params['timestamp']
+                    hop_id = f"{request_id}:redirect{len(order)}"
+                    requests[hop_id] = hop
+                    order.append(hop_id)
+                requests[request_id] = {
+                    'request': params['request'],
+                    'wall_time': params.get('wallTime'),
+                    'started': params['timestamp'],
+                    'type': params.get('type'),
+                    'from_cache': False,
+                }
+                order.append(request_id)
+            elif request_id not in requests:
+                continue
+            elif method == 'Network.responseReceived':
+                requests[request_id]['response'] = params['response']
+            elif method == 'Network.requestServedFromCache':
+                requests[request_id]['from_cache'] = True
+            elif method == 'Network.loadingFinished':
+                requests[request_id]['finished'] = params['timestamp']
+                requests[request_id]['encoded_length'] = params.get('encodedDataLength', 0)
+            elif method == 'Network.loadingFailed':
+                requests[request_id]['finished'] = params['timestamp']
+                requests[request_id]['error'] = params.get('errorText', 'failed')
+
+        return [self._to_har(requests[rid]) for rid in dict.fromkeys(order) if rid in requests]
+
+    def _to_har(self, item):
+        request = item['request']
+        response = item.get('response') or {}
+        started = item['started']
+        finished = item.get('finished', started)
+        total_ms = max(0.0, (finished - started) * 1000)
+        timing = response.get('timing') or {}
+
+        def span(start_key, end_key):
+            start, end = timing.get(start_key, -1), timing.get(end_key, -1)
+            return round(end - start, 3) if start >= 0 and end >= 0 else -1
+
+        send = span('sendStart', 'sendEnd')
+        wait = round(timing['receiveHeadersEnd'] - timing['sendEnd'], 3) if timing else -1
+        receive = -1
+        if timing:
+            headers_at = timing['requestTime'] + timing['receiveHeadersEnd'] / 1000
+            receive = round(max(0.0, (finished - headers_at) * 1000), 3)
+        from_cache = (item['from_cache'] or response.get('fromDiskCache')
+                      or response.get('fromServiceWorker') or response.get('fromPrefetchCache'))
+        body_size = item.get('encoded_length', response.get('encodedDataLength', 0))
+
+        entry = {
+            'startedDateTime': _iso(item['wall_time'] or datetime.now().timestamp()),
+            'time': round(total_ms, 3),
+            'request': {
+                'method': request.get('method', 'GET'),
+                'url': request['url'],
+                'httpVersion': response.get('protocol', ''),
+                'headers': _headers_list(request.get('headers')),
+                'queryString': [{'name': k, 'value': v}
+                                for k, v in parse_qsl(urlparse(request['url']).query)],
+                'cookies': [],
+                'headersSize': -1,
+                'bodySize': len(request.get('postData', '') or ''),
+            },
+            'response': {
+                'status': response.get('status', 0),
+                'statusText': response.get('statusText', item.get('error', '')),
+                'httpVersion': response.get('protocol', ''),
+                'headers': _headers_list(response.get('headers')),
+                'cookies': [],
+                'content': {'size': body_size, 'mimeType': response.get('mimeType', '')},
+                'redirectURL': (response.get('headers') or {}).get('location', ''),
+                'headersSize': -1,
+                'bodySize': 0 if from_cache else body_size,
+            },
+            'cache': {},
+            'timings': {
+                'blocked': -1,
+                'dns': span('dnsStart', 'dnsEnd'),
+                'connect': span('connectStart', 'connectEnd'),
+                'ssl': span('sslStart', 'sslEnd'),
+                'send': send,
+                'wait': wait,
+                'receive': receive,
+            },
+            'serverIPAddress': response.get('remoteIPAddress', ''),
+            '_resourceType': item.get('type'),
+            '_fromCache': bool(from_cache),
+        }
+        if item.get('error'):
+            entry['_error'] = item['error']
+        return entry
+
+    @staticmethod
+    def summarize(entries):
+        upstream = [e for e in entries if _is_upstream(e['request']['url'])]
+        slowest = max(upstream, key=lambda e: e['time'], default=None)
+        by_upstream = {}
+        for e in entries:
+            label = classify_upstream(e['request']['url'])
+            by_upstream[label] = by_upstream.get(label, 0) + 1
+        return {
+            'requests': len(entries),
+            'bytes': sum(e['response']['bodySize'] for e in entries),
+            'cache_hits': sum(1 for e in entries if e['_fromCache'] or e['response']['status'] == 304),
+            'failed': sum(1 for e in entries if e.get('_error') or e['response']['status'] >= 400),
+            'upstream_requests': len(upstream),
+            'by_upstream': by_upstream,
+            'slowest_upstream': {
+                'url': slowest['request']['url'],
+                'upstream': classify_upstream(slowest['request']['url']),
+                'status': slowest['response']['status'],
+                'time_ms': slowest['time'],
+            } if slowest else None,
+        }
+
+    def write_report(self, path):
+        """Write the per-step summary as JSON (next to path) and an HTML table"""
+        if not self.enabled:
+            return None
+        self.finish()
+        with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+            json.dump(self.steps, f, indent=2)
+        with open(path, 'w') as f:
+            f.write(render_summary_html(self.steps, os.path.dirname(path) or '.'))
+        print(f"📄 Network report saved: {path}")
+        return path
+
+
+def render_summary_html(steps, base_dir='test_screenshots'):
+    """Render step summaries in the same dark style as the other test reports"""
+    rows = []
+    for s in steps:
+        slowest = s['slowest_upstream']
+        slowest_cell = (f"{escape(slowest['upstream'])} — {slowest['time_ms']:.0f} ms"
+                        f"<div class=\"url\">{escape(slowest['url'][:160])}</div>") if slowest else '—'
+        mix = ', '.join(f"{escape(k)}: {v}" for k, v in sorted(s['by_upstream'].items()))
+        rows.append(f"""
+            <tr>
+                <td>{escape(s['step'])}</td>
+                <td>{s['requests']}</td>
+                <td>{s['bytes'] / 1024:.1f} KB</td>
+                <td>{s['cache_hits']}</td>
+                <td class="{'failed' if s['failed'] else ''}">{s['failed']}</td>
+                <td>{slowest_cell}</td>
+                <td>{mix}</td>
+                <td><a href="{escape(os.path.relpath(s['har'], base_dir))}">HAR</a></td>
+            </tr>""")
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Network Waterfall Summary</title>
+    <style>
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+            margin: 0;
+            padding: 40px;
+            background: #0f172a;
+            color: #e2e8f0;
+        }}
+        h1 {{ margin: 0 0 10px 0; color: #14b8a6; font-size: 32px; }}
+        .timestamp {{ color: #94a3b8; margin-bottom: 30px; }}
+        table {{ width: 100%; border-collapse: collapse; background: #1e293b; border-radius: 8px; }}
+        th, td {{ padding: 12px; border-bottom: 1px solid #334155; text-align: left; vertical-align: top; }}
+        th {{ color: #94a3b8; font-size: 13px; text-transform: uppercase; }}
+        .url {{ color: #94a3b8; font-size: 12px; word-break: break-all; }}
+        .failed {{ color: #ef4444; }}
+        a {{ color: #14b8a6; }}
+    </style>
+</head>
+<body>
+    <h1>🌐 Network Waterfall Summary</h1>
+    <div class="timestamp">Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>
+    <table>
+        <tr>
+            <th>Step</th><th>Requests</th><th>Transferred</th><th>Cache hits</th>
+            <th>Failed</th><th>Slowest upstream</th><th>By upstream</th><th>HAR</th>
+        </tr>{''.join(rows)}
+    </table>
+</body>
+</html>
+"""
+
+
+if __name__ == '__main__':
+    # Re-summarise existing HAR files: python3 network_capture.py test_screenshots/har/*.har
+    for har_file in sys.argv[1:]:
+        with open(har_file) as f:
+            summary = NetworkRecorder.summarize(json.load(f)['log']['entries'])
+        print(f"{har_file}: {json.dumps(summary, indent=2)}")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Run dashboard flows (or any Selenium suite) under emulated network profiles
+
+Throttling is applied through CDP Network.emulateNetworkConditions, so it
+shapes every request the page makes - including the AllOrigins/corsproxy.io
+fallbacks in waybackService.fetchCDX and their 5 second timeout.
+
+Built-in mode times each view in dashboard_flows.FLOWS per profile and
+tabulates the slowdown against the first profile. Suite mode re-runs
+existing scripts with a hook that throttles every Chrome driver they create.
+
+Usage:
+    python3 network_matrix.py                                # all profiles, built-in flows
+    python3 network_matrix.py --profiles lan,3g --repeat 3 --demo
+    python3 network_matrix.py --suite test_prod_build.py test_with_cache_clear.py
+"""
+
+import argparse
+import json
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from dashboard_flows import APP_URL, FLOWS, enable_demo_mode, run_flow
+
+# latency in ms, throughput in bytes/second (-1 = unthrottled)
+PROFILES = {
+    'lan': {'latency': 2, 'download': -1, 'upload': -1, 'connectionType': 'ethernet'},
+    '4g': {'latency': 85, 'download': 9_000_000 // 8, 'upload': 3_000_000 // 8,
+           'connectionType': 'cellular4g'},
+    '3g': {'latency': 562, 'download': 1_440_000 // 8, 'upload': 675_000 // 8,
+           'connectionType': 'cellular3g'},
+    'high_rtt': {'latency': 1500, 'download': 10_000_000 // 8, 'upload': 5_000_000 // 8,
+                 'connectionType': 'other'},
+}
+
+PROFILE_ENV = 'OMNIDASH_NETWORK_PROFILE'
+
+
+def apply_network_profile(driver, name):
+    """Throttle an existing Chrome driver to one of PROFILES"""
+    profile = PROFILES[name]
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.emulateNetworkConditions', {
+        'offline': False,
+        'latency': profile['latency'],
+        'downloadThroughput': profile['download'],
+        'uploadThroughput': profile['upload'],
+        'connectionType': profile['connectionType'],
+    })
+
+
+def install_driver_hook(name):
+    """Make every webdriver.Chrome created in this process start throttled"""
+    original_init = webdriver.Chrome.__init__
+
+    def throttled_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        apply_network_profile(self, name)
+        print(f"🐢 Network profile '{name}' applied")
+
+    webdriver.Chrome.__init__ = throttled_init
+
+
+def make_driver(headless=True):
+    options = Options()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1400,900')
+    return webdriver.Chrome(options=options)
+
+
+def run_builtin(profile, base_url, repeat, demo):
+    """Time every flow `repeat` times under one profile"""
+    driver = make_driver()
+    driver.set_page_load_timeout(120)
+    results = []
+    try:
+        if demo:
+            enable_demo_mode(driver, base_url)
+        apply_network_profile(driver, profile)
+        started = time.perf_counter()
+        driver.get(base_url)
+        results.append({'view': 'Initial load', 'ms': (time.perf_counter() - started) * 1000,
+                        'ok': True, 'error': None})
+        for _ in range(repeat):
+            for flow in FLOWS:
+                result = run_flow(driver, flow)
+                status = '✅' if result['ok'] else '❌'
+                print(f"   {status} [{profile}] {result['view']}: {result['ms']:.0f} ms")
+                results.append(result)
+    finally:
+        driver.quit()
+    return results
+
+
+def run_suite(script, profile):
+    """Run a suite script in a subprocess with the throttling hook installed"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--under', profile, script],
+        env=dict(os.environ, **{PROFILE_ENV: profile}),
+    )
+    return {
+        'view': f"suite:{os.path.basename(script)}",
+        'ms': (time.perf_counter() - started) * 1000,
+        'ok': proc.returncode == 0,
+        'error': None if proc.returncode == 0 else f"exit code {proc.returncode}",
+    }
+
+
+def tabulate(results, profiles):
+    """Median time per view and profile, with slowdown against the first profile"""
+    table = {}
+    for profile in profiles:
+        for r in results[profile]:
+            cell = table.setdefault(r['view'], {}).setdefault(profile, {'ms': [], 'failures': 0})
+            cell['ms'].append(r['ms'])
+            if not r['ok']:
+                cell['failures'] += 1
+    baseline = profiles[0]
+    for view, cells in table.items():
+        base = statistics.median(cells[baseline]['ms']) if baseline in cells else None
+        for profile, cell in cells.items():
+            cell['median_ms'] = statistics.median(cell['ms'])
+            cell['slowdown'] = (cell['median_ms'] / base) if base else None
+    return table
+
+
+def print_table(table, profiles):
+    width = max(len(v) for v in table) + 2
+    print("\n" + "=" * (width + 20 * len(profiles)))
+    print("NETWORK MATRIX (median ms, slowdown vs " + profiles[0] + ")")
+    print("=" * (width + 20 * len(profiles)))
+    print("View".ljust(width) + ''.join(p.rjust(20) for p in profiles))
+    for view, cells in table.items():
+        row = view.ljust(width)
+        for profile in profiles:
+            cell = cells.get(profile)
+            if not cell:
+                row += '—'.rjust(20)
+                continue
+            text = f"{cell['median_ms']:.0f}"
+            if cell['slowdown'] and profile != profiles[0]:
+                text += f" ({cell['slowdown']:.1f}x)"
+            if cell['failures']:
+                text += f" ❌{cell['failures']}"
+            row += text.rjust(20)
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run flows under emulated network profiles')
+    parser.add_argument('--profiles', default=','.join(PROFILES),
+                        help='Comma-separated profiles (default: %(default)s)')
+    parser.add_argument('--url', default=APP_URL)
+    parser.add_argument('--repeat', type=int, default=1, help='Runs of each flow per profile')
+    parser.add_argument('--demo', action='store_true', help='Use the app demo mode instead of live APIs')
+    parser.add_argument('--suite', nargs='+', default=[], help='Selenium scripts to run per profile')
+    parser.add_argument('--out', default='test_screenshots/network_matrix.json')
+    parser.add_argument('--under', help=argparse.SUPPRESS)
+    args, rest = parser.parse_known_args()
+
+    if args.under:
+        # Child process: throttle every driver, then hand control to the suite
+        install_driver_hook(args.under)
+        script = rest[0]
+        sys.argv = rest
+        runpy.run_path(script, run_name='__main__')
+        return 0
+
+    profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profiles: {', '.join(unknown)} (choose from {', '.join(PROFILES)})")
+
+    results = {}
+    for profile in profiles:
+        print(f"\n🌐 Profile: {profile} {PROFILES[profile]}")
+        if args.suite:
+            results[profile] = [run_suite(script, profile) for script in args.suite]
+        else:
+            results[profile] = run_builtin(profile, args.url, args.repeat, args.demo)
+
+    table = tabulate(results, profiles)
+    print_table(table, profiles)
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump({
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'profiles': {p: PROFILES[p] for p in profiles},
+            'results': results,
+            'table': table,
+        }, f, indent=2)
+    print(f"\n📄 Results saved: {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -25,6 +25,198 @@ export interface ValidationResult {
   message?: string;
 }
 
+export interface CdxHarvestRow {
+  urlkey: string;
+  timestamp: string;
+  original: string;
+  mimetype: string;
+  statuscode: string;
+  digest: string;
+  length: string;
+}
+
+export interface CdxStats {
+  url: string;
+  bucket: 'year' | 'month' | 'day';
+  total: number;
+  uniqueDigests: number;
+  // uniqueDigests is an estimate (very long histories)
+  uniqueDigestsApproximate: boolean;
+  first: string | null;
+  last: string | null;
+  buckets: { key: string; count: number }[];
+  statusCodes: Record<string, number>;
+  mimeTypes: Record<string, number>;
+}
+
+export interface MetadataBatchOptions {
+  /** Top-level keys or dotted paths to keep, e.g. ['metadata.title', 'item_size'] */
+  fields?: string[];
+  /** Top-level keys to drop, e.g. ['files'] (files_count is kept instead) */
+  exclude?: string[];
+  concurrency?: number;
+  /** Stream results as they complete instead of waiting for the whole batch */
+  onResult?: (identifier: string, data: any, error?: string) => void;
+  signal?: AbortSignal;
+}
+
+export interface MetadataBatchResult {
+  results: Record<string, any>;
+  errors: Record<string, string>;
+  stats: { requested: number; ok: number; failed: number; cacheHits: number; ms: number };
+}
+
+export interface ProxyBatchRequest {
+  /** Echoed back on the result */
+  id?: string;
+  url: string;
+  method?: string;
+  body?: any;
+  requiresAuth?: boolean;
+}
+
+export interface ProxyBatchResult {
+  index: number;
+  id?: string;
+  /** Upstream status (or 400/401 for a request the backend refused) */
+  status?: number;
+  contentType?: string;
+  /** FALLBACK: expired copy served while the upstream's circuit is open */
+  cache?: 'HIT' | 'STALE' | 'FALLBACK' | 'MISS' | null;
+  ms?: number;
+  /** Parsed JSON, or the body as text for non-JSON responses */
+  data?: any;
+  /** Binary bodies, base64-encoded */
+  base64?: string;
+  /** Set when no response could be obtained */
+  error?: string;
+}
+
+export interface TraceSpan {
+  host: string;
+  url: string | null;
+  priority: string;
+  status: number | null;
+  error: string | null;
+  startMs: number;
+  reusedConnection: boolean;
+  phases: { queue: number | null; connect: number | null; ttfb: number | null; transfer: number | null };
+  totalMs: number | null;
+}
+
+export interface RequestTrace {
+  traceId: string;
+  method: string;
+  path: string;
+  route: string | null;
+  status: number | 'aborted';
+  startedAt: string;
+  totalMs: number;
+  serializeMs: number;
+  notes: Record<string, string>;
+  spans: TraceSpan[];
+  /** Measured in the browser: fetch start to parsed response */
+  clientMs?: number;
+  /** clientMs - totalMs: network, browser queueing and response parsing */
+  networkMs?: number;
+}
+
+export type SaveItemState = 'queued' | 'submitting' | 'pending' | 'success' | 'error' | 'cancelled';
+
+export interface SaveJobItem {
+  index: number;
+  url: string;
+  state: SaveItemState;
+  attempts: number;
+  error?: string;
+  timestamp?: string;
+  snapshotUrl?: string;
+}
+
+export interface SaveJobSummary {
+  id: string;
+  createdAt: number;
+  updatedAt: number;
+  finishedAt: number | null;
+  cancelled: boolean;
+  total: number;
+  counts: Record<SaveItemState, number>;
+  /** Why nothing is being submitted right now (e.g. missing credentials) */
+  blocked: string | null;
+  /** SavePageNow is throttling; submissions resume at this time */
+  pausedUntil: number | null;
+}
+
+export interface SaveJob extends SaveJobSummary {
+  items: SaveJobItem[];
+}
+
+export interface SaveJobHandlers {
+  /** Full state, on connect and after reconnects */
+  onSnapshot?: (job: SaveJob) => void;
+  onItem?: (item: SaveJobItem) => void;
+  onProgress?: (summary: SaveJobSummary) => void;
+  onEnd?: (summary: SaveJobSummary) => void;
+}
+
+export interface CdxHarvestOptions {
+  from?: string;
+  to?: string;
+  matchType?: 'exact' | 'prefix' | 'host' | 'domain';
+  filter?: string[];
+  collapse?: string;
+  pageSize?: number;
+  maxRows?: number;
+  /** Start from a checkpoint returned by an earlier harvest */
+  resumeKey?: string;
+  /** Reconnect attempts after a dropped stream (resumes from the last checkpoint) */
+  retries?: number;
+  signal?: AbortSignal;
+  onRows?: (rows: CdxHarvestRow[]) => void;
+  onCheckpoint?: (resumeKey: string, rowsSoFar: number) => void;
+}
+
+// Browser-side durations of recent proxied requests, by trace ID, so
+// getTrace can put the server's breakdown next to what the user waited
+const MAX_CLIENT_TIMINGS = 200;
+const clientTimings = new Map<string, number>();
+
+function newTraceId(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  return Array.from({ length: 16 }, () => Math.floor(Math.random() * 16).toString(16)).join('');
+}
+
+function recordClientTiming(traceId: string, ms: number): void {
+  clientTimings.set(traceId, Math.round(ms * 100) / 100);
+  if (clientTimings.size > MAX_CLIENT_TIMINGS) {
+    clientTimings.delete(clientTimings.keys().next().value as string);
+  }
+}
+
+/**
+ * Read an NDJSON response body line by line
+ */
+async function readNdjson(response: Response, onLine: (value: any) => void): Promise<void> {
+  if (!response.body) return;
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop() || '';
+    for (const line of lines) {
+      if (line.trim()) onLine(JSON.parse(line));
+    }
+  }
+  buffered += decoder.decode();
+  if (buffered.trim()) onLine(JSON.parse(buffered));
+}
+
 export const backendService = {
   /**
    * Save credentials to backend (encrypted server-side)
@@ -86,7 +278,9 @@ export const backendService = {
 
   /**
    * Proxy an Archive.org API call through the backend
-   * The backend will add credentials if requiresAuth is true
+   * The backend will add credentials if requiresAuth is true.
+   * The upstream body is streamed through unchanged: JSON responses are
+   * parsed, anything else (CDX text, archived HTML) is returned as a string.
    */
   async proxyArchiveRequest(
     url: string,
@@ -94,11 +288,21 @@ export const backendService = {
       method?: string;
       body?: any;
       requiresAuth?: boolean;
+      /** Force the backend to trace this request (otherwise it samples) */
+      trace?: boolean;
+      /** Called with the request's trace ID, for looking it up with getTrace */
+      onTraceId?: (traceId: string) => void;
     } = {}
   ): Promise<any> {
+    const traceId = newTraceId();
+    options.onTraceId?.(traceId);
+    const headers: Record<string, string> = { 'Content-Type': 'application/json', 'X-Trace-Id': traceId };
+    if (options.trace) headers['X-Trace-Sampled'] = '1';
+    const started = performance.now();
+
     const response = await fetch(`${BACKEND_URL}/api/proxy/archive`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify({
         url,
         method: options.method || 'GET',
@@ -107,11 +311,318 @@ export const backendService = {
       })
     });
     
+    const isJson = (response.headers.get('content-type') || '').includes('json');
+
     if (!response.ok) {
-      const error = await response.json();
-      throw new Error(error.error || 'Proxy request failed');
+      const error = isJson ? await response.json().catch(() => ({})) : {};
+      recordClientTiming(traceId, performance.now() - started);
+      throw new Error(error.error || `Proxy request failed (status ${response.status})`);
     }
     
+    const result = isJson ? await response.json() : await response.text();
+    recordClientTiming(traceId, performance.now() - started);
+    return result;
+  },
+
+  /**
+   * Run several proxy requests in one round trip. The backend executes them
+   * concurrently (pooled and cached) and streams each result back as soon as
+   * it is ready; onResult sees them in completion order. Resolves with all
+   * results in request order.
+   */
+  async proxyBatch(
+    requests: ProxyBatchRequest[],
+    options: {
+      onResult?: (result: ProxyBatchResult) => void;
+      concurrency?: number;
+      signal?: AbortSignal;
+    } = {}
+  ): Promise<ProxyBatchResult[]> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Batched proxy requests require backend server.');
+    }
+
+    const response = await fetch(`${BACKEND_URL}/api/proxy/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ requests, concurrency: options.concurrency }),
+      signal: options.signal
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.error || `Batch proxy request failed (status ${response.status})`);
+    }
+
+    const results: ProxyBatchResult[] = [];
+    let ended = false;
+    await readNdjson(response, line => {
+      if (line.type === 'end') {
+        ended = true;
+        return;
+      }
+      const { text, ...result } = line;
+      if (text !== undefined) result.data = text;
+      results[result.index] = result;
+      options.onResult?.(result);
+    });
+    if (!ended) {
+      throw new Error('Batch proxy stream ended early');
+    }
+    return results;
+  },
+
+  /**
+   * Fetch the backend's timing breakdown for a traced request (see
+   * proxyArchiveRequest's trace/onTraceId options). Resolves with null if
+   * the request was not sampled or its trace has been dropped.
+   */
+  async getTrace(traceId: string): Promise<RequestTrace | null> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Request tracing requires backend server.');
+    }
+
+    const response = await fetch(`${BACKEND_URL}/api/traces/${encodeURIComponent(traceId)}`);
+    if (response.status === 404) return null;
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.error || `Trace request failed (status ${response.status})`);
+    }
+    const trace: RequestTrace = await response.json();
+    const clientMs = clientTimings.get(traceId);
+    if (clientMs !== undefined) {
+      trace.clientMs = clientMs;
+      trace.networkMs = Math.max(0, Math.round((clientMs - trace.totalMs) * 100) / 100);
+    }
+    return trace;
+  },
+
+  /**
+   * Harvest a URL's full CDX history through the backend, page by page.
+   * Rows are delivered in batches as they stream in; if the connection drops
+   * the harvest picks up again from the last checkpoint.
+   * Resolves with the number of rows delivered.
+   */
+  async harvestCdx(url: string, options: CdxHarvestOptions = {}): Promise<{ rows: number }> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. CDX harvesting requires backend server.');
+    }
+
+    let resumeKey = options.resumeKey || null;
+    let rows = 0;
+    let attemptsLeft = options.retries ?? 3;
+
+    for (;;) {
+      const params = new URLSearchParams({ url });
+      if (options.from) params.set('from', options.from);
+      if (options.to) params.set('to', options.to);
+      if (options.matchType) params.set('matchType', options.matchType);
+      if (options.collapse) params.set('collapse', options.collapse);
+      if (options.pageSize) params.set('pageSize', String(options.pageSize));
+      if (options.maxRows) params.set('maxRows', String(options.maxRows - rows));
+      if (resumeKey) params.set('resumeKey', resumeKey);
+      for (const f of options.filter || []) params.append('filter', f);
+
+      let finished = false;
+      let batch: CdxHarvestRow[] = [];
+      try {
+        const response = await fetch(`${BACKEND_URL}/api/cdx/harvest?${params}`, { signal: options.signal });
+        if (!response.ok) {
+          const error = await response.json().catch(() => ({}));
+          throw new Error(error.error || `CDX harvest failed (status ${response.status})`);
+        }
+        await readNdjson(response, line => {
+          if (!line.type) {
+            batch.push(line);
+            return;
+          }
+          if (line.type === 'error') {
+            // Rows after the last checkpoint are refetched on resume
+            throw new Error(line.error);
+          }
+          // Hand rows over at page boundaries so the checkpoint never runs ahead of them
+          if (batch.length) options.onRows?.(batch);
+          rows += batch.length;
+          batch = [];
+          if (line.type === 'checkpoint') {
+            resumeKey = line.resumeKey;
+            options.onCheckpoint?.(line.resumeKey, rows);
+          } else if (line.type === 'end') {
+            finished = true;
+          }
+        });
+      } catch (error) {
+        if (options.signal?.aborted || attemptsLeft-- <= 0) throw error;
+        continue;
+      }
+      if (finished) return { rows };
+      if (attemptsLeft-- <= 0) throw new Error('CDX harvest stream ended early');
+    }
+  },
+
+  /**
+   * Fetch metadata for many identifiers in one round trip. The backend
+   * fetches them concurrently (pooled and cached); with onResult each item
+   * is delivered as soon as it completes.
+   */
+  async fetchMetadataBatch(identifiers: string[], options: MetadataBatchOptions = {}): Promise<MetadataBatchResult> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Batch metadata requires backend server.');
+    }
+
+    const stream = !!options.onResult;
+    const response = await fetch(`${BACKEND_URL}/api/metadata/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        identifiers,
+        fields: options.fields,
+        exclude: options.exclude,
+        concurrency: options.concurrency,
+        stream
+      }),
+      signal: options.signal
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.error || `Batch metadata request failed (status ${response.status})`);
+    }
+    if (!stream) {
+      return await response.json();
+    }
+
+    const combined: MetadataBatchResult = {
+      results: {},
+      errors: {},
+      stats: { requested: identifiers.length, ok: 0, failed: 0, cacheHits: 0, ms: 0 }
+    };
+    await readNdjson(response, line => {
+      if (line.type === 'end') {
+        const { type, ...stats } = line;
+        combined.stats = stats;
+      } else if (line.error) {
+        combined.errors[line.identifier] = line.error;
+        options.onResult?.(line.identifier, null, line.error);
+      } else {
+        combined.results[line.identifier] = line.data;
+        options.onResult?.(line.identifier, line.data);
+      }
+    });
+    return combined;
+  },
+
+  /**
+   * Fetch capture aggregates for a URL's full CDX history (computed and
+   * cached server-side, so only the histogram crosses the wire)
+   */
+  async getCdxStats(
+    url: string,
+    bucket: CdxStats['bucket'] = 'year',
+    options: { from?: string; to?: string; matchType?: string } = {}
+  ): Promise<CdxStats> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. CDX statistics require backend server.');
+    }
+
+    const params = new URLSearchParams({ url, bucket });
+    if (options.from) params.set('from', options.from);
+    if (options.to) params.set('to', options.to);
+    if (options.matchType) params.set('matchType', options.matchType);
+
+    const response = await fetch(`${BACKEND_URL}/api/cdx/stats?${params}`);
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.error || `CDX stats request failed (status ${response.status})`);
+    }
+    return await response.json();
+  },
+
+  /**
+   * Download an archived page with the Wayback toolbar already stripped.
+   * The backend fetches it over pooled connections, cleans it while
+   * streaming and caches the result by timestamp + URL.
+   * Upstream failures (e.g. no capture) reject with an error carrying `status`.
+   */
+  async fetchSnapshot(waybackUrl: string, signal?: AbortSignal): Promise<string> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Server-side snapshot download requires backend server.');
+    }
+
+    const params = new URLSearchParams({ url: waybackUrl });
+    const response = await fetch(`${BACKEND_URL}/api/wayback/snapshot?${params}`, { signal });
+    if (!response.ok) {
+      const isJson = (response.headers.get('content-type') || '').includes('json');
+      const error = isJson ? await response.json().catch(() => ({})) : {};
+      throw Object.assign(
+        new Error(error.error || `Failed to download content (Status ${response.status})`),
+        { status: response.status }
+      );
+    }
+    return await response.text();
+  },
+
+  /**
+   * Queue URLs for SavePageNow capture on the backend. The job runs
+   * server-side (and survives restarts); follow it with watchSaveJob.
+   */
+  async createSaveJob(
+    urls: string[],
+    options: { captureAll?: boolean; captureOutlinks?: boolean; captureScreenshot?: boolean } = {}
+  ): Promise<SaveJobSummary> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Batch capture requires backend server.');
+    }
+
+    const response = await fetch(`${BACKEND_URL}/api/save/jobs`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ urls, ...options })
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.error || `Failed to queue captures (status ${response.status})`);
+    }
+    return await response.json();
+  },
+
+  /**
+   * Follow a save job's progress over Server-Sent Events. The browser
+   * reconnects on its own after a drop (and gets a fresh snapshot).
+   * Returns a function that stops watching.
+   */
+  watchSaveJob(jobId: string, handlers: SaveJobHandlers): () => void {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Batch capture requires backend server.');
+    }
+
+    const source = new EventSource(`${BACKEND_URL}/api/save/jobs/${encodeURIComponent(jobId)}/events`);
+    const on = (event: string, handler?: (data: any) => void) => {
+      source.addEventListener(event, e => handler?.(JSON.parse((e as MessageEvent).data)));
+    };
+    on('snapshot', handlers.onSnapshot);
+    on('item', handlers.onItem);
+    on('progress', handlers.onProgress);
+    on('end', summary => {
+      source.close();
+      handlers.onEnd?.(summary);
+    });
+    return () => source.close();
+  },
+
+  /**
+   * Stop submitting a job's remaining URLs, or queue its failed ones again
+   */
+  async updateSaveJob(jobId: string, action: 'cancel' | 'retry'): Promise<SaveJobSummary> {
+    if (!BACKEND_URL) {
+      throw new Error('Backend not available. Batch capture requires backend server.');
+    }
+
+    const response = await fetch(`${BACKEND_URL}/api/save/jobs/${encodeURIComponent(jobId)}/${action}`, {
+      method: 'POST'
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.error || `Failed to ${action} job (status ${response.status})`);
+    }
     return await response.json();
   },
 
@@ -1,6 +1,7 @@
 import { API_BASE } from '../constants';
 import { IAMetadata, IASearchResult, ViewCountData } from '../types';
 import { getMockMetadata, getMockSearchResults, getMockViews } from './mockService';
+import { backendService } from './backendService';
 
 const getSettings = () => {
   try {
@@ -92,8 +93,9 @@ export const searchItems = async (
   }
 };
 
-const executeAdvancedSearch = async (query: string, page: number): Promise<SearchResponse> => {
-  const rows = 50;
+const SEARCH_ROWS = 50;
+
+const advancedSearchUrl = (query: string, page: number): string => {
   const url = new URL(API_BASE.SEARCH);
   url.searchParams.append('q', query);
 
@@ -101,7 +103,7 @@ const executeAdvancedSearch = async (query: string, page: number): Promise<Searc
     url.searchParams.append('fl[]', field);
   });
 
-  url.searchParams.append('rows', rows.toString());
+  url.searchParams.append('rows', SEARCH_ROWS.toString());
   url.searchParams.append('page', page.toString());
   url.searchParams.append('output', 'json');
 
@@ -109,16 +111,13 @@ const executeAdvancedSearch = async (query: string, page: number): Promise<Searc
     url.searchParams.append('sort[]', 'downloads desc');
   }
 
-  const res = await fetch(getProxiedUrl(url.toString()));
-  if (!res.ok) {
-    const text = await res.text();
-    throw new Error(`Advanced search failed (${res.status}): ${text.substring(0, 200)}`);
-  }
+  return url.toString();
+};
 
-  const data = await res.json();
+const toSearchResponse = (data: any, page: number): SearchResponse => {
   const docs = data.response?.docs || [];
   const numFound = data.response?.numFound || 0;
-  const nextCursor = page * rows < numFound ? (page + 1).toString() : undefined;
+  const nextCursor = page * SEARCH_ROWS < numFound ? (page + 1).toString() : undefined;
 
   return {
     items: docs,
@@ -127,6 +126,16 @@ const executeAdvancedSearch = async (query: string, page: number): Promise<Searc
   };
 };
 
+const executeAdvancedSearch = async (query: string, page: number): Promise<SearchResponse> => {
+  const res = await fetch(getProxiedUrl(advancedSearchUrl(query, page)));
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(`Advanced search failed (${res.status}): ${text.substring(0, 200)}`);
+  }
+
+  return toSearchResponse(await res.json(), page);
+};
+
 const executeScrapeSearch = async (
   query: string,
   cursor: string | null
@@ -150,6 +159,35 @@ const executeScrapeSearch = async (
   };
 };
 
+/**
+ * Fetch an item's views together with the search that would resolve it as a
+ * keyword, in one backend round trip, so a miss on the identifier doesn't
+ * cost a second trip. Returns null when the backend can't be used; the
+ * caller then fetches each directly.
+ */
+export const fetchViewsWithSearch = async (
+  identifier: string
+): Promise<{ views?: ViewCountData; viewsError?: Error; search?: SearchResponse } | null> => {
+  if (isDemoMode()) return null;
+
+  try {
+    const [views, search] = await backendService.proxyBatch([
+      { url: `${API_BASE.VIEWS}/${identifier}` },
+      { url: advancedSearchUrl(sanitizeQuery(identifier), 1) },
+    ]);
+    return {
+      views: views.status === 200 ? views.data : undefined,
+      viewsError:
+        views.status === 200 ? undefined : new Error(`Views fetch failed (${views.status ?? views.error})`),
+      // A failed advanced search is left to searchItems, which falls back to scrape
+      search: search.status === 200 ? toSearchResponse(search.data, 1) : undefined,
+    };
+  } catch (error) {
+    console.warn('Backend batch unavailable, fetching views directly...', error);
+    return null;
+  }
+};
+
 export const fetchViews = async (identifier: string): Promise<ViewCountData> => {
   if (isDemoMode()) {
     return new Promise(resolve => setTimeout(() => resolve(getMockViews()), 500));
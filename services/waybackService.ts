@@ -1,6 +1,7 @@
 import { API_BASE, PROXY_OPTIONS } from '../constants';
 import { WaybackAvailability, CDXRecord } from '../types';
 import { getMockAvailability, getMockCDX } from './mockService';
+import { backendService } from './backendService';
 
 const getSettings = () => {
   try {
@@ -76,9 +77,30 @@ export const checkAvailability = async (url: string): Promise<WaybackAvailabilit
     };
   };
 
+  const target = `${API_BASE.WAYBACK_AVAILABLE}?url=${encodeURIComponent(url)}`;
+  // limit=-1 fetches the most recent capture
+  const cdxUrl = `${API_BASE.CDX}?url=${encodeURIComponent(url)}&output=json&limit=-1&fl=urlkey,timestamp,original,mimetype,statuscode,digest,length`;
+
+  // With the backend, ask the Availability API and the CDX fallback together:
+  // one round trip instead of two in a row when the first comes back empty
+  try {
+    const [available, cdx] = await backendService.proxyBatch([{ url: target }, { url: cdxUrl }]);
+    if (available.data?.archived_snapshots?.closest) {
+      return available.data;
+    }
+    if (Array.isArray(cdx.data) && cdx.data.length > 1) {
+      return createFromCDX(cdx.data[1]);
+    }
+    if (available.status === 200 && cdx.status === 200) {
+      return { url, archived_snapshots: {} };
+    }
+    console.log('Backend availability check inconclusive, checking in the browser...');
+  } catch (e: any) {
+    console.log(`Backend availability check unavailable (${e.message}), checking in the browser...`);
+  }
+
   try {
     // 1. Try standard Availability API
-    const target = `${API_BASE.WAYBACK_AVAILABLE}?url=${encodeURIComponent(url)}`;
     const res = await fetch(getProxiedUrl(target));
 
     if (res.ok) {
@@ -90,9 +112,7 @@ export const checkAvailability = async (url: string): Promise<WaybackAvailabilit
     }
 
     // 2. Fallback: If Availability API failed or returned empty, try CDX "Last 1" strategy
-    // limit=-1 fetches the most recent capture
     console.log('Standard availability check empty/failed, falling back to CDX...');
-    const cdxUrl = `${API_BASE.CDX}?url=${encodeURIComponent(url)}&output=json&limit=-1&fl=urlkey,timestamp,original,mimetype,statuscode,digest,length`;
     const cdxRes = await fetch(getProxiedUrl(cdxUrl));
 
     if (cdxRes.ok) {
@@ -118,7 +138,11 @@ export const checkAvailability = async (url: string): Promise<WaybackAvailabilit
   }
 };
 
-export const fetchCDX = async (url: string, limit: number = 10000): Promise<CDXRecord[]> => {
+export const fetchCDX = async (
+  url: string,
+  limit: number = 10000,
+  range: { from?: string; to?: string } = {}
+): Promise<CDXRecord[]> => {
   if (isDemoMode()) {
     return new Promise(resolve => setTimeout(() => resolve(getMockCDX(url)), 800));
   }
@@ -140,7 +164,10 @@ export const fetchCDX = async (url: string, limit: number = 10000): Promise<CDXR
     // - collapse=digest = unique content only
     //
     // By NOT specifying collapse, we get all captures up to the limit
-    const api = `${API_BASE.CDX}?url=${encodedUrl}&output=json&limit=${limit}&fl=urlkey,timestamp,original,mimetype,statuscode,digest,length`;
+    // from/to are timestamp prefixes (e.g. 2015 or 201503) to slice the history
+    let api = `${API_BASE.CDX}?url=${encodedUrl}&output=json&limit=${limit}&fl=urlkey,timestamp,original,mimetype,statuscode,digest,length`;
+    if (range.from) api += `&from=${range.from}`;
+    if (range.to) api += `&to=${range.to}`;
 
     const { corsProxy } = getSettings();
     const isProxied = corsProxy && corsProxy.trim().length > 0;
@@ -279,6 +306,19 @@ export const downloadSnapshotContent = async (waybackUrl: string): Promise<strin
   // We'll strip the Wayback toolbar from the HTML after downloading
   const rewrittenUrl = waybackUrl;
 
+  // Prefer the backend: no CORS proxies, and the toolbar is stripped
+  // server-side while streaming instead of by regexes on the main thread
+  try {
+    return await backendService.fetchSnapshot(rewrittenUrl);
+  } catch (e: any) {
+    // The backend reached the archive and got an answer (e.g. 404) - retrying
+    // through the proxies would only get the same one
+    if (e.status && e.status !== 502 && e.status !== 503) {
+      throw e;
+    }
+    console.log(`Backend snapshot download unavailable (${e.message}), downloading in the browser...`);
+  }
+
   const { corsProxy } = getSettings();
   const isProxied = corsProxy && corsProxy.trim().length > 0;
 
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Long-duration soak test for the dashboard
+
+Repeats a mixed workload across WaybackTools, AnalyticsDashboard and
+ScrapingBrowser for hours. It runs against the app's demo mode by default
+(the built-in mock service is the local API stand-in), or against live
+APIs with --live. At every interval it samples:
+
+    - JS heap used            (CDP Performance.getMetrics)
+    - DOM node count          (CDP Performance.getMetrics)
+    - JS event listeners      (CDP Performance.getMetrics)
+    - IndexedDB usage         (navigator.storage.estimate)
+    - event-loop lag          (timer drift measured in the page)
+
+The report shows a least-squares slope per hour for each metric and flags
+leak suspects: a steady climb (high R²) above the metric's threshold.
+There is no pass/fail - the output is meant to be read.
+
+Usage:
+    python3 soak_test.py --hours 4
+    python3 soak_test.py --minutes 20 --interval 30 --out test_screenshots/soak.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from dashboard_flows import APP_URL, FLOWS, enable_demo_mode, run_flow
+
+WORKLOAD = {
+    'Wayback Check URL': ['example.com', 'archive.org', 'nasa.gov', 'wikipedia.org'],
+    'Wayback History': ['example.com', 'archive.org', 'nasa.gov'],
+    'View Analytics': ['nasa', 'gratefuldead', 'prelinger'],
+    'Deep Search': ['grateful dead', 'collection:nasa', 'mediatype:movies'],
+}
+
+# A metric is a leak suspect when it climbs steadily (r2) by more than per_hour
+LEAK_THRESHOLDS = {
+    'js_heap_mb': {'per_hour': 5.0, 'r2': 0.6},
+    'dom_nodes': {'per_hour': 500, 'r2': 0.6},
+    'event_listeners': {'per_hour': 200, 'r2': 0.6},
+    'indexeddb_mb': {'per_hour': 10.0, 'r2': 0.6},
+    'loop_lag_ms': {'per_hour': 5.0, 'r2': 0.5},
+}
+
+LAG_MONITOR_JS = """
+if (!window.__omnidashLag) {
+  const lag = { max: 0, total: 0, count: 0 };
+  let expected = performance.now() + 100;
+  setInterval(() => {
+    const now = performance.now();
+    const drift = Math.max(0, now - expected);
+    lag.max = Math.max(lag.max, drift);
+    lag.total += drift;
+    lag.count += 1;
+    expected = now + 100;
+  }, 100);
+  window.__omnidashLag = lag;
+}
+"""
+
+READ_LAG_JS = """
+const lag = window.__omnidashLag;
+if (!lag) return null;
+const result = { max: lag.max, mean: lag.count ? lag.total / lag.count : 0 };
+lag.max = 0; lag.total = 0; lag.count = 0;
+return result;
+"""
+
+STORAGE_ESTIMATE_JS = """
+const done = arguments[arguments.length - 1];
+navigator.storage.estimate()
+  .then(e => done((e.usageDetails && e.usageDetails.indexedDB) || e.usage || 0))
+  .catch(() => done(null));
+"""
+
+
+def make_driver():
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--window-size=1400,900')
+    options.add_argument('--enable-precise-memory-info')
+    return webdriver.Chrome(options=options)
+
+
+def sample(driver, collect_garbage):
+    """Take one reading of every soak metric"""
+    if collect_garbage:
+        # Force a GC so the heap reading shows retained memory, not garbage
+        driver.execute_cdp_cmd('HeapProfiler.collectGarbage', {})
+    metrics = {m['name']: m['value'] for m in driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']}
+    driver.execute_script(LAG_MONITOR_JS)  # re-arms after a reload
+    lag = driver.execute_script(READ_LAG_JS) or {'max': 0, 'mean': 0}
+    idb_bytes = driver.execute_async_script(STORAGE_ESTIMATE_JS)
+    return {
+        'js_heap_mb': metrics.get('JSHeapUsedSize', 0) / 1024 / 1024,
+        'dom_nodes': metrics.get('Nodes', 0),
+        'event_listeners': metrics.get('JSEventListeners', 0),
+        'indexeddb_mb': (idb_bytes or 0) / 1024 / 1024,
+        'loop_lag_ms': lag['mean'],
+        'loop_lag_max_ms': lag['max'],
+    }
+
+
+def linear_fit(xs, ys):
+    """Least-squares slope and R² for ys over xs"""
+    n = len(xs)
+    if n < 3:
+        return 0.0, 0.0
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    syy = sum((y - mean_y) ** 2 for y in ys)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    if sxx == 0:
+        return 0.0, 0.0
+    slope = sxy / sxx
+    r2 = (sxy * sxy) / (sxx * syy) if syy else 0.0
+    return slope, r2
+
+
+def analyze(samples, warmup_fraction):
+    """Slopes per hour after the warm-up window, with leak suspects flagged"""
+    start = int(len(samples) * warmup_fraction)
+    steady = samples[start:]
+    hours = [s['elapsed_s'] / 3600 for s in steady]
+    analysis = {}
+    for metric, threshold in LEAK_THRESHOLDS.items():
+        values = [s[metric] for s in steady]
+        slope, r2 = linear_fit(hours, values)
+        analysis[metric] = {
+            'first': values[0] if values else None,
+            'last': values[-1] if values else None,
+            'slope_per_hour': slope,
+            'r2': r2,
+            'suspect': slope > threshold['per_hour'] and r2 >= threshold['r2'],
+        }
+    return analysis
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak the dashboard with a mixed workload')
+    parser.add_argument('--hours', type=float, default=None)
+    parser.add_argument('--minutes', type=float, default=None)
+    parser.add_argument('--interval', type=float, default=60, help='Seconds between samples')
+    parser.add_argument('--url', default=APP_URL)
+    parser.add_argument('--live', action='store_true', help='Use live APIs instead of demo mode')
+    parser.add_argument('--no-gc', action='store_true', help='Do not force GC before heap samples')
+    parser.add_argument('--warmup', type=float, default=0.1, help='Fraction of samples ignored for slopes')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', default='test_screenshots/soak_report.json')
+    args = parser.parse_args()
+
+    duration_s = (args.hours * 3600 if args.hours else 0) + (args.minutes * 60 if args.minutes else 0)
+    if not duration_s:
+        duration_s = 3600
+    rng = random.Random(args.seed)
+    flows = {f['view']: f for f in FLOWS}
+
+    driver = make_driver()
+    driver.set_page_load_timeout(60)
+    samples, flow_stats = [], {}
+    try:
+        if args.live:
+            driver.get(args.url)
+        else:
+            enable_demo_mode(driver, args.url)
+        driver.execute_cdp_cmd('Performance.enable', {})
+        driver.execute_script(LAG_MONITOR_JS)
+
+        print("=" * 70)
+        print(f"🧪 SOAK TEST: {duration_s / 3600:.2f} h, sample every {args.interval:.0f} s"
+              f" ({'live APIs' if args.live else 'demo mode'})")
+        print("=" * 70)
+
+        started = time.monotonic()
+        next_sample = started
+        iteration = 0
+        while time.monotonic() - started < duration_s:
+            if time.monotonic() >= next_sample:
+                reading = sample(driver, not args.no_gc)
+                reading['elapsed_s'] = time.monotonic() - started
+                reading['iteration'] = iteration
+                samples.append(reading)
+                print(f"📈 {reading['elapsed_s'] / 60:6.1f} min  heap {reading['js_heap_mb']:.1f} MB  "
+                      f"nodes {reading['dom_nodes']:.0f}  idb {reading['indexeddb_mb']:.2f} MB  "
+                      f"lag {reading['loop_lag_ms']:.1f} ms")
+                next_sample += args.interval
+
+            view = rng.choice(list(WORKLOAD))
+            flow = dict(flows[view], query=rng.choice(WORKLOAD[view]))
+            result = run_flow(driver, flow)
+            stats = flow_stats.setdefault(view, {'runs': 0, 'failures': 0, 'total_ms': 0.0})
+            stats['runs'] += 1
+            stats['total_ms'] += result['ms']
+            if not result['ok']:
+                stats['failures'] += 1
+                print(f"   ⚠️  {view}: {result['error']}")
+            iteration += 1
+            time.sleep(rng.uniform(0.5, 2.0))  # think time
+
+        reading = sample(driver, not args.no_gc)
+        reading['elapsed_s'] = time.monotonic() - started
+        reading['iteration'] = iteration
+        samples.append(reading)
+    finally:
+        driver.quit()
+
+    analysis = analyze(samples, args.warmup)
+
+    print("\n" + "=" * 70)
+    print("SOAK SUMMARY (slope per hour after warm-up)")
+    print("=" * 70)
+    for metric, a in analysis.items():
+        flag = '🔴 LEAK SUSPECT' if a['suspect'] else ''
+        print(f"   {metric:<16} {a['first']:>10.2f} -> {a['last']:>10.2f}   "
+              f"{a['slope_per_hour']:+10.2f}/h   R² {a['r2']:.2f}  {flag}")
+    print("\n   Flow          runs  failures  mean ms")
+    for view, s in sorted(flow_stats.items()):
+        print(f"   {view:<20} {s['runs']:>5} {s['failures']:>9} {s['total_ms'] / s['runs']:>8.0f}")
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump({
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'duration_s': duration_s,
+            'interval_s': args.interval,
+            'mode': 'live' if args.live else 'demo',
+            'samples': samples,
+            'analysis': analysis,
+            'flows': flow_stats,
+            'leak_suspects': [m for m, a in analysis.items() if a['suspect']],
+        }, f, indent=2)
+    print(f"\n📄 Soak report saved: {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
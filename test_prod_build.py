@@ -3,6 +3,7 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
+from network_capture import NetworkRecorder, enable_network_logging, har_mode_requested
 import time
 
 chrome_options = Options()
@@ -10,20 +11,28 @@ chrome_options.add_argument('--headless=new')
 chrome_options.add_argument('--no-sandbox')
 chrome_options.add_argument('--disable-dev-shm-usage')
 
+# --har / OMNIDASH_HAR=1 records what the production build actually fetches
+har_mode = har_mode_requested()
+if har_mode:
+    enable_network_logging(chrome_options)
+
 driver = webdriver.Chrome(options=chrome_options)
 driver.set_page_load_timeout(15)
+recorder = NetworkRecorder(driver, enabled=har_mode)
 
 try:
     print("=" * 70)
     print("🧪 TESTING PRODUCTION BUILD (http://localhost:3002)")
     print("=" * 70)
     
+    recorder.start_step('Load production build')
     driver.get("http://localhost:3002")
     print("✅ Page loaded")
     time.sleep(2)
     
     # Click Settings
     settings_btn = driver.find_element(By.XPATH, "//button[.//span[text()='Settings']]")
+    recorder.start_step('Open Settings')
     settings_btn.click()
     print("✅ Clicked Settings")
     time.sleep(2)
@@ -70,6 +79,8 @@ try:
         f.write(driver.page_source)
     print("\n📄 Page source saved: prod_settings_source.html")
     
+    recorder.write_report("test_screenshots/network_prod_build.html")
+
     # Final verdict
     print("\n" + "=" * 70)
     if all(keywords.values()):
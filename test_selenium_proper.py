@@ -15,6 +15,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from artifact_store import ArtifactStore
 
 class ProperSeleniumTest:
     def __init__(self):
@@ -23,6 +24,7 @@ class ProperSeleniumTest:
         self.results = []
         self.driver = None
         self.screenshot_counter = 1
+        self.store = ArtifactStore()
         
     def setup_driver(self):
         """Setup Chrome driver - non-headless for visual testing"""
@@ -35,27 +37,21 @@ class ProperSeleniumTest:
         self.driver = webdriver.Chrome(options=options)
         print("✅ Chrome driver initialized (non-headless)")
         
-    def verify_screenshot(self, filepath, expected_texts, test_name):
+    def verify_screenshot(self, png, expected_texts, test_name):
         """
         MANDATORY: Verify screenshot contains expected text using OCR.
         NEVER skip this. NEVER guess.
         """
-        print(f"\n🔍 Verifying screenshot: {filepath}")
+        print(f"\n🔍 Verifying screenshot: {test_name}")
         
-        # Run OCR
+        # Run OCR on the captured bytes (no PNG is written to disk)
         result = subprocess.run(
-            ['tesseract', filepath, 'stdout'],
+            ['tesseract', 'stdin', 'stdout'],
+            input=png,
             stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            text=True
+            stderr=subprocess.DEVNULL
         )
-        ocr_text = result.stdout
-        
-        # Save OCR output
-        ocr_file = f"{filepath}.txt"
-        with open(ocr_file, 'w') as f:
-            f.write(ocr_text)
-        print(f"   OCR output saved to: {ocr_file}")
+        ocr_text = result.stdout.decode('utf-8', errors='replace')
         
         # Check for ALL expected texts
         ocr_lower = ocr_text.lower()
@@ -90,12 +86,16 @@ class ProperSeleniumTest:
         filepath = f"{self.screenshot_dir}/{filename}"
         
         print(f"\n📸 Taking screenshot: {filename}")
-        self.driver.save_screenshot(filepath)
+        png = self.driver.get_screenshot_as_png()
         
         # MANDATORY: Verify with OCR
         verified, ocr_text, missing = self.verify_screenshot(
-            filepath, expected_texts, description
+            png, expected_texts, description
         )
+
+        # The store is the only copy (identical frames share a blob); the
+        # manifest is written once, at teardown
+        self.store.put_image(png, filepath, ocr_text)
         
         self.screenshot_counter += 1
         return verified, filepath, ocr_text, missing
@@ -531,21 +531,21 @@ class ProperSeleniumTest:
 
             details_html = ''
             if 'screenshot' in result['details']:
-                screenshot_path = result['details']['screenshot']
-                ocr_path = f"{screenshot_path}.txt"
+                name = result['details']['screenshot']
+                blob_path = self.store.get_image_path(name)
+                screenshot_path = os.path.relpath(blob_path, self.screenshot_dir) if blob_path else name
 
                 # Read OCR text
                 try:
-                    with open(ocr_path, 'r') as f:
-                        ocr_text = f.read()
-                except:
-                    ocr_text = "OCR file not found"
+                    ocr_text = self.store.get_ocr_text(name) or "OCR text not found"
+                except OSError:
+                    ocr_text = "OCR text not found"
 
                 details_html = f"""
                 <div class="screenshot">
                     <img src="{screenshot_path}" alt="{result['test']}" onclick="window.open('{screenshot_path}', '_blank')">
                     <div class="screenshot-caption">
-                        📸 {screenshot_path} (click to open full size)
+                        📸 {name} (click to open full size)
                     </div>
                 </div>
                 <div class="ocr-output">
@@ -602,6 +602,8 @@ class ProperSeleniumTest:
             self.test_04_error_handling()
 
         finally:
+            self.store.save()
+
             # Generate report
             report_path = self.generate_html_report()
 
@@ -7,6 +7,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from network_capture import NetworkRecorder, enable_network_logging, har_mode_requested
 import time
 
 # Setup Chrome with cache disabled
@@ -24,19 +25,27 @@ chrome_options.add_experimental_option('prefs', {
     'disk-cache-size': 0
 })
 
+# --har / OMNIDASH_HAR=1 records a HAR per step to prove the cache really is off
+har_mode = har_mode_requested()
+if har_mode:
+    enable_network_logging(chrome_options)
+
 driver = webdriver.Chrome(options=chrome_options)
+recorder = NetworkRecorder(driver, enabled=har_mode)
 
 try:
     print("🧪 Testing Settings page with cache disabled...")
     print("=" * 60)
     
     # Navigate to app
+    recorder.start_step('Load app')
     driver.get("http://localhost:3001")
     time.sleep(2)
     
     # Click Settings button
     settings_buttons = driver.find_elements(By.XPATH, "//button[.//span[text()='Settings']]")
     if settings_buttons:
+        recorder.start_step('Open Settings')
         settings_buttons[0].click()
         print("✅ Clicked Settings button")
         time.sleep(2)
@@ -85,6 +94,7 @@ try:
         except Exception as e:
             print(f"   Could not find API Credentials section: {e}")
     
+    recorder.write_report("test_screenshots/network_cache_cleared.html")
     print("\n" + "=" * 60)
     
 finally:
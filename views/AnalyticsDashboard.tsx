@@ -22,7 +22,7 @@ import {
   Database,
   Globe,
 } from 'lucide-react';
-import { fetchViews, searchItems } from '../services/iaService';
+import { fetchViews, fetchViewsWithSearch, searchItems } from '../services/iaService';
 import { AppView } from '../types';
 import { Button } from '../components/ui/Button';
 
@@ -90,9 +90,13 @@ const AnalyticsDashboard: React.FC<Props> = ({ onChangeView }) => {
       let finalData: any[] = [];
       let initialError: Error | null = null;
 
+      // Views and the resolving search in one backend round trip, when available
+      const prefetched = await fetchViewsWithSearch(target);
+
       // 1. Attempt Direct Fetch
       try {
-        const rawData = await fetchViews(target);
+        if (prefetched?.viewsError) throw prefetched.viewsError;
+        const rawData = prefetched?.views ?? (await fetchViews(target));
         finalData = processData(rawData);
       } catch (err: any) {
         initialError = err;
@@ -107,7 +111,7 @@ const AnalyticsDashboard: React.FC<Props> = ({ onChangeView }) => {
 
         try {
           // We use the 'general' search which falls back to scrape if needed
-          const searchRes = await searchItems(target, null, 'general');
+          const searchRes = prefetched?.search ?? (await searchItems(target, null, 'general'));
 
           if (searchRes.items && searchRes.items.length > 0) {
             const bestMatch = searchRes.items[0];
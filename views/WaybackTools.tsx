@@ -26,15 +26,20 @@ import {
   downloadSnapshotContent,
 } from '../services/waybackService';
 import { storageService } from '../services/storageService';
+import { backendService, CdxStats } from '../services/backendService';
 import { AppSettings, WaybackAvailability, CDXRecord, SavedSnapshot, AppView } from '../types';
 import { Button } from '../components/ui/Button';
 import ExportModal from '../components/ExportModal';
+import SaveJobPanel from '../components/SaveJobPanel';
 
 interface Props {
   settings: AppSettings;
   onChangeView?: (view: AppView) => void;
 }
 
+// Rows the history table renders; with server-side stats only these are fetched
+const CDX_TABLE_ROWS = 500;
+
 interface SaveRequestItem {
   id: string;
   url: string;
@@ -50,9 +55,13 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
   const [error, setError] = useState<string | null>(null);
   const [availability, setAvailability] = useState<WaybackAvailability | null>(null);
   const [cdxData, setCdxData] = useState<CDXRecord[]>([]);
+  const [cdxStats, setCdxStats] = useState<CdxStats | null>(null);
+  const [cdxMonths, setCdxMonths] = useState<CdxStats | null>(null);
+  const cdxStatsUrl = useRef<string | null>(null);
   const [saveHistory, setSaveHistory] = useState<SaveRequestItem[]>([]);
   const [savedSnapshots, setSavedSnapshots] = useState<SavedSnapshot[]>([]);
   const [selectedYear, setSelectedYear] = useState<string | null>(null);
+  const [selectedMonth, setSelectedMonth] = useState<string | null>(null);
   const [downloadingId, setDownloadingId] = useState<string | null>(null);
 
   // Modal States
@@ -81,6 +90,41 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
     }
   };
 
+  // Drill-down: month buckets for the selected year, from the backend
+  useEffect(() => {
+    const target = cdxStatsUrl.current;
+    setCdxMonths(null);
+    if (!cdxStats || !target || !selectedYear) return;
+    let cancelled = false;
+    backendService
+      .getCdxStats(target, 'month', { from: selectedYear, to: selectedYear })
+      .then(months => {
+        if (!cancelled) setCdxMonths(months);
+      })
+      .catch(() => {});
+    return () => {
+      cancelled = true;
+    };
+  }, [cdxStats, selectedYear]);
+
+  // Table rows for the selected period (only when the chart comes from the backend)
+  useEffect(() => {
+    const target = cdxStatsUrl.current;
+    if (!cdxStats || !target) return;
+    const period = selectedMonth || selectedYear;
+    let cancelled = false;
+    fetchCDX(target, CDX_TABLE_ROWS, period ? { from: period, to: period } : {})
+      .then(rows => {
+        if (!cancelled) setCdxData(rows);
+      })
+      .catch((e: any) => {
+        if (!cancelled) setError(e.message);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [cdxStats, selectedYear, selectedMonth]);
+
   const handleAction = async (
     e?: React.FormEvent,
     overrideMode?: 'available' | 'save' | 'cdx' | 'saved'
@@ -111,6 +155,7 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
 
     setLoading(true);
     setSelectedYear(null);
+    setSelectedMonth(null);
 
     // Reset data for the current mode to show fresh loading state
     if (activeMode === 'available') setAvailability(null);
@@ -146,9 +191,21 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
           );
         }
       } else if (activeMode === 'cdx') {
-        // Fetch more items for better browsing and accurate chart (10000)
-        const res = await fetchCDX(targetUrl, 10000);
-        setCdxData(res);
+        // Server-side aggregates cover the full history; the table rows for
+        // the selected period are then loaded by the effect below. Without a
+        // backend, chart and table both work from the first 10000 rows.
+        setCdxStats(null);
+        setCdxMonths(null);
+        cdxStatsUrl.current = targetUrl;
+        const stats = settings.demoMode
+          ? null
+          : await backendService.getCdxStats(targetUrl, 'year').catch(() => null);
+        if (cdxStatsUrl.current !== targetUrl) return;
+        if (stats) {
+          setCdxStats(stats);
+        } else {
+          setCdxData(await fetchCDX(targetUrl, 10000));
+        }
       }
     } catch (e: any) {
       console.error('Wayback Tool Error:', e);
@@ -289,17 +346,51 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
     return `${baseTag}${snap.content}`;
   };
 
+  // Chart bars: months of the selected year once the backend has them, else years
+  const showingMonths = !!(selectedYear && cdxMonths);
   const getCdxStats = () => {
+    if (cdxStats) {
+      const stats = showingMonths ? cdxMonths! : cdxStats;
+      return stats.buckets.map(({ key, count }) => ({
+        key,
+        label: showingMonths ? `${key.substring(0, 4)}-${key.substring(4, 6)}` : key,
+        count,
+      }));
+    }
     const stats: Record<string, number> = {};
     cdxData.forEach(row => {
       const year = row.timestamp.substring(0, 4);
       stats[year] = (stats[year] || 0) + 1;
     });
     return Object.entries(stats)
-      .map(([year, count]) => ({ year, count }))
-      .sort((a, b) => a.year.localeCompare(b.year));
+      .map(([year, count]) => ({ key: year, label: year, count }))
+      .sort((a, b) => a.key.localeCompare(b.key));
   };
 
+  const selectBar = (key: string) => {
+    if (showingMonths) {
+      setSelectedMonth(key === selectedMonth ? null : key);
+    } else {
+      setSelectedYear(key === selectedYear ? null : key);
+      setSelectedMonth(null);
+    }
+  };
+
+  const clearCdxFilter = () => {
+    setSelectedYear(null);
+    setSelectedMonth(null);
+  };
+
+  const selectedPeriod = selectedMonth || selectedYear;
+  // Captures in the selected period: exact from the backend, else counted from the rows
+  const periodCaptures = cdxStats
+    ? selectedMonth
+      ? cdxMonths?.buckets.find(b => b.key === selectedMonth)?.count ?? 0
+      : selectedYear
+        ? cdxStats.buckets.find(b => b.key === selectedYear)?.count ?? 0
+        : cdxStats.total
+    : cdxData.filter(row => !selectedPeriod || row.timestamp.startsWith(selectedPeriod)).length;
+
   return (
     <div className="h-full flex flex-col space-y-6">
       {/* Header & Tabs */}
@@ -525,6 +616,7 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
                   </div>
                 )}
               </div>
+              {!settings.demoMode && <SaveJobPanel />}
               <div className="bg-indigo-900/20 border border-indigo-500/20 p-4 rounded-lg text-sm text-indigo-200">
                 <p className="flex items-start gap-2">
                   <Info className="w-4 h-4 shrink-0 mt-0.5" />
@@ -541,7 +633,7 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
           {/* MODE: CDX (History) */}
           {mode === 'cdx' && (
             <div className="h-full flex flex-col">
-              {cdxData.length > 0 ? (
+              {cdxStats || cdxData.length > 0 ? (
                 <div className="flex-1 flex flex-col space-y-6">
                   {/* Chart Section */}
                   <div className="h-64 bg-gray-800 rounded-xl border border-gray-700 p-4 relative">
@@ -550,7 +642,8 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
                         Capture Frequency
                       </h4>
                       <span className="text-xs text-gray-500">
-                        Showing {cdxData.length.toLocaleString()} captures
+                        Showing {(cdxStats?.total ?? cdxData.length).toLocaleString()} captures
+                        {cdxStats && ` (${cdxStats.uniqueDigestsApproximate ? '~' : ''}${cdxStats.uniqueDigests.toLocaleString()} unique)`}
                       </span>
                     </div>
                     <ResponsiveContainer width="100%" height="100%">
@@ -564,10 +657,10 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
                             borderRadius: '0.5rem',
                           }}
                           formatter={(value: number) => [`${value} captures`, 'Count']}
-                          labelFormatter={(label) => `Year: ${label}`}
+                          labelFormatter={(label) => `${showingMonths ? 'Month' : 'Year'}: ${label}`}
                         />
                         <XAxis
-                          dataKey="year"
+                          dataKey="label"
                           tick={{ fontSize: 10, fill: '#9ca3af' }}
                           interval="preserveStartEnd"
                           angle={-45}
@@ -584,14 +677,12 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
                           dataKey="count"
                           fill="#6366f1"
                           radius={[4, 4, 0, 0]}
-                          onClick={data =>
-                            setSelectedYear(data.year === selectedYear ? null : data.year)
-                          }
+                          onClick={data => selectBar(data.key)}
                         >
                           {getCdxStats().map((entry, index) => (
                             <Cell
                               key={`cell-${index}`}
-                              fill={entry.year === selectedYear ? '#818cf8' : '#4f46e5'}
+                              fill={entry.key === (showingMonths ? selectedMonth : selectedYear) ? '#818cf8' : '#4f46e5'}
                               cursor="pointer"
                             />
                           ))}
@@ -604,12 +695,13 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
                   <div className="flex-1 bg-gray-800 rounded-xl border border-gray-700 overflow-hidden flex flex-col">
                     <div className="px-4 py-2 border-b border-gray-700 bg-gray-850 flex justify-between items-center text-xs text-gray-400">
                       <span>
-                        {cdxData.length} records found{' '}
-                        {selectedYear ? `(Filtering by ${selectedYear})` : ''}
+                        {periodCaptures.toLocaleString()} records found{' '}
+                        {selectedPeriod ? `(Filtering by ${selectedPeriod})` : ''}
+                        {periodCaptures > CDX_TABLE_ROWS && ` - showing the first ${CDX_TABLE_ROWS}`}
                       </span>
                       {selectedYear && (
                         <button
-                          onClick={() => setSelectedYear(null)}
+                          onClick={clearCdxFilter}
                           className="text-indigo-400 hover:underline"
                         >
                           Clear Filter
@@ -628,8 +720,8 @@ const WaybackTools: React.FC<Props> = ({ settings, onChangeView }) => {
                         </thead>
                         <tbody className="divide-y divide-gray-700">
                           {cdxData
-                            .filter(row => !selectedYear || row.timestamp.startsWith(selectedYear))
-                            .slice(0, 500) // Render limit for performance
+                            .filter(row => !selectedPeriod || row.timestamp.startsWith(selectedPeriod))
+                            .slice(0, CDX_TABLE_ROWS) // Render limit for performance
                             .map((row, idx) => (
                               <tr key={idx} className="hover:bg-gray-700/50">
                                 <td className="px-4 py-2 font-mono text-xs">{row.timestamp}</td>
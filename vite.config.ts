@@ -1,8 +1,38 @@
-import { defineConfig } from 'vite';
+import path from 'path';
+import { defineConfig, type Plugin } from 'vite';
 import react from '@vitejs/plugin-react';
 
+// Writes dist/.vite/chunk-modules.json (chunk -> module -> rendered bytes)
+// so bundle_budget.py can name the modules behind a size regression
+const chunkModuleReport = (): Plugin => ({
+  name: 'chunk-module-report',
+  apply: 'build',
+  generateBundle(_options, bundle) {
+    const report: Record<string, unknown> = {};
+    for (const [fileName, output] of Object.entries(bundle)) {
+      if (output.type !== 'chunk') continue;
+      report[fileName] = {
+        name: output.name,
+        isEntry: output.isEntry,
+        isDynamicEntry: output.isDynamicEntry,
+        modules: Object.fromEntries(
+          Object.entries(output.modules).map(([id, info]) => [
+            path.relative(process.cwd(), id.replace(/^\0/, '')),
+            info.renderedLength,
+          ])
+        ),
+      };
+    }
+    this.emitFile({
+      type: 'asset',
+      fileName: '.vite/chunk-modules.json',
+      source: JSON.stringify(report, null, 2),
+    });
+  },
+});
+
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), chunkModuleReport()],
   base: '/Archive-OmniDash-2/',  // GitHub Pages base path
   server: {
     port: 3001,
@@ -11,6 +41,7 @@ export default defineConfig({
     outDir: 'dist',
     assetsDir: 'assets',
     sourcemap: false,
+    manifest: true,  // dist/.vite/manifest.json, read by bundle_budget.py
     rollupOptions: {
       output: {
         manualChunks: {